@@ -45,8 +45,8 @@ def is_valid_combination(config, data):
         "model"] == "cohere.embed-multilingual-v3"):
         if config['vector_dimension'] != 1024:
             return False
-    if (config['embedding']["service"] == "sagemaker" and config["embedding"]["model"] == "huggingface-sentencesimilarity-bge-large-en-v1-5") or (
-            config['embedding']["service"] == "sagemaker" and config["embedding"]["model"] == "huggingface-sentencesimilarity-bge-m3"):
+    if (config['embedding']["service"] in ("sagemaker", "local") and config["embedding"]["model"] == "huggingface-sentencesimilarity-bge-large-en-v1-5") or (
+            config['embedding']["service"] in ("sagemaker", "local") and config["embedding"]["model"] == "huggingface-sentencesimilarity-bge-m3"):
         if config['vector_dimension'] != 1024:
             return False
     if (config['embedding']["service"] == "sagemaker" and config["embedding"]["model"] == "huggingface-textembedding-gte-qwen2-7b-instruct"):
@@ -57,6 +57,10 @@ def is_valid_combination(config, data):
         return False
     if config['knn_num'] != 3 and config['knn_num'] != 5 and config['knn_num'] != 10 and config['knn_num'] != 15:
         return False
+    if config.get('hnsw_m') and not 2 <= config['hnsw_m'] <= 100:
+        return False
+    if config.get('hnsw_ef_construction') and config['hnsw_ef_construction'] < config.get('hnsw_m', 0):
+        return False
     if config.get('chunking_strategy', None) == "hierarchical":
         # child chunk size should be less than parent chunk size
         if config.get("hierarchical_child_chunk_size") > config.get("hierarchical_parent_chunk_size"):
@@ -103,7 +107,11 @@ def restructure_combination(combination):
         'vector_dimension',
         'chunk_size',
         'chunk_overlap',
-        'indexing_algorithm'
+        'indexing_algorithm',
+        'hnsw_m',
+        'hnsw_ef_construction',
+        'vector_store',
+        'lexical_fusion'
     ]
     for key in indexing_keys:
         if key in combination:
@@ -120,7 +128,12 @@ def restructure_combination(combination):
     retrieval_keys = [
         'n_shot_prompts',
         'knn_num',
-        'temp_retrieval_llm'
+        'temp_retrieval_llm',
+        'hnsw_ef_search',
+        'context_packing',
+        'context_token_budget',
+        'retrieval_only',
+        'rrf_k'
     ]
     for key in retrieval_keys:
         if key in combination:
@@ -260,6 +273,14 @@ def generate_all_combinations(data):
     if "guardrails" in parsed_data and parsed_data["guardrails"]:
         parameters_all.update({"guardrails": parsed_data["guardrails"]})
     parameters_all.update(parsed_data["evaluation"])
+    # HNSW parameters are experiment dimensions, defaulting to the values indices were always built with
+    parameters_all.setdefault("hnsw_m", 16)
+    parameters_all.setdefault("hnsw_ef_construction", 512)
+    parameters_all.setdefault("hnsw_ef_search", 100)
+    # Packed and unpacked context are compared like any other dimension
+    parameters_all.setdefault("context_packing", False)
+    parameters_all.setdefault("context_token_budget", 0)
+    parameters_all.setdefault("retrieval_only", False)
     parameters_all = add_kb_info(parameters_all)
     parameters_all = {key: value if isinstance(value, list) else [value] for key, value in parameters_all.items()}
     # Convert single values to lists and replace empty values with [0]
@@ -327,12 +348,12 @@ def generate_all_combinations(data):
             indexing_time, retrieval_time, eval_time = estimate_times(effective_num_tokens_kb_data, num_prompts, configuration)
 
             # Bedrock knowledge bases price not supported at the moment
-            if configuration["bedrock_knowledge_base"] or not configuration["knowledge_base"]:
+            if configuration["bedrock_knowledge_base"] or not configuration["knowledge_base"] or configuration.get("vector_store") == "bm25":
                 configuration["indexing_cost_estimate"] = 0
             elif configuration['embedding_service'] == "bedrock" :
                 embedding_price = estimate_embedding_model_bedrock_price(bedrock_price_df, configuration, num_tokens_kb_data)
                 configuration["indexing_cost_estimate"] += embedding_price
-            else:
+            elif configuration['embedding_service'] == "sagemaker":
                 configuration["indexing_cost_estimate"] += estimate_sagemaker_price(indexing_time)
 
             #Calculate the inferencing price - doesn't include OpenSearch pricing
@@ -358,7 +379,8 @@ def generate_all_combinations(data):
             configuration["eval_cost_estimate"] += estimate_fargate_price(eval_time)
 
             # add opensearch provisioned costs
-            if not configuration["bedrock_knowledge_base"] or configuration["is_opensearch"]:
+            uses_opensearch = not configuration["bedrock_knowledge_base"] or configuration["is_opensearch"]
+            if uses_opensearch and configuration.get("vector_store", "opensearch") not in ("local", "bm25"):
                 configuration["indexing_cost_estimate"] += estimate_opensearch_price(indexing_time)
                 configuration["retrieval_cost_estimate"] += estimate_opensearch_price(retrieval_time)
                 configuration["eval_cost_estimate"] += estimate_opensearch_price(eval_time)
@@ -7,6 +7,7 @@ import os
 from config.config import get_config
 import logging
 from typing import Dict, Any
+from util.boto3_clients import get_client
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -28,7 +29,7 @@ class StepFunctionOrchestrator:
             boto3.client: Configured Step Function client
         """
         try:
-            return boto3.client("stepfunctions", region_name=self.config.aws_region)
+            return get_client("stepfunctions", self.config.aws_region)
         except Exception as e:
             logger.error(f"Failed to initialize Step Function client: {e}")
             raise HTTPException(
@@ -120,7 +120,7 @@ def estimate_sagemaker_price(time, number_of_instances = 1):
 def estimate_times(no_of_kb_tokens, num_prompts, configuration):
     # For every 50,000 tokens of kb data and 50 prompts of gt data, estimated time in mins
     estimated_time = {
-        "indexing": {"sagemaker" : 2, "bedrock" : 1},
+        "indexing": {"sagemaker" : 2, "bedrock" : 1, "local": 6},
         "retrieval": {"sagemaker": 3, "bedrock": 3},
         "eval": {"sagemaker": 13, "bedrock": 12}
     }
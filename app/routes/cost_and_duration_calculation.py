@@ -55,7 +55,10 @@ def calculate_experiment_cost(experiment, num_tokens_kb_data, avg_promopt_length
         else:
             cost += estimate_sagemaker_price()
 
-        if experiment['config']["retrieval_service"] == "bedrock":
+        if experiment['config'].get("retrieval_only"):
+            # No answers are generated or evaluated
+            pass
+        elif experiment['config']["retrieval_service"] == "bedrock":
             retrical_price = estimate_retrieval_model_bedrock_price(bedrock_price_df, experiment['config'],
                                                                     avg_promopt_length,
                                                                     num_prompts)
@@ -84,8 +84,9 @@ async def post_experiment(
             else:
                 # Abbreviate the chunking strategy
                 chunking_strategy = "fix" if data["chunking_strategy"].lower() == "fixed" else "hi"
-                # Abbreviate the embedding service
-                embedding_service = "b" if data["embedding_service"].lower() == "bedrock" else "s"
+                # Abbreviate the embedding service, each service produces its own embeddings of the chunks
+                embedding_service_mapping = {"bedrock": "b", "local": "l"}
+                embedding_service = embedding_service_mapping.get(data["embedding_service"].lower(), "s")
                 embedding_model_mapping = {
                     "amazon.titan-embed-text-v1": "amazontitanv1",
                     "amazon.titan-embed-text-v2:0": "amazontitanv2",
@@ -104,6 +105,18 @@ async def post_experiment(
                     f"{data['chunk_overlap']}_{embedding_service}_{embedding_model}_"
                     f"{data['vector_dimension']}_{data['indexing_algorithm']}"
                 ).lower()
+                # ef_search is a query-time setting, so only the graph build parameters name the index
+                if data.get("hnsw_m"):
+                    index_id = f"{index_id}_m{data['hnsw_m']}_efc{data['hnsw_ef_construction']}"
+                if data.get("vector_store") == "bm25":
+                    # Lexical indices depend only on the chunks, so experiments share them across embedding models
+                    index_id = f"{execution_id}_{chunking_strategy}_{data['chunk_size']}_{data['chunk_overlap']}_bm25".lower()
+                else:
+                    # Each vector store is indexed separately, so it must name the index
+                    if data.get("vector_store") == "local":
+                        index_id = f"{index_id}_local"
+                    if data.get("lexical_fusion"):
+                        index_id = f"{index_id}_lex"
 
             # Generate unique experiment ID
             experiment_id = "".join(random.choices(string.ascii_uppercase + string.digits, k=8))
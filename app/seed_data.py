@@ -45,7 +45,9 @@ MODELS = {
     "sagemaker_deepseek-ai/DeepSeek-R1-Distill-Llama-8B": 2,
     "sagemaker_deepseek-ai/DeepSeek-R1-Distill-Qwen-1.5B": 4,
     "sagemaker_deepseek-ai/DeepSeek-R1-Distill-Qwen-7B": 2,
-    "sagemaker_deepseek-ai/DeepSeek-R1-Distill-Qwen-14B": 2
+    "sagemaker_deepseek-ai/DeepSeek-R1-Distill-Qwen-14B": 2,
+    "local_huggingface-sentencesimilarity-bge-large-en-v1-5": 50,
+    "local_huggingface-sentencesimilarity-bge-m3": 50
 }
 
 def seed_models(execution_model_invocations_db) -> int:
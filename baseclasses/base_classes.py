@@ -1,11 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Union, Iterator
 from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
 from typing import Optional
 from pydantic import Field
 import uuid
+import hashlib
 import time
 import logging
 from dataclasses import dataclass
@@ -16,6 +17,9 @@ import random
 from dataclasses import dataclass, asdict
 from decimal import Decimal
 import botocore
+import functools
+from util.rate_limiter import THROTTLING_ERRORS, AdaptiveRateLimiter, RateLimiterRegistry, ThrottledError
+from util.request_token_lease import RequestTokenLeaseRegistry
 
 
 logger = logging.getLogger(__name__)
@@ -68,6 +72,12 @@ class BaseInferencer(ABC):
         """Generate text based on input"""
         pass
 
+    def generate_text_stream(self, user_query: str, default_prompt: str, context: List[Dict] = None, **kwargs) -> Iterator[Dict[str, Any]]:
+        """Stream text and metadata events. Inferencers without native streaming emit the full answer at once."""
+        metadata, answer = self.generate_text(user_query=user_query, default_prompt=default_prompt, context=context, **kwargs)
+        yield {"type": "text", "text": answer}
+        yield {"type": "metadata", "metadata": metadata}
+
     def get_model_id(self) -> str:
         """Return the model ID."""
         return self.model_id
@@ -90,6 +100,18 @@ class ExperimentQuestionMetrics(BaseModel):
     guardrail_output_assessment: Optional[Union[List[Dict], Dict]] = Field(default=None, description="Output guardrail assessment results")
     guardrail_id: Optional[str] = Field(default=None, description="The guardrail id that was used")
     guardrail_blocked: Optional[str] = Field(default=None, description="Input or Output blocked by Guardrail")
+    stage_latencies: Optional[Dict[str, float]] = Field(default=None, description="Wall time in milliseconds of each retrieval stage")
+    retrieval_metrics: Optional[Dict[str, float]] = Field(default=None, description="Token recall, MRR and nDCG of the retrieved contexts")
+    shard: Optional[int] = Field(default=None, description="Shard of the ground truth the question was processed in")
+
+    @staticmethod
+    def make_id(experiment_id: str, question_index: int, question: str) -> str:
+        """
+        Deterministic id of a question's metrics, so a retried retrieval overwrites its rows
+        instead of duplicating them and can tell which questions are already done.
+        """
+        question_hash = hashlib.sha256(question.encode('utf-8')).hexdigest()
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{experiment_id}/{question_index}/{question_hash}"))
 
 
     @staticmethod
@@ -293,6 +315,19 @@ class ExperimentQuestionMetrics(BaseModel):
         if self.guardrail_blocked is not None:
             item['guardrail_blocked'] = {'S': self.guardrail_blocked}
 
+        if self.stage_latencies is not None:
+            item['stage_latencies'] = {
+                'M': {key: {'N': str(value)} for key, value in self.stage_latencies.items()}
+            }
+
+        if self.retrieval_metrics is not None:
+            item['retrieval_metrics'] = {
+                'M': {key: {'N': str(value)} for key, value in self.retrieval_metrics.items()}
+            }
+
+        if self.shard is not None:
+            item['shard'] = {'N': str(self.shard)}
+
         return item
 
 
@@ -339,6 +374,14 @@ class BaseEmbedder(ABC):
 
     def get_model_id(self) -> str:
         return self.model_id
+
+class BaseReranker(ABC):
+    """Abstract base class for all rerankers."""
+
+    @abstractmethod
+    def rerank_documents(self, input_prompt: str, retrieved_documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return the documents ordered by their relevance to the prompt, most relevant first."""
+        pass
     
 class BaseEvaluator(ABC):
 
@@ -459,9 +502,26 @@ class RetryParams(BaseModel):
     max_retries: int
     retry_delay: int
     backoff_factor: int
+    max_backoff: int = 30
     
 class BotoRetryHandler(ABC):
-    """Abstract class for retry handler"""
+    """
+    Abstract class for retry handler.
+
+    Calls go through the AdaptiveRateLimiter shared by all callers of the same service and model,
+    so throttling any one caller slows down every worker using that model. With request token
+    leasing enabled, every attempt also spends a token of the model's quota shared by all tasks. Retryable errors are
+    retried after a fully jittered exponential backoff, or after the service's Retry-After hint
+    when that is longer.
+    """
+
+    def __init__(self, limiter_key_attr: str = 'model_id'):
+        """
+        Args:
+            limiter_key_attr (str): Attribute of the decorated method's instance naming the model,
+                the class name is used when the instance has no such attribute
+        """
+        self.limiter_key_attr = limiter_key_attr
     
     @property
     @abstractmethod
@@ -472,34 +532,65 @@ class BotoRetryHandler(ABC):
     @abstractmethod
     def retryable_errors(self) -> set[str]:
         pass
-        
+
+    @property
+    def service(self) -> str:
+        return 'aws'
+
+    @property
+    def throttling_errors(self) -> set[str]:
+        """Retryable errors that signal congestion and make the limiter back off."""
+        return THROTTLING_ERRORS
+
+    def _limiter(self, instance: Any) -> AdaptiveRateLimiter:
+        model = getattr(instance, self.limiter_key_attr, None) or type(instance).__name__
+        return RateLimiterRegistry.get(f"{self.service}:{model}")
+
+    @staticmethod
+    def _retry_after(error: botocore.exceptions.ClientError) -> float:
+        headers = error.response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+        try:
+            return float(headers.get('retry-after') or headers.get('x-amzn-retry-after') or 0)
+        except ValueError:
+            return 0.0
         
     def __call__(self, func):
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            retries = 0
+            limiter = self._limiter(args[0]) if args else RateLimiterRegistry.get(f"{self.service}:{func.__name__}")
+            token_lease = RequestTokenLeaseRegistry.get(limiter.name)
             retry_params = self.retry_params
-            while retries < retry_params.max_retries:
+            retries = 0
+            while True:
+                if token_lease:
+                    token_lease.acquire()
                 try:
-                    return func(*args, **kwargs)
-                except botocore.exceptions.ClientError as e:
-                    error_code = e.response['Error']['Code']
-                    if error_code in self.retryable_errors:
-                        retries += 1
-                        logger.error(f"Rate limit error in Bedrock converse (Attempt {retries}/{retry_params.max_retries}): {str(e)}")
-                        
-                        if retries >= retry_params.max_retries:
-                            logger.error("Max retries reached. Could not complete Bedrock converse operation.")
+                    with limiter.slot():
+                        try:
+                            return func(*args, **kwargs)
+                        except botocore.exceptions.ClientError as e:
+                            if e.response['Error']['Code'] in self.throttling_errors:
+                                raise ThrottledError(e) from e
                             raise
-                        
-                        backoff_time = retry_params.retry_delay * (retry_params.backoff_factor ** (retries - 1))
-                        logger.info(f"Retrying in {backoff_time} seconds...")
-                        time.sleep(backoff_time)
-                    else:
-                        # If it's not a rate limit error, raise immediately
-                        raise
+                except (ThrottledError, botocore.exceptions.ClientError) as error:
+                    e = error.cause if isinstance(error, ThrottledError) else error
+                    error_code = e.response['Error']['Code']
+                    if error_code not in self.retryable_errors:
+                        # If it's not a retryable error, raise immediately
+                        raise e
+                    retries += 1
+                    logger.warning(f"{error_code} from {limiter.name} (Attempt {retries}/{retry_params.max_retries}): {str(e)}")
+                    if retries >= retry_params.max_retries:
+                        logger.error(f"Max retries reached for {limiter.name}")
+                        raise e
+
+                    ceiling = min(retry_params.max_backoff, retry_params.retry_delay * (retry_params.backoff_factor ** (retries - 1)))
+                    backoff_time = max(random.uniform(0, ceiling), self._retry_after(e))
+                    logger.info(f"Retrying in {backoff_time:.2f} seconds, limiter {limiter.metrics()}")
+                    time.sleep(backoff_time)
                 except Exception as e:
                     # For any other exception, log and raise immediately
-                    logger.error(f"Unexpected error in Bedrock converse: {str(e)}")
+                    logger.error(f"Unexpected error in {func.__qualname__}: {str(e)}")
                     raise
             
         return wrapper
\ No newline at end of file
@@ -0,0 +1,140 @@
+"""
+Sweep HNSW m, ef_construction and ef_search on an experiment's own index and ground-truth questions.
+
+For every setting the sweep reports recall@k against exact inner-product search, p50/p95 query
+latency and the memory of the HNSW graph, i.e. the FAISS index size without its vector storage.
+OpenSearch builds its faiss-engine HNSW graphs with the same library, so the numbers carry over
+to the OpenSearch index parameters hnsw_m, hnsw_ef_construction and hnsw_ef_search.
+
+The corpus is read from the experiment's vector snapshot if one exists and exported from
+OpenSearch otherwise.
+
+    python -m benchmarks.hnsw_sweep --experiment-id ABCD1234 --m 8 16 32 --ef-construction 128 512 --ef-search 32 100 256
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from config.config import Config
+from core.dynamodb import DynamoDBOperations
+from core.processors import EmbedProcessor
+from core.service.experimental_config_service import ExperimentalConfigService
+from core.vector_snapshot import VectorSnapshot, download_snapshot, faiss
+from util.s3util import S3Util
+
+
+def _load_experiment_config(config: Config, experiment_id: str):
+    experiment = DynamoDBOperations(region=config.aws_region, table_name=config.experiment_table).get_item({'id': experiment_id})
+    if not experiment:
+        raise ValueError(f"Experiment with id {experiment_id} not found")
+    exp_config_data = {
+        **experiment['config'],
+        'experiment_id': experiment_id,
+        'execution_id': experiment['execution_id'],
+        'index_id': experiment['index_id']
+    }
+    return ExperimentalConfigService(config).create_experimental_config(exp_config_data)
+
+
+def _open_corpus(config: Config, index_id: str, workdir: str) -> VectorSnapshot:
+    try:
+        directory = download_snapshot(config.s3_bucket, f"{config.local_vector_index_prefix}/{index_id}", config.vector_snapshot_cache_dir)
+    except ValueError:
+        from opensearch.export_snapshot import OpenSearchSnapshotExporter
+        directory = workdir
+        OpenSearchSnapshotExporter(config).export(index_id, directory)
+    return VectorSnapshot(directory)
+
+
+def _exact_top_k(snapshot: VectorSnapshot, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = snapshot.inner_products(queries)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return top
+
+
+def _recall(ids: np.ndarray, exact: np.ndarray) -> float:
+    hits = sum(len(set(found.tolist()) & set(expected.tolist())) for found, expected in zip(ids, exact))
+    return hits / exact.size
+
+
+def sweep(vectors: np.ndarray, queries: np.ndarray, exact: np.ndarray, k: int,
+          m_values: List[int], ef_construction_values: List[int], ef_search_values: List[int]) -> List[Dict[str, Any]]:
+    results = []
+    count, dimension = vectors.shape
+    for m in m_values:
+        for ef_construction in ef_construction_values:
+            index = faiss.IndexHNSWFlat(dimension, m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = ef_construction
+            start = time.perf_counter()
+            index.add(vectors)
+            build_seconds = time.perf_counter() - start
+            graph_bytes = faiss.serialize_index(index).nbytes - count * dimension * 4
+
+            for ef_search in ef_search_values:
+                index.hnsw.efSearch = max(ef_search, k)
+                latencies_ms = []
+                ids = np.empty((len(queries), k), dtype=np.int64)
+                for i, query in enumerate(queries):
+                    query_start = time.perf_counter()
+                    _, found = index.search(query.reshape(1, -1), k)
+                    latencies_ms.append((time.perf_counter() - query_start) * 1000)
+                    ids[i] = found[0]
+                results.append({
+                    'hnsw_m': m,
+                    'hnsw_ef_construction': ef_construction,
+                    'hnsw_ef_search': ef_search,
+                    'recall_at_k': round(_recall(ids, exact), 4),
+                    'p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+                    'p95_ms': round(float(np.percentile(latencies_ms, 95)), 3),
+                    'graph_mb': round(graph_bytes / (1024 * 1024), 2),
+                    'build_seconds': round(build_seconds, 1)
+                })
+                print(json.dumps(results[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall/latency/memory sweep of HNSW parameters for an experiment")
+    parser.add_argument('--experiment-id', required=True)
+    parser.add_argument('--m', type=int, nargs='+', default=[8, 16, 32])
+    parser.add_argument('--ef-construction', type=int, nargs='+', default=[128, 256, 512])
+    parser.add_argument('--ef-search', type=int, nargs='+', default=[32, 64, 100, 256])
+    parser.add_argument('--k', type=int, help="Defaults to the experiment's knn_num")
+    parser.add_argument('--output', help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    if faiss is None:
+        raise SystemExit("The sweep needs faiss, install faiss-cpu")
+
+    config = Config.load_config()
+    experimental_config = _load_experiment_config(config, args.experiment_id)
+    k = args.k or int(experimental_config.knn_num)
+
+    questions = [item['question'] for item in S3Util().read_json_from_s3(experimental_config.gt_data)]
+    embed_processor = EmbedProcessor(experimental_config)
+    queries = np.asarray([embed_processor.embed_text(question)[1] for question in questions], dtype=np.float32)
+
+    workdir = tempfile.mkdtemp(prefix='hnsw_sweep_')
+    try:
+        snapshot = _open_corpus(config, experimental_config.index_id, workdir)
+        vectors = np.asarray(snapshot.vectors, dtype=np.float32)
+        if snapshot.dtype == 'int8':
+            vectors = vectors * snapshot.scales[:, None]
+        exact = _exact_top_k(snapshot, queries, k)
+        print(f"Sweeping {snapshot.count} vectors with {len(questions)} ground-truth questions at k={k}")
+        results = sweep(vectors, queries, exact, k, args.m, args.ef_construction, args.ef_search)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Concurrent k-NN search throughput of the OpenSearch transports.
+
+Compares the previous per-component client (requests transport with its default pool of 10 and a
+mapping lookup per search) with the shared pooled urllib3 client and, when aiohttp is installed,
+the asyncio client. The benchmark creates, fills and deletes its own index.
+
+    python -m benchmarks.opensearch_transport_benchmark --opensearch-host my-domain.us-east-1.es.amazonaws.com \
+        --opensearch-username admin --opensearch-password ... --concurrency 8 32 64
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import boto3
+import numpy as np
+from opensearchpy import AWSV4SignerAuth, OpenSearch, RequestsHttpConnection
+from opensearchpy.helpers import bulk
+
+from benchmarks.vector_search_benchmark import VECTOR_FIELD, _documents, _mapping, _random_unit_vectors
+from core.opensearch_client import AsyncOpenSearch
+from core.opensearch_vectorstore import AsyncOpenSearchVectorDatabase, OpenSearchVectorDatabase
+
+
+def _requests_client(args: argparse.Namespace) -> OpenSearch:
+    """The client every component used to build for itself."""
+    if args.opensearch_serverless:
+        auth = AWSV4SignerAuth(boto3.Session().get_credentials(), args.region, 'aoss')
+        return OpenSearch(hosts=[{'host': args.opensearch_host, 'port': 443}], http_auth=auth, use_ssl=True, verify_certs=True,
+                          connection_class=RequestsHttpConnection, timeout=30, max_retries=3, retry_on_timeout=True,
+                          headers={'host': args.opensearch_host})
+    return OpenSearch(hosts=[{'host': args.opensearch_host, 'port': 443}], http_auth=(args.opensearch_username, args.opensearch_password),
+                      use_ssl=True, verify_certs=True, connection_class=RequestsHttpConnection, timeout=30, max_retries=3,
+                      retry_on_timeout=True)
+
+
+def _requests_search(client: OpenSearch, index_name: str, query: List[float], k: int) -> None:
+    client.indices.get_mapping(index=index_name)
+    client.search(index=index_name, body={"size": k, "query": {"knn": {VECTOR_FIELD: {"vector": query, "k": k}}}, "_source": True})
+
+
+def _throughput(search: Callable[[List[float]], None], queries: np.ndarray, concurrency: int) -> Dict[str, float]:
+    latencies_ms = []
+
+    def timed(query: List[float]) -> None:
+        start = time.perf_counter()
+        search(query)
+        latencies_ms.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, [query.tolist() for query in queries]))
+    elapsed = time.perf_counter() - start
+    return {'qps': len(queries) / elapsed, 'p50': float(np.percentile(latencies_ms, 50)), 'p95': float(np.percentile(latencies_ms, 95))}
+
+
+async def _async_throughput(vector_database: AsyncOpenSearchVectorDatabase, index_name: str, queries: np.ndarray,
+                            k: int, concurrency: int) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies_ms = []
+
+    async def timed(query: List[float]) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await vector_database.search(index_name, query, k)
+            latencies_ms.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(query.tolist()) for query in queries))
+    elapsed = time.perf_counter() - start
+    return {'qps': len(queries) / elapsed, 'p50': float(np.percentile(latencies_ms, 50)), 'p95': float(np.percentile(latencies_ms, 95))}
+
+
+async def _async_runs(connection: Dict, pool_maxsize: int, index_name: str, queries: np.ndarray, k: int,
+                      concurrency_levels: List[int]) -> Dict[int, Dict[str, float]]:
+    # The aiohttp session is bound to this event loop, so every level runs inside it
+    vector_database = AsyncOpenSearchVectorDatabase(pool_maxsize=pool_maxsize, **connection)
+    try:
+        return {concurrency: await _async_throughput(vector_database, index_name, queries, k, concurrency)
+                for concurrency in concurrency_levels}
+    finally:
+        await vector_database.client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare concurrent OpenSearch search throughput per transport")
+    parser.add_argument('--opensearch-host', required=True)
+    parser.add_argument('--opensearch-serverless', action='store_true')
+    parser.add_argument('--opensearch-username')
+    parser.add_argument('--opensearch-password')
+    parser.add_argument('--region', default='us-east-1')
+    parser.add_argument('--size', type=int, default=20000)
+    parser.add_argument('--dimension', type=int, default=1024)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[8, 32, 64])
+    parser.add_argument('--pool-maxsize', type=int, default=64)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    queries = _random_unit_vectors(args.queries, args.dimension, rng)
+    connection = dict(host=args.opensearch_host, is_serverless=args.opensearch_serverless, region=args.region,
+                      username=args.opensearch_username, password=args.opensearch_password)
+
+    pooled = OpenSearchVectorDatabase(pool_maxsize=args.pool_maxsize, **connection)
+    index_name = f"benchmark-{uuid.uuid4().hex[:8]}"
+    pooled.create_index(index_name, _mapping(args.dimension), 'hnsw')
+    try:
+        bulk(pooled.client, _documents(_random_unit_vectors(args.size, args.dimension, rng), index_name), chunk_size=500, max_retries=1)
+        pooled.client.indices.refresh(index=index_name)
+        requests_client = _requests_client(args)
+        async_results = {}
+        if AsyncOpenSearch is not None:
+            async_results = asyncio.run(_async_runs(connection, args.pool_maxsize, index_name, queries, args.k, args.concurrency))
+
+        print(f"{'concurrency':>11}  {'transport':<18} {'qps':>9} {'p50 ms':>9} {'p95 ms':>9}")
+        for concurrency in args.concurrency:
+            results = {
+                'requests': _throughput(lambda q: _requests_search(requests_client, index_name, q, args.k), queries, concurrency),
+                'pooled urllib3': _throughput(lambda q: pooled.search(index_name, q, args.k), queries, concurrency)
+            }
+            if concurrency in async_results:
+                results['async aiohttp'] = async_results[concurrency]
+            for transport, result in results.items():
+                print(f"{concurrency:>11}  {transport:<18} {result['qps']:>9.1f} {result['p50']:>9.2f} {result['p95']:>9.2f}")
+    finally:
+        pooled.delete_index(index_name)
+
+
+if __name__ == '__main__':
+    main()
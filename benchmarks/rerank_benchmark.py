@@ -0,0 +1,125 @@
+"""
+Latency and ranking agreement of a local ONNX cross-encoder against a Bedrock reranking model.
+
+Both rerankers rerank the contexts an experiment retrieved for each of its questions, read from the
+question metrics table, or the questions and contexts of a JSON lines file. Every question is
+reranked by both, one after the other, so their latencies see the same load. Agreement is reported
+as the share of questions with the same top document, the overlap of the top k and Kendall's tau of
+the full rankings.
+
+    python -m benchmarks.rerank_benchmark --experiment-id ABC12345 \
+        --local local:ms-marco-MiniLM-L-6-v2 --bedrock amazon.rerank-v1:0 --region us-west-2
+    python -m benchmarks.rerank_benchmark --input questions.jsonl --local local:ms-marco-MiniLM-L-6-v2
+"""
+import argparse
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.config import Config
+from core.dynamodb import DynamoDBOperations
+from core.rerank import RerankerFactory
+
+
+def _percentiles(latencies_ms: List[float]) -> Dict[str, float]:
+    return {
+        'p50': float(np.percentile(latencies_ms, 50)),
+        'p95': float(np.percentile(latencies_ms, 95)),
+        'p99': float(np.percentile(latencies_ms, 99))
+    }
+
+
+def _experiment_questions(config: Config, experiment_id: str) -> List[Tuple[str, List[str]]]:
+    metrics_db = DynamoDBOperations(region=config.aws_region, table_name=config.experiment_question_metrics_table)
+    questions, start_key = [], None
+    while True:
+        response = metrics_db.query(
+            key_condition_expression='experiment_id = :experiment_id',
+            expression_values={':experiment_id': experiment_id},
+            index_name=config.experiment_question_metrics_experimentid_index,
+            projection='question, reference_contexts',
+            exclusive_start_key=start_key
+        )
+        questions.extend((item['question'], item.get('reference_contexts') or []) for item in response.get('Items', []))
+        start_key = response.get('LastEvaluatedKey')
+        if not start_key:
+            return questions
+
+
+def _file_questions(path: str) -> List[Tuple[str, List[str]]]:
+    with open(path, 'r') as file:
+        return [(row['question'], row['contexts']) for row in map(json.loads, file) if row.strip()]
+
+
+def _kendall_tau(first: List[str], second: List[str]) -> float:
+    """Kendall's tau of two orderings of the same texts."""
+    position = {text: i for i, text in enumerate(second)}
+    ranks = np.asarray([position[text] for text in first if text in position])
+    if len(ranks) < 2:
+        return 1.0
+    upper = np.triu_indices(len(ranks), k=1)
+    concordance = np.sign(ranks[upper[1]] - ranks[upper[0]])
+    return float(concordance.mean())
+
+
+def _time_reranker(reranker, questions: List[Tuple[str, List[str]]]) -> Tuple[List[List[str]], List[float]]:
+    rankings, latencies_ms = [], []
+    for question, contexts in questions:
+        start = time.perf_counter()
+        reranked = reranker.rerank_documents(question, [{'text': context} for context in contexts])
+        latencies_ms.append((time.perf_counter() - start) * 1000)
+        rankings.append([document['text'] for document in reranked])
+    return rankings, latencies_ms
+
+
+def benchmark(questions: List[Tuple[str, List[str]]], region: str, local_model_id: str,
+              bedrock_model_id: Optional[str], top_k: int, warmup: int = 3) -> Dict[str, Dict[str, float]]:
+    questions = [(question, contexts) for question, contexts in questions if len(contexts) > 1]
+    results = {}
+    local = RerankerFactory.create_reranker(region, local_model_id)
+    # The first runs include session initialization and allocator warm-up
+    _time_reranker(local, questions[:warmup])
+    local_rankings, local_ms = _time_reranker(local, questions)
+    results[local_model_id] = _percentiles(local_ms)
+
+    if bedrock_model_id:
+        bedrock_rankings, bedrock_ms = _time_reranker(RerankerFactory.create_reranker(region, bedrock_model_id), questions)
+        results[bedrock_model_id] = _percentiles(bedrock_ms)
+        compared = [(a, b) for a, b in zip(local_rankings, bedrock_rankings) if a and b]
+        results['agreement'] = {
+            'questions': len(compared),
+            'top1': float(np.mean([a[0] == b[0] for a, b in compared])) if compared else 0.0,
+            f'overlap@{top_k}': float(np.mean([len(set(a[:top_k]) & set(b[:top_k])) / min(top_k, len(a)) for a, b in compared])) if compared else 0.0,
+            'kendall_tau': float(np.mean([_kendall_tau(a, b) for a, b in compared])) if compared else 0.0
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--experiment-id', help="Rerank the contexts this experiment retrieved")
+    source.add_argument('--input', help="JSON lines file with 'question' and 'contexts'")
+    parser.add_argument('--local', required=True, help="Local reranker id, e.g. local:ms-marco-MiniLM-L-6-v2")
+    parser.add_argument('--bedrock', help="Bedrock reranking model id to compare with, e.g. amazon.rerank-v1:0")
+    parser.add_argument('--region', default='us-east-1')
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--limit', type=int, default=200, help="Maximum number of questions")
+    args = parser.parse_args()
+
+    config = Config.load_config()
+    questions = _experiment_questions(config, args.experiment_id) if args.experiment_id else _file_questions(args.input)
+    results = benchmark(questions[:args.limit], args.region, args.local, args.bedrock, args.top_k)
+
+    print(f"{'reranker':<40} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, latency in results.items():
+        if name != 'agreement':
+            print(f"{name:<40} {latency['p50']:>9.1f} {latency['p95']:>9.1f} {latency['p99']:>9.1f}")
+    if 'agreement' in results:
+        print(f"Agreement: {results['agreement']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Query latency of the in-process LocalVectorDatabase against OpenSearch.
+
+Random unit vectors stand in for chunk embeddings. For every size the local index is timed with exact
+NumPy search and, when faiss is installed, with its FAISS index. OpenSearch is timed only when a host
+is given; the benchmark creates, fills and deletes its own index there.
+
+    python -m benchmarks.vector_search_benchmark --sizes 10000 100000 1000000 --dimension 1024
+    python -m benchmarks.vector_search_benchmark --opensearch-host my-domain.us-east-1.es.amazonaws.com \
+        --opensearch-username admin --opensearch-password ...
+"""
+import argparse
+import time
+import uuid
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from core.local_vectorstore import LocalVectorDatabase, faiss
+
+VECTOR_FIELD = 'vectors'
+
+
+def _random_unit_vectors(count: int, dimension: int, rng: np.random.Generator) -> np.ndarray:
+    vectors = rng.standard_normal((count, dimension), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def _percentiles(latencies_ms: List[float]) -> Dict[str, float]:
+    return {
+        'p50': float(np.percentile(latencies_ms, 50)),
+        'p95': float(np.percentile(latencies_ms, 95)),
+        'p99': float(np.percentile(latencies_ms, 99))
+    }
+
+
+def _time_queries(search: Callable[[List[float]], List], queries: np.ndarray, warmup: int = 5) -> Dict[str, float]:
+    for query in queries[:warmup]:
+        search(query.tolist())
+    latencies_ms = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query.tolist())
+        latencies_ms.append((time.perf_counter() - start) * 1000)
+    return _percentiles(latencies_ms)
+
+
+def _mapping(dimension: int) -> Dict:
+    return {"properties": {VECTOR_FIELD: {"type": "knn_vector", "dimension": dimension}, "text": {"type": "text"}}}
+
+
+def _documents(vectors: np.ndarray, index_name: str):
+    for i, vector in enumerate(vectors):
+        yield {"_index": index_name, "chunk_id": str(i), "text": f"chunk {i}", VECTOR_FIELD: vector.tolist()}
+
+
+def benchmark_local(vectors: np.ndarray, queries: np.ndarray, k: int, algorithm: str) -> Dict[str, Dict[str, float]]:
+    results = {}
+    index_name = 'benchmark'
+
+    exact = LocalVectorDatabase(vector_field=VECTOR_FIELD, exact_max=len(vectors))
+    exact.create_index(index_name, _mapping(vectors.shape[1]), algorithm)
+    exact.insert_documents(index_name, _documents(vectors, index_name))
+    results['local exact'] = _time_queries(lambda q: exact.search(index_name, q, k), queries)
+
+    if faiss is not None:
+        approximate = LocalVectorDatabase(vector_field=VECTOR_FIELD, exact_max=0)
+        approximate.create_index(index_name, _mapping(vectors.shape[1]), algorithm)
+        start = time.perf_counter()
+        approximate.insert_documents(index_name, _documents(vectors, index_name))
+        print(f"  FAISS {algorithm} build: {time.perf_counter() - start:.1f}s")
+        results[f'local faiss {algorithm}'] = _time_queries(lambda q: approximate.search(index_name, q, k), queries)
+    return results
+
+
+def benchmark_opensearch(args: argparse.Namespace, vectors: np.ndarray, queries: np.ndarray, k: int) -> Dict[str, Dict[str, float]]:
+    from opensearchpy.helpers import bulk
+    from core.opensearch_vectorstore import OpenSearchVectorDatabase
+
+    vector_database = OpenSearchVectorDatabase(
+        host=args.opensearch_host,
+        is_serverless=args.opensearch_serverless,
+        region=args.region,
+        username=args.opensearch_username,
+        password=args.opensearch_password
+    )
+    index_name = f"benchmark-{uuid.uuid4().hex[:8]}"
+    vector_database.create_index(index_name, _mapping(vectors.shape[1]), args.algorithm)
+    try:
+        bulk(vector_database.client, _documents(vectors, index_name), chunk_size=500, max_retries=1)
+        vector_database.client.indices.refresh(index=index_name)
+        return {f'opensearch {args.algorithm}': _time_queries(lambda q: vector_database.search(index_name, q, k), queries)}
+    finally:
+        vector_database.delete_index(index_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare local and OpenSearch vector search latency")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--dimension', type=int, default=1024)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--algorithm', default='hnsw', choices=['hnsw', 'hnsw_sq', 'hnsw_bq', 'ivf'])
+    parser.add_argument('--opensearch-host')
+    parser.add_argument('--opensearch-serverless', action='store_true')
+    parser.add_argument('--opensearch-username')
+    parser.add_argument('--opensearch-password')
+    parser.add_argument('--region', default='us-east-1')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    queries = _random_unit_vectors(args.queries, args.dimension, rng)
+
+    print(f"{'vectors':>10}  {'backend':<24} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for size in args.sizes:
+        vectors = _random_unit_vectors(size, args.dimension, rng)
+        results = benchmark_local(vectors, queries, args.k, args.algorithm)
+        if args.opensearch_host:
+            results.update(benchmark_opensearch(args, vectors, queries, args.k))
+        for backend, latency in results.items():
+            print(f"{size:>10}  {backend:<24} {latency['p50']:>9.2f} {latency['p95']:>9.2f} {latency['p99']:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -17,6 +17,7 @@ class Config:
     experiment_table: str
     experiment_question_metrics_table: str
     experiment_question_metrics_experimentid_index: str
+    experiment_question_metrics_execution_experiment_index: str
     execution_model_invocations_table: str
     opensearch_username: Optional[str]
     opensearch_password: Optional[str]
@@ -26,6 +27,45 @@ class Config:
     bedrock_role_arn : str
     sagemaker_role_arn: str
     bedrock_limit_csv_path: str
+    experiment_index_id_index: str
+    shared_retrieval: bool
+    response_cache_dir: str
+    response_cache_max_mb: int
+    response_cache_ttl_hours: int
+    guardrail_verdict_cache: bool
+    local_vector_index_prefix: str
+    lexical_index_prefix: str
+    local_vector_exact_max: int
+    hierarchical_collapse_oversample: int
+    opensearch_pool_maxsize: int
+    opensearch_keepalive_idle: int
+    aws_max_pool_connections: int
+    aws_connect_timeout: int
+    aws_read_timeout: int
+    aws_max_attempts: int
+    rate_limit_initial_rps: float
+    rate_limit_max_rps: float
+    rate_limit_initial_concurrency: int
+    rate_limit_max_concurrency: int
+    request_token_leasing: bool
+    request_tokens_per_window: int
+    request_token_window_seconds: int
+    request_token_batch_size: int
+    dynamodb_endpoint_url: Optional[str]
+    inference_hedging: bool
+    inference_hedge_percentile: float
+    inference_hedge_min_samples: int
+    inference_hedge_region: Optional[str]
+    inference_deadline_seconds: float
+    local_vector_snapshot_dtype: str
+    vector_snapshot_cache_dir: str
+    metrics_write_queue_size: int
+    metrics_writers: int
+    local_model_dir: str
+    local_model_prefix: str
+    local_model_threads: int
+    local_model_quantize: bool
+    local_embedding_batch_size: int
 
     @staticmethod
     def load_config() -> 'Config':
@@ -49,6 +89,7 @@ class Config:
             experiment_table=os.getenv('experiment_table', ''),
             experiment_question_metrics_table=os.getenv('experiment_question_metrics_table', ''),
             experiment_question_metrics_experimentid_index = os.getenv('experiment_question_metrics_experimentid_index', ''),
+            experiment_question_metrics_execution_experiment_index=os.getenv('experiment_question_metrics_execution_experiment_index', 'execution_id-experiment_id-index'),
             execution_model_invocations_table=os.getenv('execution_model_invocations_table', ''),
             opensearch_password=os.getenv('opensearch_password', ''),
             opensearch_username=os.getenv('opensearch_username', ''),
@@ -57,7 +98,46 @@ class Config:
             s3_bucket=os.getenv('s3_bucket', ''),
             bedrock_role_arn=os.getenv('bedrock_role_arn', ''),
             sagemaker_role_arn=os.getenv('sagemaker_role_arn', ''),
-            bedrock_limit_csv_path=os.getenv('bedrock_limit_csv', '')
+            bedrock_limit_csv_path=os.getenv('bedrock_limit_csv', ''),
+            experiment_index_id_index=os.getenv('experiment_index_id_index', 'index_id-index_status-index'),
+            shared_retrieval=os.getenv('shared_retrieval', 'false').lower() == 'true',
+            response_cache_dir=os.getenv('response_cache_dir', '/tmp/response_cache'),
+            response_cache_max_mb=int(os.getenv('response_cache_max_mb', '512')),
+            response_cache_ttl_hours=int(os.getenv('response_cache_ttl_hours', '168')),
+            guardrail_verdict_cache=os.getenv('guardrail_verdict_cache', 'true').lower() == 'true',
+            local_vector_index_prefix=os.getenv('local_vector_index_prefix', 'local_vector_indices'),
+            lexical_index_prefix=os.getenv('lexical_index_prefix', 'lexical_indices'),
+            local_vector_exact_max=int(os.getenv('local_vector_exact_max', '200000')),
+            hierarchical_collapse_oversample=int(os.getenv('hierarchical_collapse_oversample', '4')),
+            opensearch_pool_maxsize=int(os.getenv('opensearch_pool_maxsize', '32')),
+            opensearch_keepalive_idle=int(os.getenv('opensearch_keepalive_idle', '60')),
+            aws_max_pool_connections=int(os.getenv('aws_max_pool_connections', '50')),
+            aws_connect_timeout=int(os.getenv('aws_connect_timeout', '10')),
+            aws_read_timeout=int(os.getenv('aws_read_timeout', '120')),
+            aws_max_attempts=int(os.getenv('aws_max_attempts', '3')),
+            rate_limit_initial_rps=float(os.getenv('rate_limit_initial_rps', '5')),
+            rate_limit_max_rps=float(os.getenv('rate_limit_max_rps', '200')),
+            rate_limit_initial_concurrency=int(os.getenv('rate_limit_initial_concurrency', '4')),
+            rate_limit_max_concurrency=int(os.getenv('rate_limit_max_concurrency', '64')),
+            request_token_leasing=os.getenv('request_token_leasing', 'false').lower() == 'true',
+            request_tokens_per_window=int(os.getenv('request_tokens_per_window', '600')),
+            request_token_window_seconds=int(os.getenv('request_token_window_seconds', '60')),
+            request_token_batch_size=int(os.getenv('request_token_batch_size', '5')),
+            dynamodb_endpoint_url=os.getenv('dynamodb_endpoint_url'),
+            inference_hedging=os.getenv('inference_hedging', 'false').lower() == 'true',
+            inference_hedge_percentile=float(os.getenv('inference_hedge_percentile', '95')),
+            inference_hedge_min_samples=int(os.getenv('inference_hedge_min_samples', '20')),
+            inference_hedge_region=os.getenv('inference_hedge_region'),
+            inference_deadline_seconds=float(os.getenv('inference_deadline_seconds', '0')),
+            local_vector_snapshot_dtype=os.getenv('local_vector_snapshot_dtype', 'float32'),
+            vector_snapshot_cache_dir=os.getenv('vector_snapshot_cache_dir', '/tmp/vector_snapshots'),
+            metrics_write_queue_size=int(os.getenv('metrics_write_queue_size', '500')),
+            metrics_writers=int(os.getenv('metrics_writers', '2')),
+            local_model_dir=os.getenv('local_model_dir', '/tmp/local_models'),
+            local_model_prefix=os.getenv('local_model_prefix', 'local_models'),
+            local_model_threads=int(os.getenv('local_model_threads', '0')),
+            local_model_quantize=os.getenv('local_model_quantize', 'false').lower() == 'true',
+            local_embedding_batch_size=int(os.getenv('local_embedding_batch_size', '32'))
             )
 
 
@@ -47,6 +47,36 @@ class ExperimentalConfig(BaseModel):
     bedrock_knowledge_base: bool = False
     knowledge_base: bool = True
     is_opensearch: bool = True
+    # Replay answers for byte-identical requests, only at temperature 0 unless sampling is allowed
+    enable_response_cache: bool = False
+    response_cache_allow_sampling: bool = False
+    # Generate answers with one Bedrock model invocation job instead of per-question converse calls
+    batch_inference: bool = False
+    # Fix the n-shot examples per experiment and mark the shared prompt prefix as a Bedrock cache point
+    prompt_caching: bool = False
+    # Generate answers with converse_stream and record time to first token and throughput
+    streaming_inference: bool = False
+    # Overlap guardrail checks with retrieval and generation instead of running them in sequence
+    speculative_guardrails: bool = False
+    # 'opensearch', 'local' for an in-process index persisted to S3 or 'bm25' for lexical retrieval without embeddings
+    vector_store: str = 'opensearch'
+    # Also build a BM25 index and fuse its results with the vector results by reciprocal rank fusion
+    lexical_fusion: bool = False
+    # Rank constant of reciprocal rank fusion
+    rrf_k: int = 60
+    # HNSW graph degree and candidate list sizes for building and searching the index
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 512
+    hnsw_ef_search: int = 100
+    # Merge overlapping chunks and drop repeated sentences before generation
+    context_packing: bool = False
+    # Estimated token limit of the packed context, 0 for no limit
+    context_token_budget: int = 0
+    # Only retrieve and score contexts locally, skipping answer generation and evaluation
+    retrieval_only: bool = False
+    # Slice of the ground truth processed by this worker when the experiment runs sharded
+    shard_index: Optional[int] = None
+    shard_count: int = 1
     class Config:
         alias_generator = lambda string: string.replace("-", "_")
         populate_by_name = True
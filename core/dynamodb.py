@@ -1,4 +1,4 @@
-import boto3
+from util.boto3_clients import get_client, get_resource
 import logging
 from typing import Dict, List, Any, Optional
 from botocore.exceptions import ClientError
@@ -23,11 +23,11 @@ class DynamoDBOperations:
         self.logger = logging.getLogger(__name__)
         
         # Initialize DynamoDB resources
-        self.dynamodb = boto3.resource('dynamodb', region_name=region)
+        self.dynamodb = get_resource('dynamodb', region)
         self.table = self.dynamodb.Table(table_name)
         
         # Initialize DynamoDB client for batch operations
-        self.dynamodb_client = boto3.client('dynamodb', region_name=region)
+        self.dynamodb_client = get_client('dynamodb', region)
 
     def _handle_decimal_type(self, obj: Any) -> Any:
         """
@@ -0,0 +1,171 @@
+import logging
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+from core.dynamodb import DynamoDBOperations
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Largest batch_write_item request
+BATCH_SIZE = 25
+
+# Errors after which a batch is retried rather than given up
+RETRYABLE_ERRORS = {
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+    "InternalServerError",
+    "ServiceUnavailable"
+}
+
+_CLOSE = object()
+
+
+class DynamoDBSinkError(Exception):
+    """Raised on close when items could not be written."""
+    pass
+
+
+class DynamoDBWriteBehindSink:
+    """
+    Writes items to a DynamoDB table from background threads.
+
+    ``put`` hands a ``to_dynamo_item()`` payload to a bounded queue and returns, so the question
+    loop goes on generating while earlier results are persisted. Writer threads drain the queue
+    into full 25-item batch_write_item requests, waiting at most ``linger_seconds`` to fill a
+    batch. Unprocessed items and throttling errors are retried after a fully jittered exponential
+    backoff, which delays only the writer that hit it. When the queue is full, ``put`` blocks,
+    so a table that cannot keep up slows the producer down instead of growing memory.
+
+    ``close`` flushes what is queued, stops the writers and raises DynamoDBSinkError if any item
+    could not be written.
+    """
+
+    def __init__(self, dynamodb: DynamoDBOperations, max_queue_size: int = 500, writers: int = 2,
+                 linger_seconds: float = 0.5, max_retries: int = 8, max_backoff: float = 20.0):
+        """
+        Args:
+            dynamodb (DynamoDBOperations): Table to write to
+            max_queue_size (int): Items queued before put blocks
+            writers (int): Number of writer threads
+            linger_seconds (float): Longest wait for a batch to fill before it is written partially
+            max_retries (int): Attempts per batch before its items count as failed
+            max_backoff (float): Upper bound of the backoff between attempts in seconds
+        """
+        self.dynamodb = dynamodb
+        self.table_name = dynamodb.table_name
+        self.client = dynamodb.dynamodb_client
+        self.linger_seconds = linger_seconds
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed_items: List[Dict[str, Any]] = []
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._writers = [
+            threading.Thread(target=self._run, name=f"dynamodb-sink-{i}", daemon=True) for i in range(max(1, writers))
+        ]
+        for writer in self._writers:
+            writer.start()
+
+    def put(self, item: Dict[str, Any]) -> None:
+        """Queue an item in DynamoDB JSON for writing, blocking while the queue is full."""
+        if self._closed:
+            raise DynamoDBSinkError(f"Sink for {self.table_name} is closed")
+        self._queue.put(self.dynamodb._handle_decimal_type(item))
+
+    def _next_batch(self) -> Optional[List[Dict[str, Any]]]:
+        """Up to 25 queued items, None once the sink is closing and nothing is left."""
+        first = self._queue.get()
+        if first is _CLOSE:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.linger_seconds
+        while len(batch) < BATCH_SIZE:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _CLOSE:
+                # Leave the marker for this writer's next round, after the batch is written
+                self._queue.put(_CLOSE)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.error(f"Could not write {len(batch)} items to {self.table_name}: {str(e)}")
+                with self._lock:
+                    self.failed_items.extend(batch)
+
+    def _backoff(self, attempt: int) -> None:
+        with self._lock:
+            self.retries += 1
+        time.sleep(random.uniform(0, min(self.max_backoff, 0.1 * 2 ** attempt)))
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        pending = batch
+        for attempt in range(self.max_retries):
+            try:
+                response = self.client.batch_write_item(
+                    RequestItems={self.table_name: [{'PutRequest': {'Item': item}} for item in pending]}
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] not in RETRYABLE_ERRORS:
+                    raise
+                self._backoff(attempt)
+                continue
+
+            unprocessed = [request['PutRequest']['Item'] for request in response.get('UnprocessedItems', {}).get(self.table_name, [])]
+            with self._lock:
+                self.written += len(pending) - len(unprocessed)
+                self.batches += 1
+            if not unprocessed:
+                return
+            pending = unprocessed
+            self._backoff(attempt)
+
+        logger.warning(f"{len(pending)} items remained unprocessed after {self.max_retries} attempts")
+        with self._lock:
+            self.failed_items.extend(pending)
+
+    def close(self) -> None:
+        """Write everything queued, stop the writers and raise if any item could not be written."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._writers:
+            self._queue.put(_CLOSE)
+        for writer in self._writers:
+            writer.join()
+        logger.info(f"Wrote {self.written} items to {self.table_name} in {self.batches} batches with {self.retries} retries")
+        if self.failed_items:
+            raise DynamoDBSinkError(f"{len(self.failed_items)} items could not be written to {self.table_name}")
+
+    def __enter__(self) -> "DynamoDBWriteBehindSink":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        try:
+            self.close()
+        except DynamoDBSinkError:
+            # Do not mask the error that ended the block
+            if exc_type is None:
+                raise
+            logger.error(f"{len(self.failed_items)} items could not be written to {self.table_name}")
@@ -18,4 +18,11 @@ model_list = [
 # Registering each model from the list into the EmbedderFactory under 'sagemaker'.
 # The `SageMakerEmbedder` will be used for embedding operations for these models.
 for model in model_list:
-    EmbedderFactory.register_embedder('sagemaker', model, SageMakerEmbedder)
\ No newline at end of file
+    EmbedderFactory.register_embedder('sagemaker', model, SageMakerEmbedder)
+
+# CPU embedders running ONNX exports of the SageMaker models inside the task, under the same model ids
+from .local import LocalOnnxEmbedder
+from .local.onnx_embedder import LOCAL_EMBEDDING_MODELS
+
+for model in LOCAL_EMBEDDING_MODELS:
+    EmbedderFactory.register_embedder('local', model, LocalOnnxEmbedder)
@@ -1,4 +1,5 @@
-import boto3
+from util.boto3_clients import get_client
+from util.rate_limiter import LIMITER_CLIENT_CONFIG
 from typing import Dict, List, Tuple, Any
 from baseclasses.base_classes import BaseEmbedder
 from util.boto3_utils import BedRockRetryHander
@@ -13,7 +14,7 @@ logger.setLevel(logging.INFO)
 class BedrockEmbedder(BaseEmbedder):
     def __init__(self, model_id: str, region: str, role_arn: str = None) -> None:
         super().__init__(model_id)
-        self.client = boto3.client("bedrock-runtime", region_name=region)
+        self.client = get_client("bedrock-runtime", region, **LIMITER_CLIENT_CONFIG)
 
     def prepare_payload(self, text: str, dimensions: int, normalize: bool) -> Dict:
         raise NotImplementedError("Subclasses must implement `prepare_payload`")
@@ -30,6 +30,8 @@ class EmbedderFactory:
             print(f"Sagemaker role: {role_arn}")
         elif experimentalConfig.embedding_service == "bedrock":
             role_arn = get_config().bedrock_role_arn
+        else:
+            role_arn = None
         embedder_cls = cls._registry.get(key)
         if not embedder_cls:
             raise ValueError(f"No embedder registered for service {service_type} and model {model_id}")
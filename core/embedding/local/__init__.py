@@ -0,0 +1 @@
+from .onnx_embedder import LocalOnnxEmbedder
@@ -0,0 +1,114 @@
+import logging
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from baseclasses.base_classes import BaseEmbedder
+from config.config import Config
+from util.local_models import LocalModelRegistry, OnnxModel
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Models with the ids of their SageMaker deployments, so an index built with either service has the
+# same dimension and can be queried with the other
+LOCAL_EMBEDDING_MODELS = {
+    "huggingface-sentencesimilarity-bge-large-en-v1-5": {
+        "model_name": "bge-large-en-v1.5",
+        "dimension": 1024,
+        "pooling": "cls"
+    },
+    "huggingface-sentencesimilarity-bge-m3": {
+        "model_name": "bge-m3",
+        "dimension": 1024,
+        "pooling": "cls"
+    }
+}
+
+
+class LocalOnnxEmbedder(BaseEmbedder):
+    """
+    Embeds on the CPU of the indexing or retrieval task with a model exported to ONNX.
+
+    Selected with the embedding service 'local'. The model directory (model.onnx and tokenizer.json,
+    see util/local_models.py) is named by ``model_name`` and loaded on the first embedding, once per
+    process for all embedder instances. embed_batch sorts texts by length before cutting them into
+    batches, so each batch pads its texts to a similar length and little compute goes to padding.
+    """
+
+    def __init__(self, model_id: str, region: str, role_arn: str = None) -> None:
+        """
+        Args:
+            model_id (str): Key of LOCAL_EMBEDDING_MODELS
+            region (str): Unused, embedders are created with the experiment's region
+            role_arn (str, optional): Unused
+        """
+        super().__init__(model_id)
+        if model_id not in LOCAL_EMBEDDING_MODELS:
+            raise ValueError(f"Unsupported local embedding model: {model_id}")
+        self.region_name = region
+        self.model_config = LOCAL_EMBEDDING_MODELS[model_id]
+        self.embedding_dimension = self.model_config['dimension']
+        self.batch_size = Config.load_config().local_embedding_batch_size
+
+    @property
+    def model(self) -> OnnxModel:
+        return LocalModelRegistry.get(self.model_config['model_name'])
+
+    def prepare_payload(self, text: str, dimensions: int = None, normalize: bool = True) -> Dict:
+        return {'texts': [text]}
+
+    def _pool(self, outputs: List[np.ndarray], attention_mask: np.ndarray) -> np.ndarray:
+        hidden = outputs[0]
+        if hidden.ndim == 2:
+            # Exported with its pooling head, the output already is the sentence embedding
+            return hidden
+        if self.model_config['pooling'] == 'mean':
+            mask = attention_mask[:, :, None].astype(hidden.dtype)
+            return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return hidden[:, 0]
+
+    def _fit_dimension(self, embeddings: np.ndarray) -> np.ndarray:
+        """Truncate or pad to the model's dimension, as SageMakerEmbedder does."""
+        width = embeddings.shape[1]
+        if width == self.embedding_dimension:
+            return embeddings
+        logger.warning(f"Embedding dimension mismatch. Expected {self.embedding_dimension}, got {width}")
+        if width > self.embedding_dimension:
+            return embeddings[:, :self.embedding_dimension]
+        return np.pad(embeddings, ((0, 0), (0, self.embedding_dimension - width)))
+
+    def embed_batch(self, texts: List[str], dimensions: int = None, normalize: bool = True) -> List[Tuple[Dict[str, Any], List[float]]]:
+        """
+        Embed texts in batches of similar length.
+
+        Args:
+            texts (List[str]): Texts to embed
+            dimensions (int, optional): Ignored, the dimension is the model's like on SageMaker
+            normalize (bool): Scale embeddings to unit length
+
+        Returns:
+            List[Tuple[Dict[str, Any], List[float]]]: Metadata and embedding of each text, in input order
+        """
+        if any(not text or not text.strip() for text in texts):
+            raise ValueError("Input text cannot be empty")
+        model = self.model
+        results: List[Tuple[Dict[str, Any], List[float]]] = [None] * len(texts)
+        order = np.argsort([len(text) for text in texts], kind='stable')
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            started = time.time()
+            features = model.encode([texts[i] for i in batch])
+            attention_mask = features.get('attention_mask', np.ones_like(features['input_ids']))
+            embeddings = self._fit_dimension(self._pool(model.run(features), attention_mask).astype(np.float32))
+            if normalize:
+                embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+            # The batch's latency is shared evenly, so summed latencies match the wall time spent
+            latency = int((time.time() - started) * 1000 / len(batch))
+            for row, i in enumerate(batch):
+                results[i] = ({'inputTokens': int(attention_mask[row].sum()), 'latencyMs': latency}, embeddings[row].tolist())
+        return results
+
+    def embed(self, text: str, dimensions: int = None, normalize: bool = True) -> Tuple[Dict[str, Any], List[float]]:
+        return self.embed_batch([text], dimensions=dimensions, normalize=normalize)[0]
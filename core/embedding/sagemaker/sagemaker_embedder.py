@@ -13,6 +13,8 @@ import logging
 import numpy as np
 import json
 import time
+from util.boto3_clients import get_client
+from util.boto3_utils import SageMakerRetryHandler
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -64,8 +66,8 @@ class SageMakerEmbedder(BaseEmbedder):
         self.role = role_arn
         
         # Initialize the SageMaker runtime and client for general operations
-        self.client = boto3.client("sagemaker-runtime", region_name=region)
-        self.sagemaker_client = boto3.client('sagemaker', region_name=region)
+        self.client = get_client("sagemaker-runtime", region)
+        self.sagemaker_client = get_client('sagemaker', region)
         
         # Create a new SageMaker session
         self.session = Session(boto_session=boto3.Session(region_name=region))
@@ -320,6 +322,10 @@ class SageMakerEmbedder(BaseEmbedder):
         else:
             logger.error(f"Model ID {model_id} is not recognized as an embedding model.")
 
+    @SageMakerRetryHandler(limiter_key_attr='embedding_model_id')
+    def _predict(self, input_data):
+        return self.embedding_predictor.predict(input_data)
+
     def embed(self, text: str, dimensions: int = 256, normalize: bool = True) -> List[float]:
         """
         Retrieves the embedding for the given input text from the model's predictor.
@@ -363,7 +369,7 @@ class SageMakerEmbedder(BaseEmbedder):
             start_time = time.time()
             
             # Make the prediction request
-            response = self.embedding_predictor.predict(input_data)
+            response = self._predict(input_data)
 
             # Calculate latency metrics
             latency = int((time.time() - start_time) * 1000)
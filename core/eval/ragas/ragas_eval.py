@@ -1,5 +1,6 @@
 from baseclasses.base_classes import BaseEvaluator, EvaluationMetrics
 from core.dynamodb import DynamoDBOperations
+from core.sharding import mean_eval_metrics, record_shard_eval_metrics
 from typing import List, Dict
 import json
 import numpy as np
@@ -26,18 +27,34 @@ class RagasEvaluator(BaseEvaluator):
         )
     
     def get_all_questions(self, experiment_id: str) -> List[Dict]:
-        """Fetch all questions for a given experiment"""
+        """Fetch all questions for a given experiment, only those of its shard when it runs sharded"""
         expression_values = {":experimentId": experiment_id}
-        return self.metrics_db.query(
-            "experiment_id = :experimentId",
-            expression_values=expression_values,
-            index_name=self.config.experiment_question_metrics_experimentid_index
-        )
+        items, start_key = [], None
+        while True:
+            response = self.metrics_db.query(
+                "experiment_id = :experimentId",
+                expression_values=expression_values,
+                index_name=self.config.experiment_question_metrics_experimentid_index,
+                exclusive_start_key=start_key
+            )
+            items.extend(response['Items'])
+            start_key = response.get('LastEvaluatedKey')
+            if not start_key:
+                break
+        shard_index = self.experimental_config.shard_index
+        if shard_index is not None:
+            items = [item for item in items if item.get('shard') is not None and int(item['shard']) == shard_index]
+        return {'Items': items}
     
     def update_experiment_metrics(self, experiment_id: str, experiment_eval_metrics: Dict[str, float]):
-        """Update overall experiment metrics"""
+        """Update overall experiment metrics, or the shard's metrics for the reducer when it runs sharded"""
         try:
-            if experiment_eval_metrics:
+            if experiment_eval_metrics and self.experimental_config.shard_index is not None:
+                if isinstance(experiment_eval_metrics, list):
+                    experiment_eval_metrics = mean_eval_metrics(experiment_eval_metrics)
+                logger.info(f"Recording metrics of shard {self.experimental_config.shard_index} of experiment {experiment_id}")
+                record_shard_eval_metrics(self.experiment_db, self.experimental_config, experiment_eval_metrics)
+            elif experiment_eval_metrics:
                 logger.info(f"Updating experiment metrics for experiment {experiment_id}")
                 self.experiment_db.update_item(
                     key={'id': experiment_id},
@@ -0,0 +1,112 @@
+import logging
+import re
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can do does for from has have how i if in into is it its may more most no not of on
+or our so such than that the their then there these they this those to was we were what when where which while who
+why will with would you your
+""".split())
+
+
+def content_tokens(text: str) -> Set[str]:
+    """Lower-cased word tokens of a text, without stopwords and single characters."""
+    return {token for token in TOKEN_PATTERN.findall((text or '').lower()) if len(token) > 1 and token not in STOPWORDS}
+
+
+class RetrievalScorer:
+    """
+    Scores retrieved contexts against the ground truth without calling a model.
+
+    The relevance of a retrieved context is the share of reference tokens it contains. The reference
+    is the question's ``reference_contexts`` when the ground truth provides them, otherwise its answer.
+    Per question:
+
+    - token_recall: share of reference tokens found in any retrieved context
+    - mrr: reciprocal rank of the first context whose relevance reaches relevance_threshold
+    - ndcg: nDCG over the retrieved ranking with the relevances as graded gains, ideal order being
+      the same contexts sorted by relevance
+
+    Questions are padded into one matrix of relevances, so ranking metrics of a whole experiment
+    are computed in a few array operations.
+    """
+
+    def __init__(self, relevance_threshold: float = 0.5):
+        """
+        Args:
+            relevance_threshold (float): Relevance from which a context counts as a hit for MRR and hit_rate
+        """
+        self.relevance_threshold = relevance_threshold
+
+    @staticmethod
+    def _relevances(reference: Set[str], contexts: List[str]) -> Tuple[np.ndarray, float]:
+        """Relevance of each context and token recall of all contexts together."""
+        if not reference or not contexts:
+            return np.zeros(len(contexts)), 0.0
+        vocabulary = {token: i for i, token in enumerate(reference)}
+        # One row per context, one column per reference token it contains
+        membership = np.zeros((len(contexts), len(vocabulary)), dtype=bool)
+        for row, context in enumerate(contexts):
+            columns = [vocabulary[token] for token in content_tokens(context) if token in vocabulary]
+            membership[row, columns] = True
+        return membership.mean(axis=1), float(membership.any(axis=0).mean())
+
+    def score(self, questions: List[Dict]) -> Tuple[List[Dict[str, float]], Dict[str, float]]:
+        """
+        Score the retrieval of every question.
+
+        Args:
+            questions (List[Dict]): Items with 'answer', 'retrieved_contexts' and optionally 'reference_contexts'
+
+        Returns:
+            Tuple[List[Dict[str, float]], Dict[str, float]]: Metrics per question and their means
+        """
+        if not questions:
+            return [], {}
+
+        depth = max((len(question.get('retrieved_contexts') or []) for question in questions), default=0)
+        relevances = np.zeros((len(questions), max(depth, 1)))
+        recalls = np.zeros(len(questions))
+        for row, question in enumerate(questions):
+            reference_contexts = question.get('reference_contexts')
+            reference = content_tokens(' '.join(reference_contexts) if reference_contexts else question.get('answer', ''))
+            contexts = question.get('retrieved_contexts') or []
+            relevances[row, :len(contexts)], recalls[row] = self._relevances(reference, contexts)
+
+        discounts = 1.0 / np.log2(np.arange(2, relevances.shape[1] + 2))
+        dcg = (relevances * discounts).sum(axis=1)
+        idcg = (-np.sort(-relevances, axis=1) * discounts).sum(axis=1)
+        ndcg = np.divide(dcg, idcg, out=np.zeros_like(dcg), where=idcg > 0)
+
+        hits = relevances >= self.relevance_threshold
+        has_hit = hits.any(axis=1)
+        mrr = np.where(has_hit, 1.0 / (hits.argmax(axis=1) + 1), 0.0)
+
+        per_question = [
+            {
+                'token_recall': round(float(recalls[i]), 4),
+                'mrr': round(float(mrr[i]), 4),
+                'ndcg': round(float(ndcg[i]), 4),
+                'hit_rate': float(has_hit[i])
+            }
+            for i in range(len(questions))
+        ]
+        return per_question, self.summarize(per_question)
+
+    @staticmethod
+    def summarize(per_question: List[Dict[str, float]]) -> Dict[str, float]:
+        """Means of per-question metrics, e.g. to combine newly scored questions with ones scored before."""
+        if not per_question:
+            return {}
+        names = ('token_recall', 'mrr', 'ndcg', 'hit_rate')
+        values = np.array([[float(metrics.get(name, 0.0)) for name in names] for metrics in per_question])
+        aggregate = {name: round(float(mean), 4) for name, mean in zip(names, values.mean(axis=0))}
+        aggregate['questions'] = len(per_question)
+        return aggregate
@@ -1,11 +1,14 @@
 from typing import List, Dict, Optional, Any
-import boto3, yaml, uuid
+import yaml, uuid
 from botocore.exceptions import ClientError
+from util.boto3_clients import get_client
+from util.boto3_utils import BedRockRetryHander
+from util.rate_limiter import LIMITER_CLIENT_CONFIG
 
 class BedrockGuardrails:
     def __init__(self, region: str = 'us-east-1'):
-        self.bedrock_client = boto3.client('bedrock', region_name = region)
-        self.runtime_client = boto3.client('bedrock-runtime', region_name = region)
+        self.bedrock_client = get_client('bedrock', region)
+        self.runtime_client = get_client('bedrock-runtime', region, **LIMITER_CLIENT_CONFIG)
 
     def create_guardrail(
         self,
@@ -34,6 +37,7 @@ class BedrockGuardrails:
             print(f"Error creating guardrail: {str(e)}")
             raise
 
+    @BedRockRetryHander()
     def apply_guardrail(
         self,
         guardrail_id: str,
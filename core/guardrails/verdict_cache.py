@@ -0,0 +1,63 @@
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from util.boto3_clients import get_client
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+class GuardrailVerdictCache:
+    """
+    Shared cache of apply_guardrail verdicts in S3.
+
+    Verdicts are keyed by guardrail id, version, source and a hash of the content blocks and hold
+    the action, outputs and assessments of the response. A numbered guardrail version is immutable,
+    so its verdicts are shared by every execution. DRAFT verdicts are scoped to the execution
+    because the draft may be edited between executions.
+    """
+
+    def __init__(self, bucket: str, execution_id: str, prefix: str = 'guardrail_verdicts'):
+        self.bucket = bucket
+        self.execution_id = execution_id
+        self.prefix = prefix
+        self.s3_client = get_client('s3')
+        self.hits = 0
+        self.misses = 0
+
+    def _object_key(self, guardrail_id: str, guardrail_version: str, source: str, content: List[Dict[str, Any]]) -> str:
+        content_hash = hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+        scope = f"{guardrail_id}/{guardrail_version}"
+        if str(guardrail_version).upper() == 'DRAFT':
+            scope = f"{scope}/{self.execution_id}"
+        return f"{self.prefix}/{scope}/{source}/{content_hash}.json"
+
+    def get(self, guardrail_id: str, guardrail_version: str, source: str, content: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Return the stored verdict for the content, or None if it was not checked yet."""
+        key = self._object_key(guardrail_id, guardrail_version, source, content)
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=key)
+            verdict = json.loads(response['Body'].read().decode('utf-8'))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+                logger.warning(f"Failed to read guardrail verdict {key}: {str(e)}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return verdict
+
+    def put(self, guardrail_id: str, guardrail_version: str, source: str, content: List[Dict[str, Any]], response: Dict[str, Any]) -> None:
+        """Store the parts of an apply_guardrail response the retrieval loop reads."""
+        key = self._object_key(guardrail_id, guardrail_version, source, content)
+        verdict = {
+            'action': response['action'],
+            'outputs': response.get('outputs', []),
+            'assessments': response.get('assessments', [])
+        }
+        try:
+            self.s3_client.put_object(Bucket=self.bucket, Key=key, Body=json.dumps(verdict, default=str), ContentType='application/json')
+        except Exception as e:
+            logger.warning(f"Failed to store guardrail verdict {key}: {str(e)}")
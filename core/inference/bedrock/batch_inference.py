@@ -0,0 +1,206 @@
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Tuple
+
+from util.boto3_clients import get_client
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Bedrock rejects model invocation jobs with fewer records than this
+BATCH_MIN_RECORDS = 100
+
+BATCH_TERMINAL_STATUSES = {"Completed", "PartiallyCompleted", "Failed", "Stopped", "Expired"}
+
+
+class BatchInferenceError(Exception):
+    """Custom exception for batch inference job errors"""
+    pass
+
+
+def _model_family(model_id: str) -> str:
+    if "anthropic." in model_id:
+        return "anthropic"
+    if "amazon.nova" in model_id:
+        return "nova"
+    raise BatchInferenceError(f"Batch inference is not supported for model {model_id}")
+
+
+def supports_batch_inference(model_id: str) -> bool:
+    try:
+        _model_family(model_id)
+        return True
+    except BatchInferenceError:
+        return False
+
+
+def build_model_input(model_id: str, system_prompt: str, messages: List[Dict[str, Any]], inference_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a converse-style prompt into the native request body a batch job expects for the model.
+
+    Args:
+        model_id (str): Bedrock model id
+        system_prompt (str): System prompt from BedrockInferencer.generate_prompt
+        messages (List[Dict[str, Any]]): Conversation messages from BedrockInferencer.generate_prompt
+        inference_config (Dict[str, Any]): maxTokens, temperature and topP
+
+    Returns:
+        Dict[str, Any]: The modelInput of a batch record
+    """
+    family = _model_family(model_id)
+    if family == "anthropic":
+        return {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": inference_config["maxTokens"],
+            "temperature": inference_config["temperature"],
+            "top_p": inference_config["topP"],
+            "system": system_prompt,
+            "messages": [
+                {
+                    "role": message["role"],
+                    "content": [{"type": "text", "text": block["text"]} for block in message["content"]]
+                }
+                for message in messages
+            ]
+        }
+    return {
+        "schemaVersion": "messages-v1",
+        "system": [{"text": system_prompt}],
+        "messages": messages,
+        "inferenceConfig": inference_config
+    }
+
+
+def parse_model_output(model_id: str, model_output: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+    """Return (metadata, answer) from the native response body of a batch record."""
+    family = _model_family(model_id)
+    if family == "anthropic":
+        answer = "".join(block.get("text", "") for block in model_output.get("content", []))
+        usage = model_output.get("usage", {})
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+    else:
+        answer = model_output["output"]["message"]["content"][0]["text"]
+        usage = model_output.get("usage", {})
+        input_tokens = usage.get("inputTokens", 0)
+        output_tokens = usage.get("outputTokens", 0)
+
+    metadata = {
+        "inputTokens": input_tokens,
+        "outputTokens": output_tokens,
+        "totalTokens": input_tokens + output_tokens
+    }
+    return metadata, answer
+
+
+class BatchInferenceJobClient(ABC):
+    """Abstract client that runs a model invocation job over a list of records."""
+
+    @abstractmethod
+    def submit_job(self, job_name: str, model_id: str, records: List[Dict[str, Any]]) -> str:
+        """Submit the records and return the job id."""
+        pass
+
+    @abstractmethod
+    def get_job_status(self, job_id: str) -> str:
+        """Return the Bedrock job status, e.g. InProgress or Completed."""
+        pass
+
+    @abstractmethod
+    def get_job_results(self, job_id: str) -> Dict[str, Dict[str, Any]]:
+        """Return the output records of a finished job keyed by recordId."""
+        pass
+
+    def wait_for_job(self, job_id: str, poll_interval: int = 60) -> str:
+        """Poll until the job reaches a terminal status and return it."""
+        while True:
+            status = self.get_job_status(job_id)
+            if status in BATCH_TERMINAL_STATUSES:
+                logger.info(f"Batch inference job {job_id} finished with status {status}")
+                return status
+            logger.info(f"Batch inference job {job_id} is {status}, checking again in {poll_interval} seconds")
+            time.sleep(poll_interval)
+
+
+class BedrockBatchInferenceJobClient(BatchInferenceJobClient):
+    """Runs model invocation jobs on Amazon Bedrock with the JSONL input and output staged in S3."""
+
+    def __init__(self, region: str, role_arn: str, bucket: str, prefix: str):
+        self.role_arn = role_arn
+        self.bucket = bucket
+        self.prefix = prefix
+        self.bedrock_client = get_client('bedrock', region)
+        self.s3_client = get_client('s3')
+
+    def submit_job(self, job_name: str, model_id: str, records: List[Dict[str, Any]]) -> str:
+        input_key = f"{self.prefix}/{job_name}/input.jsonl"
+        body = "\n".join(json.dumps(record) for record in records)
+        self.s3_client.put_object(Bucket=self.bucket, Key=input_key, Body=body)
+
+        response = self.bedrock_client.create_model_invocation_job(
+            jobName=job_name,
+            roleArn=self.role_arn,
+            modelId=model_id,
+            inputDataConfig={"s3InputDataConfig": {"s3Uri": f"s3://{self.bucket}/{input_key}"}},
+            outputDataConfig={"s3OutputDataConfig": {"s3Uri": f"s3://{self.bucket}/{self.prefix}/{job_name}/output/"}}
+        )
+        logger.info(f"Submitted batch inference job {job_name} with {len(records)} records")
+        return response['jobArn']
+
+    def get_job_status(self, job_id: str) -> str:
+        response = self.bedrock_client.get_model_invocation_job(jobIdentifier=job_id)
+        status = response['status']
+        if status == "Failed":
+            logger.error(f"Batch inference job {job_id} failed: {response.get('message')}")
+        return status
+
+    def get_job_results(self, job_id: str) -> Dict[str, Dict[str, Any]]:
+        response = self.bedrock_client.get_model_invocation_job(jobIdentifier=job_id)
+        output_uri = response['outputDataConfig']['s3OutputDataConfig']['s3Uri']
+        output_prefix = output_uri.replace(f"s3://{self.bucket}/", "", 1)
+
+        results = {}
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=output_prefix):
+            for obj in page.get('Contents', []):
+                if not obj['Key'].endswith('.jsonl.out'):
+                    continue
+                content = self.s3_client.get_object(Bucket=self.bucket, Key=obj['Key'])['Body'].read().decode('utf-8')
+                for line in content.splitlines():
+                    if line.strip():
+                        record = json.loads(line)
+                        results[record['recordId']] = record
+        return results
+
+
+class LocalBatchInferenceJobClient(BatchInferenceJobClient):
+    """
+    In-memory stand-in for Bedrock batch jobs, for running the batch flow off-cloud.
+
+    ``generate`` receives the model id and a record's modelInput and returns the native modelOutput.
+    Jobs complete synchronously on submission.
+    """
+
+    def __init__(self, generate: Callable[[str, Dict[str, Any]], Dict[str, Any]]):
+        self.generate = generate
+        self.jobs: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def submit_job(self, job_name: str, model_id: str, records: List[Dict[str, Any]]) -> str:
+        outputs = {}
+        for record in records:
+            output = {"recordId": record["recordId"], "modelInput": record["modelInput"]}
+            try:
+                output["modelOutput"] = self.generate(model_id, record["modelInput"])
+            except Exception as e:
+                output["error"] = {"errorCode": 500, "errorMessage": str(e)}
+            outputs[record["recordId"]] = output
+        self.jobs[job_name] = outputs
+        return job_name
+
+    def get_job_status(self, job_id: str) -> str:
+        return "Completed" if job_id in self.jobs else "Failed"
+
+    def get_job_results(self, job_id: str) -> Dict[str, Dict[str, Any]]:
+        return self.jobs.get(job_id, {})
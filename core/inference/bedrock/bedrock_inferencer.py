@@ -1,15 +1,32 @@
 from baseclasses.base_classes import BaseInferencer
-import boto3
-from typing import List, Dict, Any, Union, Tuple
+from config.config import Config
+from util.boto3_clients import get_client
+from typing import List, Dict, Any, Union, Tuple, Iterator
 import logging
 from config.experimental_config import ExperimentalConfig, NShotPromptGuide
 from core.inference.inference_factory import InferencerFactory
+from core.inference.response_cache import ResponseCache
 from util.boto3_utils import BedRockRetryHander
+from util.hedging import HedgingRegistry
+from util.rate_limiter import LIMITER_CLIENT_CONFIG
+from util.stage_timer import record_stage
 import random
+import time
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Models that accept cachePoint blocks in the converse API
+PROMPT_CACHE_MODELS = {
+    "us.anthropic.claude-3-7-sonnet-20250219-v1:0",
+    "us.anthropic.claude-3-5-haiku-20241022-v1:0",
+    "us.amazon.nova-micro-v1:0",
+    "us.amazon.nova-lite-v1:0",
+    "us.amazon.nova-pro-v1:0"
+}
+
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+
 # Class for handling inference using Amazon Bedrock 
 class BedrockInferencer(BaseInferencer):
     """Base class for all Bedrock models since they share the same invocation pattern"""
@@ -20,11 +37,26 @@ class BedrockInferencer(BaseInferencer):
     def __init__(self, model_id: str, experiment_config: ExperimentalConfig, region: str = 'us-east-1', role_arn: str = None):
         super().__init__(model_id, experiment_config, region, role_arn)
         self._initialize_client() 
+        self.response_cache = ResponseCache.for_experiment(experiment_config)
+        self.prompt_caching = experiment_config.prompt_caching
+        self._fixed_examples = None
+        if self.prompt_caching and model_id not in PROMPT_CACHE_MODELS:
+            logger.warning(f"{model_id} does not support prompt caching, only the n-shot examples will be fixed")
     
     def _initialize_client(self) -> None:
-        self.client = boto3.client(
-            service_name='bedrock-runtime',
-            region_name=self.region_name
+        self.client = get_client('bedrock-runtime', self.region_name, **LIMITER_CLIENT_CONFIG)
+        self.hedged_caller = HedgingRegistry.get(f"bedrock:{self.model_id}")
+        # Hedges go to the same model in another region when one is configured, else they resend the request on the same client
+        hedge_region = Config.load_config().inference_hedge_region
+        self.hedge_client = get_client('bedrock-runtime', hedge_region, **LIMITER_CLIENT_CONFIG) if hedge_region else self.client
+
+    def _converse(self, request_params: Dict[str, Any]) -> Dict[str, Any]:
+        """Call converse, hedged and bounded by the inference deadline when configured."""
+        if self.hedged_caller is None:
+            return self.client.converse(**request_params)
+        return self.hedged_caller.call(
+            lambda: self.client.converse(**request_params),
+            lambda: self.hedge_client.converse(**request_params)
         )
 
     def generate_prompt(self, experiment_config: ExperimentalConfig, default_prompt: str, user_query: str, context: List[Dict] = None) -> Tuple[str, List[Dict[str, Any]]]:
@@ -37,7 +69,8 @@ class BedrockInferencer(BaseInferencer):
         context_text = ""
         if context:
             context_text = self._format_context(context)
-            if context_text:
+            # With prompt caching the per-question context moves after the examples to keep the prefix stable
+            if context_text and not self.prompt_caching:
                 messages.append(self._prepare_conversation(role="user", message=context_text))
 
         # Input validation
@@ -54,9 +87,7 @@ class BedrockInferencer(BaseInferencer):
         examples = n_shot_prompt_guide.examples
         
         # Format examples
-        selected_examples = (random.sample(examples, n_shot_prompt) 
-                        if len(examples) > n_shot_prompt 
-                        else examples)
+        selected_examples = self._select_examples(examples or [], n_shot_prompt)
         
         # Use string concatenation for example formatting
         for example in selected_examples:
@@ -69,49 +100,162 @@ class BedrockInferencer(BaseInferencer):
         logger.info(f"into {n_shot_prompt} shot prompt  with examples {len(selected_examples)}")
 
         # Add the current user prompt
-        messages.append(self._prepare_conversation(role="user", message=user_query))
+        if self.prompt_caching and context_text:
+            messages.append(self._prepare_conversation(role="user", message=context_text + user_query))
+        else:
+            messages.append(self._prepare_conversation(role="user", message=user_query))
         
         return system_prompt, messages
+
+    def _select_examples(self, examples: List[Dict[str, str]], n_shot_prompt: int) -> List[Dict[str, str]]:
+        """Pick the n-shot examples, once per experiment when prompt caching is enabled."""
+        if len(examples) <= n_shot_prompt:
+            return examples
+        if not self.prompt_caching:
+            return random.sample(examples, n_shot_prompt)
+        if self._fixed_examples is None:
+            # Seeded by the experiment so every question, retry and task shares one prefix
+            self._fixed_examples = random.Random(self.experiment_config.experiment_id).sample(examples, n_shot_prompt)
+        return self._fixed_examples
+
+    def _add_cache_points(self, request_params: Dict[str, Any]) -> None:
+        """Mark the system prompt and every message before the current question as cacheable."""
+        if "system" in request_params:
+            request_params["system"] = request_params["system"] + [CACHE_POINT]
+        messages = request_params["messages"]
+        if len(messages) > 1:
+            prefix_end = messages[-2]
+            messages[-2] = {"role": prefix_end["role"], "content": prefix_end["content"] + [CACHE_POINT]}
      
+    def get_inference_config(self) -> Dict[str, Any]:
+        """Return the inferenceConfig used for every answer generation request."""
+        return {
+            "maxTokens": 512, 
+            "temperature": self.experiment_config.temp_retrieval_llm, 
+            "topP": 0.9
+        }
+
+    def _build_request(self, user_query: str, default_prompt: str, context: List[Dict] = None) -> Dict[str, Any]:
+        """Build the converse request for a question, shared by the blocking and streaming paths."""
+        # Code to generate prompt considering the upload prompt config file
+        with record_stage('prompt_construction'):
+            system_prompt, messages = self.generate_prompt(self.experiment_config, default_prompt, user_query, context)
+
+        skip_system_param = self.model_id in ("amazon.titan-text-express-v1", "amazon.titan-text-lite-v1", "mistral.mistral-7b-instruct-v0:2")
+
+        request_params = {
+            "modelId": self.model_id,
+            "messages": ([self._prepare_conversation(role="user", message=system_prompt)] if skip_system_param else []) + messages,
+            "inferenceConfig": self.get_inference_config()
+        }
+        
+        # Add system parameter only for non-Titan-v1 models
+        #TODO: Short-term fix, will be addressed using inheritence as part of refactoring
+        if not skip_system_param:
+            request_params["system"] = [{"text" : system_prompt}]
+
+        if self._uses_cache_points():
+            self._add_cache_points(request_params)
+        return request_params
+
+    def _uses_cache_points(self) -> bool:
+        return self.prompt_caching and self.model_id in PROMPT_CACHE_MODELS
+
     @BedRockRetryHander()
     def generate_text(self, user_query: str, default_prompt: str, context: List[Dict] = None, **kwargs) -> Tuple[Dict[Any, Any], str]:
         try:
-            # Code to generate prompt considering the upload prompt config file
-            system_prompt, messages = self.generate_prompt(self.experiment_config, default_prompt, user_query, context)
+            request_params = self._build_request(user_query, default_prompt, context)
 
-            inference_config = {
-                "maxTokens": 512, 
-                "temperature": self.experiment_config.temp_retrieval_llm, 
-                "topP": 0.9
-            }
-            
-            skip_system_param = self.model_id in ("amazon.titan-text-express-v1", "amazon.titan-text-lite-v1", "mistral.mistral-7b-instruct-v0:2")
+            cache_key = None
+            if self.response_cache:
+                cache_key = ResponseCache.make_key(self.model_id, request_params.get("system"), request_params["messages"], request_params["inferenceConfig"])
+                cached = self.response_cache.get(cache_key)
+                if cached:
+                    logger.info("Serving answer from response cache")
+                    return cached
 
-            request_params = {
-                "modelId": self.model_id,
-                "messages": ([self._prepare_conversation(role="user", message=system_prompt)] if skip_system_param else []) + messages,
-                "inferenceConfig": inference_config
-            }
-            
-            # Add system parameter only for non-Titan-v1 models
-            #TODO: Short-term fix, will be addressed using inheritence as part of refactoring
-            if not skip_system_param:
-                request_params["system"] = [{"text" : system_prompt}]
-            
-            response = self.client.converse(**request_params)
-           
-            metadata = {}
-            if 'usage' in response:
-                for key, value in response['usage'].items():
-                    metadata[key] = value
-            if 'metrics' in response:
-                for key, value in response['metrics'].items():
-                    metadata[key] = value
-            return metadata, self._extract_response(response)
+            if self.experiment_config.streaming_inference:
+                metadata, answer = self._consume_stream(request_params)
+            else:
+                response = self._converse(request_params)
+               
+                metadata = {}
+                if 'usage' in response:
+                    for key, value in response['usage'].items():
+                        metadata[key] = value
+                if 'metrics' in response:
+                    for key, value in response['metrics'].items():
+                        metadata[key] = value
+                answer = self._extract_response(response)
+            if self._uses_cache_points():
+                metadata.setdefault('cacheReadInputTokens', 0)
+                metadata.setdefault('cacheWriteInputTokens', 0)
+            if cache_key:
+                self.response_cache.put(cache_key, metadata, answer)
+            return metadata, answer
         except Exception as e:
             logger.error(f"Error generating text with Bedrock: {str(e)}")
             raise
 
+    def generate_text_stream(self, user_query: str, default_prompt: str, context: List[Dict] = None, **kwargs) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the answer with converse_stream.
+
+        Yields ``{"type": "text", "text": ...}`` events as text arrives and a final
+        ``{"type": "metadata", "metadata": ...}`` event with token usage, time to first
+        token, total latency and output tokens per second.
+
+        Args:
+            user_query (str): The question
+            default_prompt (str): System prompt used when the n-shot guide has none
+            context (List[Dict], optional): Retrieved documents
+
+        Yields:
+            Dict[str, Any]: Text and metadata events
+        """
+        request_params = self._build_request(user_query, default_prompt, context)
+        yield from self._stream_events(request_params)
+
+    def _stream_events(self, request_params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        start_time = time.perf_counter()
+        first_token_time = None
+        metadata = {}
+
+        response = self.client.converse_stream(**request_params)
+        for event in response['stream']:
+            if 'contentBlockDelta' in event:
+                text = event['contentBlockDelta']['delta'].get('text')
+                if text:
+                    if first_token_time is None:
+                        first_token_time = time.perf_counter()
+                    yield {"type": "text", "text": text}
+            elif 'metadata' in event:
+                for key, value in event['metadata'].get('usage', {}).items():
+                    metadata[key] = value
+                for key, value in event['metadata'].get('metrics', {}).items():
+                    metadata[key] = value
+
+        end_time = time.perf_counter()
+        total_latency_ms = (end_time - start_time) * 1000
+        metadata['timeToFirstTokenMs'] = round(((first_token_time or end_time) - start_time) * 1000, 2)
+        metadata['totalLatencyMs'] = round(total_latency_ms, 2)
+        generation_seconds = end_time - (first_token_time or start_time)
+        output_tokens = metadata.get('outputTokens', 0)
+        metadata['outputTokensPerSecond'] = round(output_tokens / generation_seconds, 2) if generation_seconds > 0 else 0
+        yield {"type": "metadata", "metadata": metadata}
+
+    def _consume_stream(self, request_params: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        """Assemble a streamed answer and its metadata."""
+        chunks = []
+        metadata = {}
+        for event in self._stream_events(request_params):
+            if event["type"] == "text":
+                chunks.append(event["text"])
+            else:
+                metadata = event["metadata"]
+        logger.info(f"Streamed response, time to first token {metadata.get('timeToFirstTokenMs')} ms")
+        return metadata, "".join(chunks)
+
     def _prepare_conversation(self, message: str, role: str):
         # Format message and role into a conversation
         if not message or not role:
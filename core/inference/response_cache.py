@@ -0,0 +1,207 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from util.boto3_clients import get_client
+from botocore.exceptions import ClientError
+
+from config.config import Config
+from config.experimental_config import ExperimentalConfig
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+class LocalDiskCacheTier:
+    """Response cache tier on local disk, with TTL expiry and least-recently-used size eviction."""
+
+    def __init__(self, directory: str, max_bytes: int, ttl_seconds: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._entries())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _entries(self) -> List[Tuple[str, int, float]]:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _remove(self, path: str) -> None:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            self._total_bytes -= size
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path, 'r') as file:
+                    entry = json.load(file)
+            except (OSError, ValueError):
+                return None
+
+            if time.time() - entry.get('created_at', 0) > self.ttl_seconds:
+                self._remove(path)
+                return None
+
+            # Touch the entry so size eviction drops the least recently used ones first
+            os.utime(path, None)
+            return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        path = self._path(key)
+        body = json.dumps(entry)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                self._remove(path)
+            with open(path, 'w') as file:
+                file.write(body)
+            self._total_bytes += len(body.encode('utf-8'))
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        for path, _, _ in sorted(self._entries(), key=lambda entry: entry[2]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._remove(path)
+
+
+class S3CacheTier:
+    """Response cache tier in S3, shared by every task of every execution. Entries expire after the TTL."""
+
+    def __init__(self, bucket: str, prefix: str, ttl_seconds: int):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self.s3_client = get_client('s3')
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+            entry = json.loads(response['Body'].read().decode('utf-8'))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+                logger.warning(f"Failed to read response cache entry {key}: {str(e)}")
+            return None
+
+        if time.time() - entry.get('created_at', 0) > self.ttl_seconds:
+            return None
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        self.s3_client.put_object(
+            Bucket=self.bucket,
+            Key=self._object_key(key),
+            Body=json.dumps(entry),
+            ContentType='application/json'
+        )
+
+
+class ResponseCache:
+    """
+    Deterministic cache of generated answers, checked in front of the model invocation.
+
+    Entries are keyed by a hash of the full request (model id, system prompt, messages and
+    inference configuration) and hold the answer together with its usage metadata, so token
+    counts and cost accounting are unchanged when an answer is served from the cache.
+    Lookups go to the local disk tier first and fall back to S3, promoting S3 hits locally.
+    """
+
+    def __init__(self, tiers: List[Any]):
+        self.tiers = tiers
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def is_enabled(experiment_config: ExperimentalConfig) -> bool:
+        """A cached answer is only a faithful replay when sampling is greedy, unless the user allows it."""
+        if not experiment_config.enable_response_cache:
+            return False
+        return float(experiment_config.temp_retrieval_llm) == 0 or experiment_config.response_cache_allow_sampling
+
+    @classmethod
+    def for_experiment(cls, experiment_config: ExperimentalConfig) -> Optional['ResponseCache']:
+        """Build the cache configured for this process, or None if the experiment does not use it."""
+        if not cls.is_enabled(experiment_config):
+            return None
+
+        config = Config.load_config()
+        ttl_seconds = config.response_cache_ttl_hours * 3600
+        tiers = [
+            LocalDiskCacheTier(
+                directory=config.response_cache_dir,
+                max_bytes=config.response_cache_max_mb * 1024 * 1024,
+                ttl_seconds=ttl_seconds
+            )
+        ]
+        if config.s3_bucket:
+            tiers.append(S3CacheTier(bucket=config.s3_bucket, prefix='response_cache', ttl_seconds=ttl_seconds))
+        logger.info(f"Response cache enabled for experiment {experiment_config.experiment_id} with {len(tiers)} tiers")
+        return cls(tiers)
+
+    @staticmethod
+    def make_key(model_id: str, system: Any, messages: Any, inference_config: Dict[str, Any]) -> str:
+        request = {
+            'model_id': model_id,
+            'system': system,
+            'messages': messages,
+            'inference_config': inference_config
+        }
+        serialized = json.dumps(request, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Return (metadata, answer) for the request key, or None on a miss."""
+        for position, tier in enumerate(self.tiers):
+            try:
+                entry = tier.get(key)
+            except Exception as e:
+                logger.warning(f"Response cache tier {type(tier).__name__} failed on read: {str(e)}")
+                continue
+            if entry is None:
+                continue
+
+            for upper_tier in self.tiers[:position]:
+                self._safe_put(upper_tier, key, entry)
+            self.hits += 1
+            metadata = dict(entry['metadata'])
+            metadata['responseCacheHit'] = 1
+            return metadata, entry['answer']
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, metadata: Dict[str, Any], answer: str) -> None:
+        entry = {'created_at': time.time(), 'metadata': metadata, 'answer': answer}
+        for tier in self.tiers:
+            self._safe_put(tier, key, entry)
+
+    def _safe_put(self, tier: Any, key: str, entry: Dict[str, Any]) -> None:
+        try:
+            tier.put(key, entry)
+        except Exception as e:
+            logger.warning(f"Response cache tier {type(tier).__name__} failed on write: {str(e)}")
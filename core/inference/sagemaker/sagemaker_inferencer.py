@@ -3,6 +3,7 @@ from typing import List, Dict
 from botocore.exceptions import ClientError
 from baseclasses.base_classes import BaseInferencer
 from config.experimental_config import ExperimentalConfig
+from core.inference.response_cache import ResponseCache
 from sagemaker.session import Session
 from sagemaker.predictor import Predictor
 from sagemaker.serializers import JSONSerializer
@@ -14,6 +15,9 @@ import logging
 import time
 import random
 import json
+from util.boto3_clients import get_client
+from util.boto3_utils import SageMakerRetryHandler
+from util.hedging import HedgingRegistry
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -80,8 +84,8 @@ class SageMakerInferencer(BaseInferencer):
         logger.info(f"Initializing SageMaker Generator for model: {model_id}")
 
         # Initialize the SageMaker runtime and client for general operations
-        self.client = boto3.client("sagemaker-runtime", region_name=region)
-        self.sagemaker_client = boto3.client('sagemaker', region_name=region)
+        self.client = get_client("sagemaker-runtime", region)
+        self.sagemaker_client = get_client('sagemaker', region)
         
         # Create a new SageMaker session
         self.session = Session(boto_session=boto3.Session(region_name=region))
@@ -106,6 +110,12 @@ class SageMakerInferencer(BaseInferencer):
         self.predictor.deserializer = JSONDeserializer()
 
         self.inferencing_predictor = self.predictor
+
+        # Hedged requests go to the same endpoint, which routes them to another instance when it has several
+        self.hedged_caller = HedgingRegistry.get(f"sagemaker:{self.inferencing_model_id}")
+
+        # Optional cache of answers for byte-identical requests
+        self.response_cache = ResponseCache.for_experiment(experiment_config)
         
         # Log initialization success
         logger.info(f"Initialized SageMakerInferencer for model {model_id} in region {region}.")
@@ -433,6 +443,12 @@ class SageMakerInferencer(BaseInferencer):
             return formatted_context
         
 
+    @SageMakerRetryHandler(limiter_key_attr='inferencing_model_id')
+    def _predict(self, payload):
+        if self.hedged_caller is None:
+            return self.inferencing_predictor.predict(payload)
+        return self.hedged_caller.call(lambda: self.inferencing_predictor.predict(payload))
+
     def generate_text(self, user_query: str, default_prompt: str, context: List[Dict] = None, **kwargs) -> str:
         """
         Generates a response based on the provided user query and context. It formats the context, sends it to 
@@ -468,11 +484,19 @@ class SageMakerInferencer(BaseInferencer):
             "parameters": default_params
         }
 
+        cache_key = None
+        if self.response_cache:
+            cache_key = ResponseCache.make_key(self.inferencing_model_id, None, prompt, default_params)
+            cached = self.response_cache.get(cache_key)
+            if cached:
+                logger.info("Serving answer from response cache")
+                return cached
+
         try:
             start_time = time.time()
             
             # Get response from the model
-            response = self.inferencing_predictor.predict(payload)
+            response = self._predict(payload)
 
             # Calculate latency metrics
             latency = int((time.time() - start_time) * 1000)
@@ -514,6 +538,9 @@ class SageMakerInferencer(BaseInferencer):
                 'totalTokens': total_tokens,
                 'latencyMs': latency
             }
+
+            if cache_key:
+                self.response_cache.put(cache_key, answer_metadata, cleaned_response)
             
             return answer_metadata, cleaned_response
 
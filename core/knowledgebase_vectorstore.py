@@ -1,5 +1,5 @@
 from typing import List, Dict, Any, Union
-import boto3
+from util.boto3_clients import get_client
 import logging
 from baseclasses.base_classes import VectorDatabase
 from config.config import Config
@@ -9,7 +9,7 @@ logger.setLevel(logging.INFO)
 
 class KnowledgeBaseVectorDatabase(VectorDatabase):
     def __init__(self, region: str = 'us-east-1'):
-        self.client = boto3.client("bedrock-agent-runtime", region_name=region)
+        self.client = get_client("bedrock-agent-runtime", region)
         
     def create_index(self, index_name: str, mapping: Dict[str, Any], algorithm: str) -> None:
         raise NotImplementedError("This method is not implemented in this minimal version.")
@@ -0,0 +1,336 @@
+import json
+import logging
+import mmap
+import os
+import re
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from baseclasses.base_classes import VectorDatabase
+from core.local_vectorstore import LocalVectorDatabase
+from core.vector_snapshot import (
+    MANIFEST_FILE, OFFSETS_FILE, RECORDS_FILE, SnapshotDocuments, download_snapshot, map_records, upload_snapshot
+)
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+LEXICAL_FORMAT_VERSION = 1
+
+# Files of a lexical index besides the document records shared with vector snapshots
+VOCABULARY_FILE = 'vocabulary.bin'        # sorted fixed-width ASCII terms
+TERM_OFFSETS_FILE = 'term_offsets.bin'    # terms + 1 uint64 offsets into the postings
+POSTINGS_DOCS_FILE = 'postings_docs.bin'  # uint32 document of each posting, ascending per term
+POSTINGS_TF_FILE = 'postings_tf.bin'      # uint16 term frequency of each posting
+DOC_LENGTHS_FILE = 'doc_lengths.bin'      # uint32 number of terms of each document
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+# Longer tokens are hashes, URLs and the like, which only widen the vocabulary array
+MAX_TERM_LENGTH = 32
+
+# Lucene's defaults, which OpenSearch uses for text fields
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Rank constant from the reciprocal rank fusion paper, also OpenSearch's default
+RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased alphanumeric terms of a text."""
+    return [token for token in TOKEN_PATTERN.findall((text or '').lower()) if len(token) <= MAX_TERM_LENGTH]
+
+
+class BM25Index:
+    """
+    Inverted index of one lexical index, scored with Okapi BM25.
+
+    Postings are stored term by term in flat arrays addressed through ``term_offsets``, and the
+    vocabulary is a sorted fixed-width array looked up with a binary search, so the index holds no
+    Python objects per term or posting and scoring a query term is a few array operations over its
+    postings. Loaded indices memory-map their files like vector snapshots.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = np.zeros(0, dtype='S1')
+        self.term_offsets = np.zeros(1, dtype=np.uint64)
+        self.postings_docs = np.zeros(0, dtype=np.uint32)
+        self.postings_tf = np.zeros(0, dtype=np.uint16)
+        self.doc_lengths = np.zeros(0, dtype=np.uint32)
+        self.documents: Sequence[Dict[str, Any]] = []
+        self.read_only = False
+        self._tokens: List[List[str]] = []
+        self._stale = False
+        self._idf = np.zeros(0, dtype=np.float32)
+        self._length_norm = np.zeros(0, dtype=np.float32)
+
+    def add(self, text: str, document: Dict[str, Any]) -> None:
+        if self.read_only:
+            raise ValueError("Lexical indices loaded from S3 are read-only")
+        self._tokens.append(tokenize(text))
+        self.documents.append(document)
+        self._stale = True
+
+    def build(self) -> None:
+        """Build the postings of all documents added so far."""
+        if not self._stale:
+            return
+        lengths = np.fromiter((len(tokens) for tokens in self._tokens), dtype=np.int64, count=len(self._tokens))
+        terms = np.array([token for tokens in self._tokens for token in tokens], dtype='S')
+        if len(terms) == 0:
+            terms = np.zeros(0, dtype='S1')
+        doc_ids = np.repeat(np.arange(len(lengths), dtype=np.int64), lengths)
+
+        self.vocabulary, term_ids = np.unique(terms, return_inverse=True)
+        # One key per (term, document) pair sorts the postings by term, then by document
+        pairs, tf = np.unique(term_ids.astype(np.int64) * max(len(lengths), 1) + doc_ids, return_counts=True)
+        posting_terms = pairs // max(len(lengths), 1)
+        self.postings_docs = (pairs % max(len(lengths), 1)).astype(np.uint32)
+        self.postings_tf = np.minimum(tf, np.iinfo(np.uint16).max).astype(np.uint16)
+        self.term_offsets = np.concatenate([[0], np.cumsum(np.bincount(posting_terms, minlength=len(self.vocabulary)))]).astype(np.uint64)
+        self.doc_lengths = lengths.astype(np.uint32)
+        self._prepare_scoring()
+        self._stale = False
+
+    def _prepare_scoring(self) -> None:
+        count = len(self.doc_lengths)
+        document_frequency = np.diff(self.term_offsets.astype(np.int64)).astype(np.float32)
+        self._idf = np.log1p((count - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        average_length = float(self.doc_lengths.mean()) if count else 0.0
+        self._length_norm = (self.k1 * (1 - self.b + self.b * self.doc_lengths / max(average_length, 1e-9))).astype(np.float32)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every document for the query."""
+        scores = np.zeros(len(self.doc_lengths), dtype=np.float32)
+        # Terms wider than the vocabulary cannot be in it and would match truncated
+        width = self.vocabulary.dtype.itemsize
+        terms = np.array(sorted({token for token in tokenize(query) if len(token) <= width}), dtype=self.vocabulary.dtype)
+        if len(terms) == 0 or len(self.vocabulary) == 0:
+            return scores
+        positions = np.searchsorted(self.vocabulary, terms)
+        found = positions < len(self.vocabulary)
+        found[found] = self.vocabulary[positions[found]] == terms[found]
+        for term_id in positions[found]:
+            start, end = int(self.term_offsets[term_id]), int(self.term_offsets[term_id + 1])
+            docs = self.postings_docs[start:end]
+            tf = self.postings_tf[start:end].astype(np.float32)
+            scores[docs] += self._idf[term_id] * tf * (self.k1 + 1) / (tf + self._length_norm[docs])
+        return scores
+
+    def save(self, directory: str) -> None:
+        """Write the index and its documents into a directory, the manifest last."""
+        self.build()
+        os.makedirs(directory, exist_ok=True)
+        arrays = {
+            VOCABULARY_FILE: self.vocabulary,
+            TERM_OFFSETS_FILE: self.term_offsets.astype('<u8'),
+            POSTINGS_DOCS_FILE: self.postings_docs.astype('<u4'),
+            POSTINGS_TF_FILE: self.postings_tf.astype('<u2'),
+            DOC_LENGTHS_FILE: self.doc_lengths.astype('<u4')
+        }
+        for name, array in arrays.items():
+            with open(os.path.join(directory, name), 'wb') as file:
+                file.write(np.ascontiguousarray(array).tobytes())
+
+        offsets = [0]
+        with open(os.path.join(directory, RECORDS_FILE), 'wb') as file:
+            for document in self.documents:
+                record = json.dumps(document, default=str).encode('utf-8')
+                file.write(record)
+                offsets.append(offsets[-1] + len(record))
+        with open(os.path.join(directory, OFFSETS_FILE), 'wb') as file:
+            file.write(np.asarray(offsets, dtype='<u8').tobytes())
+
+        manifest = {
+            'format_version': LEXICAL_FORMAT_VERSION,
+            'count': len(self.doc_lengths),
+            'terms': len(self.vocabulary),
+            'postings': len(self.postings_docs),
+            'term_width': self.vocabulary.dtype.itemsize,
+            'k1': self.k1,
+            'b': self.b,
+            'files': list(arrays) + [RECORDS_FILE, OFFSETS_FILE]
+        }
+        with open(os.path.join(directory, MANIFEST_FILE), 'w') as file:
+            json.dump(manifest, file)
+
+    @classmethod
+    def open(cls, directory: str) -> 'BM25Index':
+        """Memory-map an index written with save."""
+        with open(os.path.join(directory, MANIFEST_FILE), 'r') as file:
+            manifest = json.load(file)
+        if manifest['format_version'] != LEXICAL_FORMAT_VERSION:
+            raise ValueError(f"Unsupported lexical index format version {manifest['format_version']}")
+
+        def memmap(name: str, dtype: str, length: int) -> np.ndarray:
+            if length == 0:
+                return np.zeros(0, dtype=dtype)
+            return np.memmap(os.path.join(directory, name), dtype=dtype, mode='r', shape=(length,))
+
+        index = cls(k1=manifest['k1'], b=manifest['b'])
+        index.read_only = True
+        count = manifest['count']
+        index.vocabulary = memmap(VOCABULARY_FILE, f"S{manifest['term_width']}", manifest['terms'])
+        index.term_offsets = memmap(TERM_OFFSETS_FILE, '<u8', manifest['terms'] + 1)
+        index.postings_docs = memmap(POSTINGS_DOCS_FILE, '<u4', manifest['postings'])
+        index.postings_tf = memmap(POSTINGS_TF_FILE, '<u2', manifest['postings'])
+        index.doc_lengths = memmap(DOC_LENGTHS_FILE, '<u4', count)
+
+        index.documents = SnapshotDocuments(map_records(directory), memmap(OFFSETS_FILE, '<u8', count + 1))
+        index._prepare_scoring()
+        return index
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+
+class BM25VectorDatabase(VectorDatabase):
+    """
+    In-process lexical retrieval with BM25, for baselines that need no embeddings at all.
+
+    It has the interface of LocalVectorDatabase, except that it is searched with the question text.
+    Indices are saved to S3 under ``{prefix}/{index_name}/`` and memory-mapped by the retrieval
+    task. Results can be used on their own or fused with vector results with reciprocal_rank_fusion.
+    """
+
+    def __init__(self, vector_field: str = None, bucket: str = None, prefix: str = 'lexical_indices',
+                 cache_dir: str = '/tmp/vector_snapshots', k1: float = BM25_K1, b: float = BM25_B):
+        """
+        Args:
+            vector_field (str, optional): Field holding the embedding, dropped from inserted documents
+            bucket (str, optional): S3 bucket indices are saved to
+            prefix (str): S3 prefix of the indices
+            cache_dir (str): Local directory loaded indices are downloaded to
+            k1 (float): BM25 term frequency saturation
+            b (float): BM25 document length normalization
+        """
+        self.vector_field = vector_field
+        self.bucket = bucket
+        self.prefix = prefix
+        self.cache_dir = cache_dir
+        self.k1 = k1
+        self.b = b
+        self.indices: Dict[str, BM25Index] = {}
+
+    def create_index(self, index_name: str, mapping: Dict[str, Any] = None, algorithm: str = 'bm25') -> None:
+        self.indices[index_name] = BM25Index(k1=self.k1, b=self.b)
+
+    def update_index(self, index_name: str, new_mapping: Dict[str, Any]) -> None:
+        raise NotImplementedError("Lexical indices have no mapping to update.")
+
+    def delete_index(self, index_name: str) -> None:
+        self.indices.pop(index_name, None)
+
+    def insert_document(self, index_name: str, document: Dict[str, Any]) -> None:
+        """Index a chunk by the text that would be embedded, i.e. the child text of hierarchical chunks."""
+        if index_name not in self.indices:
+            raise ValueError(f"Index {index_name} does not exist")
+        document = {name: value for name, value in document.items() if name not in (self.vector_field, '_index')}
+        self.indices[index_name].add(document.get('child_text') or document.get('text', ''), document)
+
+    def insert_documents(self, index_name: str, documents: List[Dict[str, Any]]) -> None:
+        for document in documents:
+            self.insert_document(index_name, document)
+        self.build_index(index_name)
+
+    def index_exists(self, index_name: str) -> bool:
+        return index_name in self.indices
+
+    def build_index(self, index_name: str) -> None:
+        index = self.indices[index_name]
+        index.build()
+        logger.info(f"Built lexical index {index_name} with {len(index)} documents, {len(index.vocabulary)} terms and {len(index.postings_docs)} postings")
+
+    def search(self, index_name: str, query_text: str, k: int, collapse_field: str = None, oversample: int = 1,
+               **kwargs) -> List[Dict[str, Any]]:
+        return self.search_batch(index_name, [query_text], k, collapse_field=collapse_field, oversample=oversample)[0]
+
+    def search_batch(self, index_name: str, query_texts: List[str], k: int, collapse_field: str = None,
+                     oversample: int = 1) -> List[List[Dict[str, Any]]]:
+        """
+        Return the top-k documents for each query, best match first.
+
+        Documents sharing no term with a query are never returned, so a query may get fewer than k.
+
+        Args:
+            index_name (str): Name of the index
+            query_texts (List[str]): Questions
+            k (int): Number of documents per query
+            collapse_field (str, optional): Keep only the best document per value of this field
+            oversample (int): Candidates per result gathered before collapsing
+
+        Returns:
+            List[List[Dict[str, Any]]]: Ranked documents per query
+        """
+        if collapse_field:
+            candidates = self.search_batch(index_name, query_texts, k * oversample)
+            return [LocalVectorDatabase._collapse(documents, collapse_field, k) for documents in candidates]
+
+        index = self.indices.get(index_name)
+        if index is None:
+            raise ValueError(f"Index {index_name} is not loaded")
+        index.build()
+
+        results = []
+        for query in query_texts:
+            scores = index.scores(query)
+            matches = np.flatnonzero(scores > 0)
+            if len(matches) > k:
+                matches = matches[np.argpartition(-scores[matches], k - 1)[:k]]
+            ranked = matches[np.argsort(-scores[matches], kind='stable')]
+            results.append([index.documents[int(i)] for i in ranked])
+        return results
+
+    def save(self, index_name: str) -> None:
+        """Write the index and upload it to S3 for retrieval tasks."""
+        directory = tempfile.mkdtemp(prefix='lexical_index_')
+        try:
+            self.indices[index_name].save(directory)
+            upload_snapshot(directory, self.bucket, f"{self.prefix}/{index_name}")
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        logger.info(f"Saved lexical index {index_name} with {len(self.indices[index_name])} documents")
+
+    def load(self, index_name: str) -> None:
+        """Memory-map an index saved with save, downloading it once per host."""
+        directory = download_snapshot(self.bucket, f"{self.prefix}/{index_name}", self.cache_dir)
+        self.indices[index_name] = BM25Index.open(directory)
+        logger.info(f"Opened lexical index {index_name} with {len(self.indices[index_name])} documents")
+
+
+def _result_key(document: Dict[str, Any]) -> Any:
+    # Hierarchical results stand for their parent chunk
+    return document.get('parent_id') or document.get('chunk_id') or document.get('text')
+
+
+def reciprocal_rank_fusion(result_lists: List[Optional[List[Dict[str, Any]]]], k: int, rrf_k: int = RRF_K,
+                           key: Callable[[Dict[str, Any]], Any] = _result_key) -> List[Dict[str, Any]]:
+    """
+    Merge ranked result lists by reciprocal rank fusion.
+
+    Each document scores ``sum(1 / (rrf_k + rank))`` over the lists it appears in, with ranks
+    starting at 1, so only positions matter and BM25 and vector scores need no normalization.
+
+    Args:
+        result_lists (List[Optional[List[Dict[str, Any]]]]): Ranked results of each retriever
+        k (int): Number of documents to return
+        rrf_k (int): Rank constant damping the weight of the top positions
+        key (Callable): Identity of a document across lists
+
+    Returns:
+        List[Dict[str, Any]]: Fused ranking, documents taken from the first list they appear in
+    """
+    scores: Dict[Any, float] = {}
+    documents: Dict[Any, Dict[str, Any]] = {}
+    for results in result_lists:
+        for rank, document in enumerate(results or [], start=1):
+            document_key = key(document)
+            scores[document_key] = scores.get(document_key, 0.0) + 1.0 / (rrf_k + rank)
+            documents.setdefault(document_key, document)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [documents[document_key] for document_key in ranked[:k]]
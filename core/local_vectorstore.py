@@ -0,0 +1,267 @@
+import logging
+import shutil
+import tempfile
+from typing import Any, Dict, List
+
+import numpy as np
+
+from baseclasses.base_classes import VectorDatabase
+from core.vector_snapshot import SnapshotWriter, VectorSnapshot, download_snapshot, upload_snapshot
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Defaults match the OpenSearch index settings so local and OpenSearch results are comparable
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 512
+HNSW_EF_SEARCH = 100
+IVF_NPROBE = 16
+
+
+class LocalIndex:
+    """Vectors, documents and optional FAISS index of one local index."""
+
+    def __init__(self, dimension: int, algorithm: str, m: int = HNSW_M, ef_construction: int = HNSW_EF_CONSTRUCTION, ef_search: int = HNSW_EF_SEARCH):
+        self.dimension = dimension
+        self.algorithm = algorithm
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.vectors = np.zeros((0, dimension), dtype=np.float32)
+        self.documents: List[Dict[str, Any]] = []
+        self.ann_index = None
+        self.snapshot: VectorSnapshot = None
+        self._pending_vectors: List[List[float]] = []
+
+    @classmethod
+    def from_snapshot(cls, snapshot: VectorSnapshot) -> 'LocalIndex':
+        """Wrap a memory-mapped snapshot without copying its vectors or documents."""
+        hnsw = snapshot.manifest.get('hnsw', {})
+        index = cls(
+            snapshot.dimension,
+            snapshot.algorithm,
+            m=hnsw.get('m', HNSW_M),
+            ef_construction=hnsw.get('ef_construction', HNSW_EF_CONSTRUCTION),
+            ef_search=hnsw.get('ef_search', HNSW_EF_SEARCH)
+        )
+        index.snapshot = snapshot
+        index.vectors = snapshot.vectors
+        index.documents = snapshot.documents
+        return index
+
+    def float_vectors(self) -> np.ndarray:
+        if self.snapshot is not None and self.snapshot.dtype == 'int8':
+            return self.snapshot.vectors.astype(np.float32) * self.snapshot.scales[:, None]
+        return np.asarray(self.vectors, dtype=np.float32)
+
+    def inner_products(self, queries: np.ndarray) -> np.ndarray:
+        if self.snapshot is not None:
+            return self.snapshot.inner_products(queries)
+        return queries @ self.vectors.T
+
+    def add(self, vector: List[float], document: Dict[str, Any]) -> None:
+        if self.snapshot is not None:
+            raise ValueError("Indices loaded from a snapshot are read-only")
+        self._pending_vectors.append(vector)
+        self.documents.append(document)
+        self.ann_index = None
+
+    def flush(self) -> None:
+        """Append the vectors inserted since the last flush to the matrix."""
+        if self._pending_vectors:
+            pending = np.asarray(self._pending_vectors, dtype=np.float32).reshape(-1, self.dimension)
+            self.vectors = np.vstack([self.vectors, pending])
+            self._pending_vectors = []
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+
+class LocalVectorDatabase(VectorDatabase):
+    """
+    Vector database that runs inside the indexing or retrieval process.
+
+    Indices up to ``exact_max`` vectors are searched exactly with a NumPy inner product, which is
+    also what OpenSearch's faiss engine scores with. Larger indices get a FAISS HNSW or IVF index
+    when faiss is installed. Indices are saved to S3 as vector snapshots under
+    ``{prefix}/{index_name}/`` and memory-mapped by the retrieval task, so no OpenSearch cluster is
+    needed for small and medium knowledge bases.
+    """
+
+    def __init__(self, vector_field: str, bucket: str = None, prefix: str = 'local_vector_indices', exact_max: int = 200000,
+                 snapshot_dtype: str = 'float32', cache_dir: str = '/tmp/vector_snapshots'):
+        self.vector_field = vector_field
+        self.bucket = bucket
+        self.prefix = prefix
+        self.exact_max = exact_max
+        self.snapshot_dtype = snapshot_dtype
+        self.cache_dir = cache_dir
+        self.indices: Dict[str, LocalIndex] = {}
+
+    def create_index(self, index_name: str, mapping: Dict[str, Any], algorithm: str,
+                     m: int = HNSW_M, ef_construction: int = HNSW_EF_CONSTRUCTION, ef_search: int = HNSW_EF_SEARCH) -> None:
+        vector_field = next((field for field, props in mapping['properties'].items()
+                             if props['type'] == 'knn_vector'), None)
+        if not vector_field:
+            raise ValueError("Mapping must include a knn_vector field")
+        self.vector_field = vector_field
+        self.indices[index_name] = LocalIndex(
+            mapping['properties'][vector_field]['dimension'], algorithm,
+            m=m, ef_construction=ef_construction, ef_search=ef_search
+        )
+
+    def update_index(self, index_name: str, new_mapping: Dict[str, Any]) -> None:
+        raise NotImplementedError("Local indices have no mapping to update.")
+
+    def delete_index(self, index_name: str) -> None:
+        self.indices.pop(index_name, None)
+
+    def insert_document(self, index_name: str, document: Dict[str, Any]) -> None:
+        if index_name not in self.indices:
+            raise ValueError(f"Index {index_name} does not exist")
+        document = dict(document)
+        vector = document.pop(self.vector_field)
+        document.pop('_index', None)
+        self.indices[index_name].add(vector, document)
+
+    def insert_documents(self, index_name: str, documents: List[Dict[str, Any]]) -> None:
+        """Insert documents in the format chunk_embed_store produces and build the search index."""
+        for document in documents:
+            self.insert_document(index_name, document)
+        self.build_index(index_name)
+
+    def index_exists(self, index_name: str) -> bool:
+        return index_name in self.indices
+
+    def build_index(self, index_name: str) -> None:
+        """Build the FAISS index when the local index is larger than exact search should handle."""
+        index = self.indices[index_name]
+        index.flush()
+        if len(index) <= self.exact_max:
+            index.ann_index = None
+            return
+        if faiss is None:
+            logger.warning(f"faiss is not installed, index {index_name} with {len(index)} vectors will use exact search")
+            return
+
+        logger.info(f"Building FAISS {index.algorithm} index for {index_name} with {len(index)} vectors")
+        vectors = index.float_vectors()
+        if index.algorithm == 'ivf':
+            nlist = int(4 * np.sqrt(len(index)))
+            quantizer = faiss.IndexFlatIP(index.dimension)
+            ann_index = faiss.IndexIVFFlat(quantizer, index.dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+            ann_index.train(vectors)
+            ann_index.nprobe = IVF_NPROBE
+        else:
+            if index.algorithm == 'hnsw_sq':
+                ann_index = faiss.IndexHNSWSQ(index.dimension, faiss.ScalarQuantizer.QT_fp16, index.m, faiss.METRIC_INNER_PRODUCT)
+                ann_index.train(vectors)
+            elif index.algorithm == 'hnsw_bq':
+                # FAISS binary indices need binarized inputs, the closest float index is 8-bit quantization
+                ann_index = faiss.IndexHNSWSQ(index.dimension, faiss.ScalarQuantizer.QT_8bit, index.m, faiss.METRIC_INNER_PRODUCT)
+                ann_index.train(vectors)
+            else:
+                ann_index = faiss.IndexHNSWFlat(index.dimension, index.m, faiss.METRIC_INNER_PRODUCT)
+            ann_index.hnsw.efConstruction = index.ef_construction
+            ann_index.hnsw.efSearch = index.ef_search
+        ann_index.add(vectors)
+        index.ann_index = ann_index
+
+    def search(self, index_name: str, query_vector: List[float], k: int, ef_search: int = None,
+               collapse_field: str = None, oversample: int = 1) -> List[Dict[str, Any]]:
+        return self.search_batch(index_name, [query_vector], k, ef_search=ef_search,
+                                 collapse_field=collapse_field, oversample=oversample)[0]
+
+    def search_batch(self, index_name: str, query_vectors: List[List[float]], k: int, ef_search: int = None,
+                     collapse_field: str = None, oversample: int = 1) -> List[List[Dict[str, Any]]]:
+        """
+        Return the top-k documents for each query vector, best match first.
+
+        Args:
+            index_name (str): Name of the index
+            query_vectors (List[List[float]]): Query embeddings
+            k (int): Number of documents per query
+            ef_search (int, optional): HNSW candidate list size, defaults to the index setting
+            collapse_field (str, optional): Keep only the best document per value of this field
+            oversample (int): Candidates per result gathered before collapsing
+
+        Returns:
+            List[List[Dict[str, Any]]]: Ranked documents per query, without their vectors
+        """
+        if collapse_field:
+            candidates = self.search_batch(index_name, query_vectors, k * oversample, ef_search=ef_search)
+            return [self._collapse(documents, collapse_field, k) for documents in candidates]
+
+        index = self.indices.get(index_name)
+        if index is None:
+            raise ValueError(f"Index {index_name} is not loaded")
+        index.flush()
+        k = min(k, len(index))
+        if k == 0:
+            return [[] for _ in query_vectors]
+
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(-1, index.dimension)
+        if index.ann_index is not None:
+            if hasattr(index.ann_index, 'hnsw'):
+                index.ann_index.hnsw.efSearch = max(ef_search or index.ef_search, k)
+            _, ids = index.ann_index.search(queries, k)
+        else:
+            scores = index.inner_products(queries)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+            ids = np.take_along_axis(top, order, axis=1)
+
+        return [[index.documents[i] for i in row if i >= 0] for row in ids]
+
+    @staticmethod
+    def _collapse(documents: List[Dict[str, Any]], field: str, k: int) -> List[Dict[str, Any]]:
+        collapsed, seen = [], set()
+        for document in documents:
+            value = document.get(field)
+            if value in seen:
+                continue
+            seen.add(value)
+            document = {name: field_value for name, field_value in document.items() if name != 'child_text'}
+            collapsed.append(document)
+            if len(collapsed) == k:
+                break
+        return collapsed
+
+    def save(self, index_name: str) -> None:
+        """Write the index as a vector snapshot and upload it to S3 for retrieval tasks."""
+        index = self.indices[index_name]
+        index.flush()
+        directory = tempfile.mkdtemp(prefix='vector_snapshot_')
+        try:
+            writer = SnapshotWriter(directory, index.dimension, dtype=self.snapshot_dtype,
+                                    algorithm=index.algorithm, vector_field=self.vector_field,
+                                    hnsw={'m': index.m, 'ef_construction': index.ef_construction, 'ef_search': index.ef_search})
+            for vector, document in zip(index.vectors, index.documents):
+                writer.add(vector, document)
+            writer.close(ann_index=index.ann_index)
+            upload_snapshot(directory, self.bucket, f"{self.prefix}/{index_name}")
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        logger.info(f"Saved local index {index_name} with {len(index)} vectors")
+
+    def load(self, index_name: str) -> None:
+        """Memory-map the snapshot of an index saved with save, downloading it once per host."""
+        directory = download_snapshot(self.bucket, f"{self.prefix}/{index_name}", self.cache_dir)
+        self.open_snapshot(index_name, directory)
+
+    def open_snapshot(self, index_name: str, directory: str) -> None:
+        """Serve an index from a snapshot directory on local disk."""
+        snapshot = VectorSnapshot(directory)
+        self.vector_field = snapshot.vector_field
+        index = LocalIndex.from_snapshot(snapshot)
+        self.indices[index_name] = index
+        if len(index) > self.exact_max:
+            index.ann_index = snapshot.load_ann_index()
+            if index.ann_index is None:
+                self.build_index(index_name)
+        logger.info(f"Opened local index {index_name} with {len(index)} {snapshot.dtype} vectors")
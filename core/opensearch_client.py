@@ -0,0 +1,155 @@
+import logging
+import socket
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import boto3
+from opensearchpy import OpenSearch, Urllib3AWSV4SignerAuth, Urllib3HttpConnection
+from urllib3.connection import HTTPConnection
+
+try:
+    # opensearch-py only exports its asyncio client when aiohttp is installed
+    from opensearchpy import AsyncHttpConnection, AsyncOpenSearch, AWSV4SignerAsyncAuth
+except ImportError:
+    AsyncOpenSearch = None
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+DEFAULT_POOL_MAXSIZE = 32
+DEFAULT_KEEPALIVE_IDLE = 60
+DEFAULT_TIMEOUT = 30
+
+
+def _keepalive_socket_options(idle_seconds: int) -> list:
+    """TCP keep-alive so idle pooled connections survive NAT and load balancer idle timeouts."""
+    options = list(HTTPConnection.default_socket_options) + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    if hasattr(socket, 'TCP_KEEPIDLE'):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle_seconds))
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(1, idle_seconds // 4)))
+    return options
+
+
+class KeepAliveUrllib3HttpConnection(Urllib3HttpConnection):
+    """urllib3 transport whose pooled sockets use TCP keep-alive."""
+
+    def __init__(self, *args, keepalive_idle: int = DEFAULT_KEEPALIVE_IDLE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool.conn_kw['socket_options'] = _keepalive_socket_options(keepalive_idle)
+
+
+class OpenSearchClientFactory:
+    """
+    Shares OpenSearch clients, their connection pools and SigV4 signers across a process.
+
+    Every component that talks to the same cluster gets the same client, so concurrent searches
+    reuse warm keep-alive connections instead of opening a pool and a TLS session per component.
+    Serverless collections are signed with one cached signer per region, whose refreshable
+    credentials are resolved once instead of on every client construction.
+    """
+
+    _clients: Dict[Tuple, OpenSearch] = {}
+    _async_clients: Dict[Tuple, Any] = {}
+    _signers: Dict[Tuple, Any] = {}
+    _credentials = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def _get_credentials(cls):
+        if cls._credentials is None:
+            cls._credentials = boto3.Session().get_credentials()
+        return cls._credentials
+
+    @classmethod
+    def _signer(cls, region: str, is_async: bool = False):
+        key = (region, is_async)
+        if key not in cls._signers:
+            signer_cls = AWSV4SignerAsyncAuth if is_async else Urllib3AWSV4SignerAuth
+            cls._signers[key] = signer_cls(cls._get_credentials(), region, 'aoss')
+        return cls._signers[key]
+
+    @classmethod
+    def _client_kwargs(cls, host: str, port: int, use_ssl: bool, is_serverless: bool, region: str,
+                       username: Optional[str], password: Optional[str], pool_maxsize: int, is_async: bool) -> Dict[str, Any]:
+        kwargs = {
+            'hosts': [{'host': host, 'port': port}],
+            'use_ssl': True if is_serverless else use_ssl,
+            'verify_certs': True,
+            'pool_maxsize': pool_maxsize,
+            'timeout': DEFAULT_TIMEOUT,
+            'max_retries': 3,
+            'retry_on_timeout': True
+        }
+        if is_serverless:
+            kwargs['http_auth'] = cls._signer(region, is_async)
+            # Add required headers for OpenSearch Serverless
+            kwargs['headers'] = {'host': host}
+        else:
+            kwargs['http_auth'] = (username, password)
+        return kwargs
+
+    @classmethod
+    def get_client(cls, host: str, port: int = 443, use_ssl: bool = True, is_serverless: bool = True, region: str = 'us-east-1',
+                   username: str = None, password: str = None, pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                   keepalive_idle: int = DEFAULT_KEEPALIVE_IDLE) -> OpenSearch:
+        """
+        Return the shared synchronous client for a cluster, creating it on first use.
+
+        Args:
+            host (str): OpenSearch domain or collection endpoint
+            port (int): Port of the endpoint
+            use_ssl (bool): Use TLS, always on for serverless collections
+            is_serverless (bool): Sign requests with SigV4 for OpenSearch Serverless
+            region (str): AWS region of the collection
+            username (str, optional): Basic auth user for managed domains
+            password (str, optional): Basic auth password for managed domains
+            pool_maxsize (int): Pooled connections per node, the number of requests that can be in flight at once
+            keepalive_idle (int): Seconds a pooled connection idles before TCP keep-alive probes start
+
+        Returns:
+            OpenSearch: Client backed by a keep-alive urllib3 connection pool
+        """
+        key = (host, port, use_ssl, is_serverless, region, username, pool_maxsize, keepalive_idle)
+        with cls._lock:
+            if key not in cls._clients:
+                logger.info(f"Creating OpenSearch client for {host} with {pool_maxsize} pooled connections")
+                cls._clients[key] = OpenSearch(
+                    connection_class=KeepAliveUrllib3HttpConnection,
+                    keepalive_idle=keepalive_idle,
+                    **cls._client_kwargs(host, port, use_ssl, is_serverless, region, username, password, pool_maxsize, is_async=False)
+                )
+            return cls._clients[key]
+
+    @classmethod
+    def get_async_client(cls, host: str, port: int = 443, use_ssl: bool = True, is_serverless: bool = True, region: str = 'us-east-1',
+                         username: str = None, password: str = None, pool_maxsize: int = DEFAULT_POOL_MAXSIZE) -> "AsyncOpenSearch":
+        """
+        Return the shared asyncio client for a cluster, for callers running on an event loop.
+
+        The aiohttp session behind it is bound to the loop of its first request, so the client is
+        meant for long-lived loops such as the FastAPI application's.
+
+        Args:
+            host (str): OpenSearch domain or collection endpoint
+            port (int): Port of the endpoint
+            use_ssl (bool): Use TLS, always on for serverless collections
+            is_serverless (bool): Sign requests with SigV4 for OpenSearch Serverless
+            region (str): AWS region of the collection
+            username (str, optional): Basic auth user for managed domains
+            password (str, optional): Basic auth password for managed domains
+            pool_maxsize (int): Concurrent connections of the aiohttp connector
+
+        Returns:
+            AsyncOpenSearch: Client backed by an aiohttp connection pool
+        """
+        if AsyncOpenSearch is None:
+            raise ImportError("The async OpenSearch client needs aiohttp, install opensearch-py[async]")
+        key = (host, port, use_ssl, is_serverless, region, username, pool_maxsize)
+        with cls._lock:
+            if key not in cls._async_clients:
+                logger.info(f"Creating async OpenSearch client for {host} with {pool_maxsize} pooled connections")
+                cls._async_clients[key] = AsyncOpenSearch(
+                    connection_class=AsyncHttpConnection,
+                    **cls._client_kwargs(host, port, use_ssl, is_serverless, region, username, password, pool_maxsize, is_async=True)
+                )
+            return cls._async_clients[key]
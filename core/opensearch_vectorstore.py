@@ -1,9 +1,8 @@
 import traceback, json
 from typing import Dict, Any, List, Optional
 from botocore.endpoint import uuid
-from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
 from baseclasses.base_classes import VectorDatabase
-import boto3
+from core.opensearch_client import OpenSearchClientFactory, DEFAULT_POOL_MAXSIZE, DEFAULT_KEEPALIVE_IDLE
 import logging
 
 
@@ -11,50 +10,31 @@ logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 class OpenSearchVectorDatabase(VectorDatabase):
-    def __init__(self, host: str, use_ssl: bool = True, port: int = 443, is_serverless : bool = True, region: str = 'us-east-1', username: str = None, password: str = None):
-        if is_serverless:
-            try:
-                # Get credentials from the Lambda role
-                credentials = boto3.Session().get_credentials()
-                # Create AWS V4 Signer Auth for OpenSearch Serverless
-                auth = AWSV4SignerAuth(credentials, region, 'aoss')
-                
-                # Initialize OpenSearch client for serverless
-                self.client = OpenSearch(
-                    hosts=[{'host': host, 'port': port}],
-                    http_auth=auth,
-                    use_ssl=True,  
-                    verify_certs=True,
-                    connection_class=RequestsHttpConnection,
-                    timeout=30,
-                    max_retries=3,
-                    retry_on_timeout=True,
-                    # Add required headers for OpenSearch Serverless
-                    headers={
-                        'host': host
-                    }
-                )
-                
-            except Exception as e:
-                logger.error(f"Failed to initialize OpenSearch Serverless client: {str(e)}", exc_info=True)
-                raise
-        else:
-            self.client = OpenSearch(
-                hosts=[{'host': host, 'port': port}],
-                http_auth=(username, password),
+    def __init__(self, host: str, use_ssl: bool = True, port: int = 443, is_serverless : bool = True, region: str = 'us-east-1', username: str = None, password: str = None,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE, keepalive_idle: int = DEFAULT_KEEPALIVE_IDLE):
+        try:
+            self.client = OpenSearchClientFactory.get_client(
+                host=host,
+                port=port,
                 use_ssl=use_ssl,
-                verify_certs=True,
-                connection_class=RequestsHttpConnection,
-                timeout=30,
-                max_retries=3,
-                retry_on_timeout=True
+                is_serverless=is_serverless,
+                region=region,
+                username=username,
+                password=password,
+                pool_maxsize=pool_maxsize,
+                keepalive_idle=keepalive_idle
             )
+        except Exception as e:
+            logger.error(f"Failed to initialize OpenSearch client: {str(e)}", exc_info=True)
+            raise
+        # Index mappings, fetched once per index instead of on every search
+        self._properties: Dict[str, Dict[str, Any]] = {}
 
-    def _get_algorithm_settings(self, algorithm: str, dim: int) -> Dict[str, Any]:
+    def _get_algorithm_settings(self, algorithm: str, dim: int, m: int = 16, ef_construction: int = 512) -> Dict[str, Any]:
         
         base_hnsw_params = {
-            "ef_construction": 512,
-            "m": 16
+            "ef_construction": ef_construction,
+            "m": m
         }
 
         if algorithm == "hnsw":
@@ -90,20 +70,21 @@ class OpenSearchVectorDatabase(VectorDatabase):
             raise ValueError(f"Unsupported algorithm: {algorithm}")
     
     
-    def create_index(self, index_name: str, mapping: Dict[str, Any], algorithm: str) -> None:
+    def create_index(self, index_name: str, mapping: Dict[str, Any], algorithm: str,
+                     m: int = 16, ef_construction: int = 512, ef_search: int = 100) -> None:
         vector_field = next((field for field, props in mapping['properties'].items() 
                              if props['type'] == 'knn_vector'), None)
         if not vector_field:
             raise ValueError("Mapping must include a knn_vector field")
     
         dim = mapping['properties'][vector_field]['dimension']
-        algorithm_settings = self._get_algorithm_settings(algorithm, dim)
+        algorithm_settings = self._get_algorithm_settings(algorithm, dim, m=m, ef_construction=ef_construction)
     
         index_body = {
             "settings": {
                 "index": {
                     "knn": True,
-                    "knn.algo_param.ef_search": 100
+                    "knn.algo_param.ef_search": ef_search
                 }
             },
             "mappings": {
@@ -138,34 +119,72 @@ class OpenSearchVectorDatabase(VectorDatabase):
 
     def update_index(self, index_name: str, new_mapping: Dict[str, Any]) -> None:
         self.client.indices.put_mapping(index=index_name, body=new_mapping)
+        self._properties.pop(index_name, None)
 
     def delete_index(self, index_name: str) -> None:
         self.client.indices.delete(index=index_name)
+        self._properties.pop(index_name, None)
 
     def insert_document(self, index_name: str, document: Dict[str, Any]) -> None:
         self.client.index(index=index_name, body=document)
 
-    def search(self, index_name: str, query_vector: List[float], k: int) -> List[Dict[str, Any]]:
-        vector_field = next((field for field, props in 
-                             self.client.indices.get_mapping(index=index_name)[index_name]['mappings']['properties'].items() 
+    @staticmethod
+    def _collapse_field(properties: Dict[str, Any], field: str) -> str:
+        """Return the keyword field to collapse on, the keyword sub-field for dynamically mapped text."""
+        props = properties.get(field, {})
+        if props.get('type') == 'keyword':
+            return field
+        if 'keyword' in props.get('fields', {}):
+            return f"{field}.keyword"
+        raise ValueError(f"Field {field} has no keyword mapping to collapse on")
+
+    def _index_properties(self, index_name: str) -> Dict[str, Any]:
+        if index_name not in self._properties:
+            self._properties[index_name] = self.client.indices.get_mapping(index=index_name)[index_name]['mappings']['properties']
+        return self._properties[index_name]
+
+    @classmethod
+    def _search_body(cls, properties: Dict[str, Any], query_vector: List[float], k: int, ef_search: Optional[int] = None,
+                     collapse_field: Optional[str] = None, oversample: int = 1) -> Dict[str, Any]:
+        vector_field = next((field for field, props in properties.items()
                              if 'type' in props and props['type'] == 'knn_vector'), None)
         if not vector_field:
             raise ValueError("Index does not contain a knn_vector field")
 
+        knn_query = {
+            "vector": query_vector,
+            "k": k * oversample if collapse_field else k
+        }
+        # Experiments sharing an index can search with their own ef_search
+        if ef_search:
+            knn_query["method_parameters"] = {"ef_search": ef_search}
+
+        excludes = [vector_field]
         query = {
             "size": k,
             "query": {
                 "knn": {
-                    vector_field: {
-                        "vector": query_vector,
-                        "k": k
-                    }
+                    vector_field: knn_query
                 }
-            },
-            "_source": True,
-            "fields": ["text", "parent_id"]
+            }
         }
+        if collapse_field:
+            query["collapse"] = {"field": cls._collapse_field(properties, collapse_field)}
+            # Only the parent text reaches the context, the embedded child text is not needed
+            excludes.append("child_text")
+        query["_source"] = {"excludes": excludes}
+        return query
+
+    def search(self, index_name: str, query_vector: List[float], k: int, ef_search: Optional[int] = None,
+               collapse_field: Optional[str] = None, oversample: int = 1) -> List[Dict[str, Any]]:
+        """
+        Return the source of the top-k hits, without their vectors.
 
+        With collapse_field, hits are collapsed on that field server side so the response holds
+        k distinct values of it, e.g. k distinct parents of hierarchical child chunks. The k-NN
+        query then gathers k * oversample candidates so enough distinct values survive collapsing.
+        """
+        query = self._search_body(self._index_properties(index_name), query_vector, k, ef_search, collapse_field, oversample)
         response = self.client.search(index=index_name, body=query)
         return [hit['_source'] for hit in response['hits']['hits']]
     
@@ -244,4 +263,41 @@ class OpenSearchVectorDatabase(VectorDatabase):
             return
     
         self.batch_insert_chunks(index_name, chunks, chunk_embeddings, metadata)
-        return f"Indexing complete for '{index_name}'!"
\ No newline at end of file
+        return f"Indexing complete for '{index_name}'!"
+
+
+class AsyncOpenSearchVectorDatabase:
+    """
+    Search-only counterpart of OpenSearchVectorDatabase for asyncio callers.
+
+    Searches are awaited on the caller's event loop over a shared aiohttp pool instead of
+    occupying a worker thread each, e.g. in FastAPI routes.
+    """
+
+    def __init__(self, host: str, use_ssl: bool = True, port: int = 443, is_serverless : bool = True, region: str = 'us-east-1', username: str = None, password: str = None,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE):
+        self.client = OpenSearchClientFactory.get_async_client(
+            host=host,
+            port=port,
+            use_ssl=use_ssl,
+            is_serverless=is_serverless,
+            region=region,
+            username=username,
+            password=password,
+            pool_maxsize=pool_maxsize
+        )
+        self._properties: Dict[str, Dict[str, Any]] = {}
+
+    async def _index_properties(self, index_name: str) -> Dict[str, Any]:
+        if index_name not in self._properties:
+            mapping = await self.client.indices.get_mapping(index=index_name)
+            self._properties[index_name] = mapping[index_name]['mappings']['properties']
+        return self._properties[index_name]
+
+    async def search(self, index_name: str, query_vector: List[float], k: int, ef_search: Optional[int] = None,
+                     collapse_field: Optional[str] = None, oversample: int = 1) -> List[Dict[str, Any]]:
+        """Same as OpenSearchVectorDatabase.search, awaited."""
+        properties = await self._index_properties(index_name)
+        query = OpenSearchVectorDatabase._search_body(properties, query_vector, k, ef_search, collapse_field, oversample)
+        response = await self.client.search(index=index_name, body=query)
+        return [hit['_source'] for hit in response['hits']['hits']]
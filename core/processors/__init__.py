@@ -2,3 +2,4 @@ from .chunking_processor import ChunkingProcessor
 from .embed_processor import EmbedProcessor
 from .inference_processor import InferenceProcessor
 from .eval_processor import EvalProcessor
+from .context_packer import ContextPacker
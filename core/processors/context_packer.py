@@ -0,0 +1,148 @@
+import logging
+import re
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, four characters per token as in the cost estimates."""
+    return len(text) // 4
+
+
+def _suffix_prefix_overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of left that is also a prefix of right (KMP failure function)."""
+    pattern = right + '\x00' + left
+    failure = [0] * len(pattern)
+    for i in range(1, len(pattern)):
+        j = failure[i - 1]
+        while j > 0 and pattern[i] != pattern[j]:
+            j = failure[j - 1]
+        if pattern[i] == pattern[j]:
+            j += 1
+        failure[i] = j
+    return failure[-1]
+
+
+class ContextPacker:
+    """
+    Shrinks retrieved chunks before they are put into the prompt.
+
+    1. Chunks whose texts overlap, e.g. neighbours of fixed chunking with chunk_overlap, are merged
+       into one passage, and chunks contained in another are dropped.
+    2. Sentences repeated verbatim or nearly verbatim across passages are kept only once.
+    3. Passages are cut at sentence boundaries to fit the token budget, best ranked first.
+
+    Passages keep the fields of their best ranked chunk, so downstream code reading ``text`` is unaffected.
+    """
+
+    def __init__(self, token_budget: int = 0, near_duplicate_threshold: float = 0.9, min_overlap_chars: int = 40):
+        """
+        Args:
+            token_budget (int): Maximum estimated tokens of the packed context, 0 for no limit
+            near_duplicate_threshold (float): Word-set Jaccard similarity from which sentences count as duplicates
+            min_overlap_chars (int): Shortest shared span that merges two chunks
+        """
+        self.token_budget = token_budget
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.min_overlap_chars = min_overlap_chars
+
+    def _merge_overlaps(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        passages: List[Dict[str, Any]] = []
+        for document in documents:
+            text = document.get('text', '')
+            merged = False
+            for passage in passages:
+                passage_text = passage['text']
+                if text in passage_text:
+                    merged = True
+                elif passage_text in text:
+                    passage['text'] = text
+                    merged = True
+                else:
+                    overlap = _suffix_prefix_overlap(passage_text, text)
+                    if overlap >= self.min_overlap_chars:
+                        passage['text'] = passage_text + text[overlap:]
+                        merged = True
+                    else:
+                        overlap = _suffix_prefix_overlap(text, passage_text)
+                        if overlap >= self.min_overlap_chars:
+                            passage['text'] = text + passage_text[overlap:]
+                            merged = True
+                if merged:
+                    break
+            if not merged:
+                passages.append({**document, 'text': text})
+        return passages
+
+    def _deduplicate_sentences(self, passages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        seen_exact = set()
+        seen_words: List[set] = []
+        deduplicated = []
+        for passage in passages:
+            kept = []
+            for sentence in SENTENCE_SPLIT.split(passage['text']):
+                normalized = NON_WORD.sub(' ', sentence.lower()).strip()
+                if not normalized:
+                    continue
+                if normalized in seen_exact:
+                    continue
+                words = set(normalized.split())
+                if len(words) >= 5 and any(
+                    len(words & other) / len(words | other) >= self.near_duplicate_threshold for other in seen_words
+                ):
+                    continue
+                seen_exact.add(normalized)
+                if len(words) >= 5:
+                    seen_words.append(words)
+                kept.append(sentence)
+            if kept:
+                deduplicated.append({**passage, 'text': ' '.join(kept)})
+        return deduplicated
+
+    def _fit_budget(self, passages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not self.token_budget:
+            return passages
+        fitted, used = [], 0
+        for passage in passages:
+            remaining = self.token_budget - used
+            if remaining <= 0:
+                break
+            tokens = estimate_tokens(passage['text'])
+            if tokens <= remaining:
+                fitted.append(passage)
+                used += tokens
+                continue
+            kept = []
+            for sentence in SENTENCE_SPLIT.split(passage['text']):
+                sentence_tokens = estimate_tokens(sentence) + 1
+                if sentence_tokens > remaining:
+                    break
+                kept.append(sentence)
+                remaining -= sentence_tokens
+            if kept:
+                fitted.append({**passage, 'text': ' '.join(kept)})
+            break
+        return fitted
+
+    def pack(self, documents: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """
+        Pack retrieved documents in rank order.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Dict[str, int]]: Packed passages and their estimated
+                contextTokensBefore, contextTokensAfter and contextTokensSaved
+        """
+        tokens_before = sum(estimate_tokens(document.get('text', '')) for document in documents)
+        passages = self._fit_budget(self._deduplicate_sentences(self._merge_overlaps(documents)))
+        tokens_after = sum(estimate_tokens(passage['text']) for passage in passages)
+        logger.debug(f"Packed {len(documents)} chunks into {len(passages)} passages, {tokens_before} -> {tokens_after} tokens")
+        return passages, {
+            'contextTokensBefore': tokens_before,
+            'contextTokensAfter': tokens_after,
+            'contextTokensSaved': tokens_before - tokens_after
+        }
@@ -2,6 +2,7 @@ from core.embedding import EmbedderFactory
 from typing import Dict, List, Tuple, Any
 from config.experimental_config import ExperimentalConfig
 import logging
+from util.stage_timer import record_stage
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -21,6 +22,10 @@ class EmbedProcessor:
             normalize = True  # Always normalize
 
             logger.info(f"Embedding {len(chunks)} chunks with dimensions: {dimensions}.")
+            if hasattr(self.embedder, 'embed_batch'):
+                # Embedders running in-process score many chunks per forward pass
+                results = self.embedder.embed_batch(chunks, dimensions=dimensions, normalize=normalize)
+                return [(embedding, chunk, metadata) for (metadata, embedding), chunk in zip(results, chunks)]
             for idx, chunk in enumerate(chunks):
                 logger.debug(f"Embedding chunk {idx + 1}/{len(chunks)}: {chunk[:50]}...")
                 metadata, embedding = self.embedder.embed(chunk, dimensions=dimensions, normalize=normalize)
@@ -37,7 +42,8 @@ class EmbedProcessor:
         try:
             dimensions = self.experimentalConfig.vector_dimension 
             normalize = True  # Always normalize
-            metadata, embedding = self.embedder.embed(text, dimensions=dimensions, normalize=normalize)
+            with record_stage('embedding'):
+                metadata, embedding = self.embedder.embed(text, dimensions=dimensions, normalize=normalize)
             logger.info("Embedding text process completed successfully.")
             return metadata, embedding
         except Exception as e:
@@ -1,7 +1,8 @@
 from core.inference import InferencerFactory
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Iterator
 from config.experimental_config import ExperimentalConfig
 import logging
+from util.stage_timer import record_stage
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -15,13 +16,26 @@ class InferenceProcessor:
 
     def generate_text(self, user_query: str, default_prompt: str, context: List[Dict] = None, **kwargs) -> Tuple[Dict[Any,Any], str]:
         try:
-            metadata, answer = self.inferencer.generate_text(
+            with record_stage('generation'):
+                metadata, answer = self.inferencer.generate_text(
+                    user_query=user_query,
+                    context = context,
+                    default_prompt = default_prompt,
+                    experiment_config = self.experimentalConfig
+                )
+            return metadata, answer
+        except Exception as e:
+            logger.error(f"Error generating text with Inferencer: {str(e)}")
+            raise
+
+    def generate_text_stream(self, user_query: str, default_prompt: str, context: List[Dict] = None, **kwargs) -> Iterator[Dict[str, Any]]:
+        """Forward the inferencer's text and metadata events, e.g. to a streaming API response."""
+        try:
+            yield from self.inferencer.generate_text_stream(
                 user_query=user_query,
                 context = context,
-                default_prompt = default_prompt,
-                experiment_config = self.experimentalConfig
+                default_prompt = default_prompt
             )
-            return metadata, answer
         except Exception as e:
-            logger.error(f"Error generating text with Inferencer: {str(e)}")
+            logger.error(f"Error streaming text with Inferencer: {str(e)}")
             raise
@@ -0,0 +1,6 @@
+from core.rerank.rerank_factory import RerankerFactory  # Keep this for external usage.
+from core.rerank.rerank import DocumentReranker
+from core.rerank.onnx_reranker import OnnxCrossEncoderReranker
+
+# rerank_model_id 'local:<model>' reranks with an ONNX cross-encoder on the retrieval task
+RerankerFactory.register_reranker('local', OnnxCrossEncoderReranker)
@@ -0,0 +1,55 @@
+import logging
+from typing import Any, Dict, List
+
+import numpy as np
+
+from baseclasses.base_classes import BaseReranker
+from util.local_models import LocalModelRegistry
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+class OnnxCrossEncoderReranker(BaseReranker):
+    """
+    Reranks on the CPU of the retrieval task with a cross-encoder exported to ONNX.
+
+    Selected with a rerank_model_id of ``local:<model>``, where ``<model>`` names a directory with
+    model.onnx and tokenizer.json (see util/local_models.py), e.g. ``local:ms-marco-MiniLM-L-6-v2``.
+    All (question, document) pairs of a question are scored in one forward pass, which for a
+    small cross-encoder and a handful of chunks takes milliseconds and costs nothing per query.
+    """
+
+    def __init__(self, region: str, rerank_model_id: str):
+        """
+        Args:
+            region (str): Unused, rerankers are created with the experiment's region
+            rerank_model_id (str): 'local:' followed by the model name
+        """
+        self.region = region
+        self.rerank_model_id = rerank_model_id
+        self.model = LocalModelRegistry.get(rerank_model_id.split(':', 1)[1])
+
+    def score(self, input_prompt: str, texts: List[str]) -> np.ndarray:
+        """Relevance logit of every text for the prompt."""
+        features = self.model.encode([(input_prompt, text) for text in texts])
+        logits = self.model.run(features)[0]
+        # Single-logit models score relevance directly, two-class models in the second column
+        return np.asarray(logits, dtype=np.float32).reshape(len(texts), -1)[:, -1]
+
+    def rerank_documents(self, input_prompt: str, retrieved_documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Rerank documents by their cross-encoder score for the prompt.
+
+        Args:
+            input_prompt (str): The query to rerank documents for
+            retrieved_documents (list): The documents to rerank
+
+        Returns:
+            list: The same documents, most relevant first
+        """
+        if not retrieved_documents:
+            return []
+        scores = self.score(input_prompt, [document['text'] for document in retrieved_documents])
+        order = np.argsort(-scores, kind='stable')
+        return [retrieved_documents[i] for i in order]
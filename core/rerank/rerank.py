@@ -1,13 +1,16 @@
 import logging
-import boto3
+from util.boto3_clients import get_client
+from util.boto3_utils import BedRockRetryHander
+from util.rate_limiter import LIMITER_CLIENT_CONFIG
 from config.experimental_config import ExperimentalConfig
 from config.config import Config, get_config
+from baseclasses.base_classes import BaseReranker
 
 # Set up logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.ERROR)
 
-class DocumentReranker:
+class DocumentReranker(BaseReranker):
     def __init__(self, region, rerank_model_id):
         """
         Initialize the DocumentReranker with the AWS region, model ID, and Bedrock agent runtime.
@@ -19,8 +22,12 @@ class DocumentReranker:
         """
         self.region = region
         self.rerank_model_id = rerank_model_id
-        self.bedrock_agent_runtime = boto3.client('bedrock-agent-runtime', region_name=self.region)
+        self.bedrock_agent_runtime = get_client('bedrock-agent-runtime', self.region, **LIMITER_CLIENT_CONFIG)
         
+    @BedRockRetryHander(limiter_key_attr='rerank_model_id')
+    def _rerank(self, **request_params):
+        return self.bedrock_agent_runtime.rerank(**request_params)
+
     def rerank_documents(self, input_prompt, retrieved_documents):
         """
         Rerank a list of documents based on a query using Amazon Bedrock's reranking model.
@@ -49,7 +56,7 @@ class DocumentReranker:
             } for doc in retrieved_documents]
 
             # Call the Bedrock API for reranking
-            response = self.bedrock_agent_runtime.rerank(
+            response = self._rerank(
                 queries=[{
                     "type": "TEXT",
                     "textQuery": {"text": input_prompt}
@@ -0,0 +1,47 @@
+import logging
+import threading
+from typing import Dict, Type
+
+from baseclasses.base_classes import BaseReranker
+from core.rerank.rerank import DocumentReranker
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+class RerankerFactory:
+    """
+    Creates rerankers by rerank_model_id.
+
+    Ids of the form ``<service>:<model>`` whose service is registered go to that service's reranker,
+    every other id is a Bedrock reranking model. Rerankers hold only clients or loaded models, so one
+    per model and region is shared by all questions and threads.
+    """
+
+    _registry: Dict[str, Type[BaseReranker]] = {}
+    _rerankers: Dict[str, BaseReranker] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def register_reranker(cls, service_type: str, reranker_cls: Type[BaseReranker]):
+        cls._registry[service_type] = reranker_cls
+
+    @classmethod
+    def reranker_class(cls, rerank_model_id: str) -> Type[BaseReranker]:
+        service_type, separator, model_id = rerank_model_id.partition(':')
+        if separator and model_id and service_type in cls._registry:
+            return cls._registry[service_type]
+        return DocumentReranker
+
+    @classmethod
+    def create_reranker(cls, region: str, rerank_model_id: str) -> BaseReranker:
+        key = f"{region}:{rerank_model_id}"
+        reranker = cls._rerankers.get(key)
+        if reranker is not None:
+            return reranker
+        with cls._lock:
+            if key not in cls._rerankers:
+                reranker_cls = cls.reranker_class(rerank_model_id)
+                logger.info(f"Creating {reranker_cls.__name__} for rerank model {rerank_model_id}")
+                cls._rerankers[key] = reranker_cls(region, rerank_model_id)
+            return cls._rerankers[key]
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from util.boto3_clients import get_client
+from botocore.exceptions import ClientError
+
+from config.config import Config
+from config.experimental_config import ExperimentalConfig
+from core.dynamodb import DynamoDBOperations
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+class RetrievalPlanner:
+    """
+    Shares one vector search per question across experiments of an execution that use the same index.
+
+    Experiments that differ only in ``knn_num`` would otherwise run a full retrieval pass each.
+    The planner searches once at the largest k in the group, stores the ranked list in S3 and
+    hands every experiment its own top-k prefix. Hierarchical indices are collapsed on parent_id
+    in that search, so every prefix holds distinct parents. Reranking is left to the caller so it
+    still runs per experiment on the sliced list.
+
+    Storing and loading the ranked lists costs an S3 PUT and GET per question, so the planner is
+    only worth using when ``shared`` is true, i.e. other experiments of the execution use the index.
+    """
+
+    def __init__(self, config: Config, experimentalConfig: ExperimentalConfig, vector_database):
+        """
+        Initialize the planner for an experiment.
+
+        Args:
+            config (Config): Global configuration object
+            experimentalConfig (ExperimentalConfig): Experiment-specific configuration
+            vector_database: Vector database used when the ranked list is not stored yet
+        """
+        self.vector_database = vector_database
+        self.index_id = experimentalConfig.index_id
+        self.execution_id = experimentalConfig.execution_id
+        self.knn_num = int(experimentalConfig.knn_num)
+        self.ef_search = experimentalConfig.hnsw_ef_search
+        # Hierarchical indices return one child per parent, so every prefix holds distinct parents
+        self.collapse_field = 'parent_id' if experimentalConfig.chunking_strategy.lower() == 'hierarchical' else None
+        self.oversample = config.hierarchical_collapse_oversample
+        self.vector_field = config.vector_field
+        self.bucket = config.s3_bucket
+        self.prefix = f"retrieval_plans/{self.execution_id}/{self.index_id}/ef{self.ef_search}"
+        self.s3_client = get_client('s3')
+        self.group_size = 1
+        self.group_k = self._resolve_group_k(config)
+        logger.info(f"Retrieval plan for index {self.index_id}: {self.group_size} experiments, searching at k={self.group_k}, slicing to k={self.knn_num}")
+
+    @property
+    def shared(self) -> bool:
+        """Whether other experiments of the execution search the same index with the same ef_search."""
+        return self.group_size > 1
+
+    def _resolve_group_k(self, config: Config) -> int:
+        """
+        Return the largest knn_num among the experiments of this execution sharing the index and ef_search,
+        and count them in group_size.
+        """
+        try:
+            experiment_db = DynamoDBOperations(region=config.aws_region, table_name=config.experiment_table)
+            knn_values = []
+            last_evaluated_key = None
+            while True:
+                response = experiment_db.query(
+                    "index_id = :indexId",
+                    expression_values={":indexId": self.index_id},
+                    index_name=config.experiment_index_id_index,
+                    exclusive_start_key=last_evaluated_key
+                )
+                for item in response.get('Items', []):
+                    if item.get('execution_id') != self.execution_id:
+                        continue
+                    if int(item.get('config', {}).get('hnsw_ef_search') or 100) != self.ef_search:
+                        continue
+                    knn_num = item.get('config', {}).get('knn_num')
+                    if knn_num:
+                        knn_values.append(int(knn_num))
+                last_evaluated_key = response.get('LastEvaluatedKey')
+                if not last_evaluated_key:
+                    break
+            # The experiment's own item is among the results
+            self.group_size = max(1, len(knn_values))
+            return max(knn_values + [self.knn_num])
+        except Exception as e:
+            logger.warning(f"Could not resolve retrieval group for index {self.index_id}, using own k: {str(e)}")
+            return self.knn_num
+
+    def _object_key(self, question: str) -> str:
+        question_hash = hashlib.sha256(question.encode('utf-8')).hexdigest()
+        return f"{self.prefix}/{question_hash}.json"
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=key)
+            return json.loads(response['Body'].read().decode('utf-8'))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in ('NoSuchKey', '404'):
+                logger.warning(f"Failed to read stored retrieval results {key}: {str(e)}")
+            return None
+
+    def _store(self, key: str, plan: Dict[str, Any]) -> None:
+        try:
+            self.s3_client.put_object(Bucket=self.bucket, Key=key, Body=json.dumps(plan), ContentType='application/json')
+        except Exception as e:
+            logger.warning(f"Failed to store retrieval results {key}: {str(e)}")
+
+    def search(self, question: str, query_embedding: List[float]) -> List[Dict[str, Any]]:
+        """
+        Return the top-k results for the question, searching only if no sibling experiment did already.
+
+        Args:
+            question (str): The ground truth question
+            query_embedding (List[float]): Embedding of the question
+
+        Returns:
+            List[Dict[str, Any]]: Ranked documents truncated to this experiment's knn_num
+        """
+        key = self._object_key(question)
+        plan = self._load(key)
+
+        if plan is None or plan.get('k', 0) < self.knn_num:
+            results = self.vector_database.search(
+                self.index_id, query_embedding, self.group_k, ef_search=self.ef_search,
+                collapse_field=self.collapse_field, oversample=self.oversample
+            )
+            # Vectors are not needed downstream and would make every stored list several times larger
+            results = [
+                {field: value for field, value in document.items() if field != self.vector_field}
+                for document in results
+            ]
+            self._store(key, {'k': self.group_k, 'results': results})
+        else:
+            logger.debug(f"Reusing stored retrieval results for {key}")
+            results = plan['results']
+
+        return results[:self.knn_num]
@@ -83,7 +83,24 @@ class ExperimentalConfigService:
             eval_retrieval_model=exp_config_data.get('eval_retrieval_model', "mistral.mixtral-8x7b-instruct-v0:1"),
             bedrock_knowledge_base=exp_config_data.get('bedrock_knowledge_base', False),
             knowledge_base=exp_config_data.get('knowledge_base', False),
-            is_opensearch=True if exp_config_data.get('opensearch_host') else False
+            is_opensearch=True if exp_config_data.get('opensearch_host') else False,
+            enable_response_cache=experiment.get('config').get('enable_response_cache', False),
+            response_cache_allow_sampling=experiment.get('config').get('response_cache_allow_sampling', False),
+            batch_inference=experiment.get('config').get('batch_inference', False),
+            prompt_caching=experiment.get('config').get('prompt_caching', False),
+            streaming_inference=experiment.get('config').get('streaming_inference', False),
+            speculative_guardrails=experiment.get('config').get('speculative_guardrails', False),
+            vector_store=experiment.get('config').get('vector_store', 'opensearch'),
+            lexical_fusion=experiment.get('config').get('lexical_fusion', False),
+            rrf_k=int(experiment.get('config').get('rrf_k') or 60),
+            hnsw_m=int(experiment.get('config').get('hnsw_m') or 16),
+            hnsw_ef_construction=int(experiment.get('config').get('hnsw_ef_construction') or 512),
+            hnsw_ef_search=int(experiment.get('config').get('hnsw_ef_search') or 100),
+            context_packing=experiment.get('config').get('context_packing', False),
+            context_token_budget=int(experiment.get('config').get('context_token_budget') or 0),
+            retrieval_only=experiment.get('config').get('retrieval_only', False),
+            shard_index=exp_config_data.get('shard_index'),
+            shard_count=int(exp_config_data.get('shard_count') or 1)
         )
 
         n_shot_prompt_guide = experiment.get('config').get('n_shot_prompt_guide')
@@ -0,0 +1,129 @@
+import logging
+from typing import Any, Dict, List, Tuple
+
+from config.experimental_config import ExperimentalConfig
+from core.dynamodb import DynamoDBOperations
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Counters summed over shards onto the experiment record
+TOKEN_COUNTERS = ('retrieval_query_embed_tokens', 'retrieval_input_tokens', 'retrieval_output_tokens')
+
+# Reports of a shard's own process, which percentiles and limiter state cannot be merged across,
+# stored on the experiment record keyed by shard
+SHARD_REPORTS = ('stage_latency_percentiles', 'rate_limiter_metrics', 'hedging_metrics')
+
+
+class ShardingError(Exception):
+    """Raised when shards cannot be reduced, e.g. because some have not reported yet."""
+    pass
+
+
+def shard_bounds(total: int, shard_count: int, shard_index: int) -> Tuple[int, int]:
+    """
+    Start and end of a shard's slice of the ground truth. Slices are contiguous and differ in size
+    by at most one question, so every worker derives the same split without coordination.
+    """
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"Shard index {shard_index} is outside 0..{shard_count - 1}")
+    return total * shard_index // shard_count, total * (shard_index + 1) // shard_count
+
+
+def shard_key(shard_index: int) -> str:
+    return f"shard_{shard_index}"
+
+
+def record_shard_result(experiment_db: DynamoDBOperations, experimentalConfig: ExperimentalConfig, result: Dict[str, Any]) -> None:
+    """Store a shard's retrieval counters in the experiment's shards map, replacing a previous run of the shard."""
+    key = {'id': experimentalConfig.experiment_id}
+    experiment_db.update_item(key=key, update_expression="SET shards = if_not_exists(shards, :empty)", expression_values={':empty': {}})
+    experiment_db.update_item(
+        key=key,
+        update_expression=f"SET shards.{shard_key(experimentalConfig.shard_index)} = :shard",
+        expression_values={':shard': result}
+    )
+
+
+def record_shard_eval_metrics(experiment_db: DynamoDBOperations, experimentalConfig: ExperimentalConfig,
+                              eval_metrics: Dict[str, Any]) -> None:
+    """Store the evaluation metrics of a shard next to its retrieval counters."""
+    experiment_db.update_item(
+        key={'id': experimentalConfig.experiment_id},
+        update_expression=f"SET shards.{shard_key(experimentalConfig.shard_index)}.eval_metrics = :eval",
+        expression_values={':eval': eval_metrics}
+    )
+
+
+def _weighted_means(metrics_by_shard: List[Tuple[Dict[str, Any], int]]) -> Dict[str, float]:
+    """Question-weighted mean of every numeric metric, metrics stored as strings included."""
+    sums: Dict[str, float] = {}
+    weights: Dict[str, int] = {}
+    for metrics, questions in metrics_by_shard:
+        for name, value in (metrics or {}).items():
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            sums[name] = sums.get(name, 0.0) + value * questions
+            weights[name] = weights.get(name, 0) + questions
+    return {name: round(sums[name] / weights[name], 4) for name in sums if weights[name]}
+
+
+def reduce_shards(experiment_db: DynamoDBOperations, experimentalConfig: ExperimentalConfig) -> Dict[str, Any]:
+    """
+    Aggregate the shards of an experiment onto its record.
+
+    Token counters are summed; eval_metrics and retrieval_metrics are averaged weighted by the
+    number of questions of each shard, which is what a single worker would have computed.
+    Stage latency percentiles, rate limiter and hedging metrics are kept per shard, e.g.
+    ``stage_latency_percentiles.shard_0``.
+
+    Returns:
+        Dict[str, Any]: The aggregated attributes
+
+    Raises:
+        ShardingError: If any of the experiment's shards has not recorded its result
+    """
+    experiment = experiment_db.get_item({'id': experimentalConfig.experiment_id}) or {}
+    shards = experiment.get('shards') or {}
+    missing = [i for i in range(experimentalConfig.shard_count) if shard_key(i) not in shards]
+    if missing:
+        raise ShardingError(f"Experiment {experimentalConfig.experiment_id} is missing shards {missing}")
+    results = [shards[shard_key(i)] for i in range(experimentalConfig.shard_count)]
+
+    aggregated: Dict[str, Any] = {name: sum(int(result.get(name, 0)) for result in results) for name in TOKEN_COUNTERS}
+    update_expression = "SET " + ", ".join(f"{name} = :{name}" for name in TOKEN_COUNTERS)
+    expression_values = {f":{name}": aggregated[name] for name in TOKEN_COUNTERS}
+
+    eval_metrics = _weighted_means([(result.get('eval_metrics'), int(result.get('questions', 0))) for result in results])
+    if eval_metrics:
+        # Same shape as the evaluators write for an unsharded experiment
+        aggregated['eval_metrics'] = {name: str(value) for name, value in eval_metrics.items()}
+        update_expression += ", eval_metrics = :eval"
+        expression_values[':eval'] = {'M': aggregated['eval_metrics']}
+
+    retrieval_metrics = _weighted_means([(result.get('retrieval_metrics'), int(result.get('questions', 0))) for result in results])
+    if retrieval_metrics:
+        retrieval_metrics['questions'] = sum(int(result.get('questions', 0)) for result in results)
+        aggregated['retrieval_metrics'] = retrieval_metrics
+        update_expression += ", retrieval_metrics = :retrievalmetrics"
+        expression_values[':retrievalmetrics'] = retrieval_metrics
+
+    for name in SHARD_REPORTS:
+        reports = {shard_key(i): result[name] for i, result in enumerate(results) if result.get(name) is not None}
+        if reports:
+            aggregated[name] = reports
+            update_expression += f", {name} = :{name}"
+            expression_values[f":{name}"] = reports
+
+    experiment_db.update_item(key={'id': experimentalConfig.experiment_id}, update_expression=update_expression,
+                              expression_values=expression_values)
+    logger.info(f"Reduced {len(results)} shards of experiment {experimentalConfig.experiment_id}: {aggregated}")
+    return aggregated
+
+
+def mean_eval_metrics(metrics_list: List[Any]) -> Dict[str, str]:
+    """Mean of per-question EvaluationMetrics, in the string form of EvaluationMetrics.to_dict."""
+    means = _weighted_means([(metrics.to_dict(), 1) for metrics in metrics_list if metrics])
+    return {name: str(value) for name, value in means.items()}
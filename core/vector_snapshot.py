@@ -0,0 +1,257 @@
+import json
+import logging
+import mmap
+import os
+import shutil
+import uuid
+from typing import Any, Dict, Optional, Sequence, Union
+
+from util.boto3_clients import get_client
+import numpy as np
+from botocore.exceptions import ClientError
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+# Files of a snapshot, all little-endian and row-major
+MANIFEST_FILE = 'manifest.json'
+VECTORS_FILE = 'vectors.bin'      # count x dimension float32 or int8
+SCALES_FILE = 'scales.bin'        # count float32 per-row dequantization scales, int8 only
+RECORDS_FILE = 'records.bin'      # UTF-8 JSON of each document without its vector, concatenated
+OFFSETS_FILE = 'offsets.bin'      # count + 1 uint64 byte offsets into records.bin
+ANN_FILE = 'ann.faiss'            # optional serialized FAISS index
+
+SNAPSHOT_DTYPES = ('float32', 'int8')
+
+
+class SnapshotWriter:
+    """
+    Streams vectors and documents into a snapshot directory.
+
+    int8 snapshots quantize every vector symmetrically with its own scale, so the stored matrix
+    is a quarter of the float32 size and inner products are recovered as ``(q . v_int8) * scale``.
+    """
+
+    def __init__(self, directory: str, dimension: int, dtype: str = 'float32', algorithm: str = 'exact', vector_field: str = 'vectors',
+                 hnsw: Optional[Dict[str, int]] = None):
+        if dtype not in SNAPSHOT_DTYPES:
+            raise ValueError(f"Unsupported snapshot dtype: {dtype}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.dimension = dimension
+        self.dtype = dtype
+        self.algorithm = algorithm
+        self.vector_field = vector_field
+        self.hnsw = hnsw or {}
+        self.count = 0
+        self._offset = 0
+        self._vectors = open(os.path.join(directory, VECTORS_FILE), 'wb')
+        self._scales = open(os.path.join(directory, SCALES_FILE), 'wb') if dtype == 'int8' else None
+        self._records = open(os.path.join(directory, RECORDS_FILE), 'wb')
+        self._offsets = open(os.path.join(directory, OFFSETS_FILE), 'wb')
+        self._offsets.write(np.asarray([0], dtype='<u8').tobytes())
+
+    def add(self, vector: Sequence[float], document: Dict[str, Any]) -> None:
+        row = np.asarray(vector, dtype=np.float32).reshape(self.dimension)
+        if self.dtype == 'int8':
+            max_abs = float(np.max(np.abs(row)))
+            scale = max_abs / 127 if max_abs > 0 else 1.0
+            self._vectors.write(np.round(row / scale).astype(np.int8).tobytes())
+            self._scales.write(np.asarray([scale], dtype='<f4').tobytes())
+        else:
+            self._vectors.write(row.astype('<f4').tobytes())
+
+        record = json.dumps(document, default=str).encode('utf-8')
+        self._records.write(record)
+        self._offset += len(record)
+        self._offsets.write(np.asarray([self._offset], dtype='<u8').tobytes())
+        self.count += 1
+
+    def close(self, ann_index: Any = None) -> None:
+        """Flush all files and write the manifest, which marks the snapshot as complete."""
+        for file in (self._vectors, self._scales, self._records, self._offsets):
+            if file:
+                file.close()
+        if ann_index is not None:
+            faiss.write_index(ann_index, os.path.join(self.directory, ANN_FILE))
+
+        manifest = {
+            'format_version': SNAPSHOT_FORMAT_VERSION,
+            'count': self.count,
+            'dimension': self.dimension,
+            'dtype': self.dtype,
+            'algorithm': self.algorithm,
+            'vector_field': self.vector_field,
+            'hnsw': self.hnsw,
+            'has_ann': ann_index is not None
+        }
+        with open(os.path.join(self.directory, MANIFEST_FILE), 'w') as file:
+            json.dump(manifest, file)
+
+
+class SnapshotDocuments(Sequence):
+    """Read-only sequence of the documents of a snapshot, decoded on access from the memory-mapped records."""
+
+    def __init__(self, records: Union[mmap.mmap, bytes], offsets: np.ndarray):
+        self._records = records
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return json.loads(self._records[start:end].decode('utf-8'))
+
+
+def map_records(directory: str) -> Union[mmap.mmap, bytes]:
+    """Memory-map the records file of a snapshot. The map keeps its own handle, so the file is closed right away."""
+    with open(os.path.join(directory, RECORDS_FILE), 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class VectorSnapshot:
+    """
+    A snapshot opened with memory maps.
+
+    Opening only maps the files, so it is near-instant regardless of size, and every process that
+    opens the same local copy shares its pages through the OS page cache.
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, MANIFEST_FILE), 'r') as file:
+            self.manifest = json.load(file)
+        if self.manifest['format_version'] != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version {self.manifest['format_version']}")
+
+        self.directory = directory
+        self.count = self.manifest['count']
+        self.dimension = self.manifest['dimension']
+        self.dtype = self.manifest['dtype']
+        self.algorithm = self.manifest['algorithm']
+        self.vector_field = self.manifest['vector_field']
+
+        self.vectors = self._memmap(VECTORS_FILE, '<f4' if self.dtype == 'float32' else 'i1', (self.count, self.dimension))
+        self.scales = self._memmap(SCALES_FILE, '<f4', (self.count,)) if self.dtype == 'int8' else None
+        offsets = self._memmap(OFFSETS_FILE, '<u8', (self.count + 1,))
+
+        self.documents = SnapshotDocuments(map_records(directory), offsets)
+
+    def _memmap(self, name: str, dtype: str, shape: tuple) -> np.ndarray:
+        if shape[0] == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(os.path.join(self.directory, name), dtype=dtype, mode='r', shape=shape)
+
+    def load_ann_index(self) -> Optional[Any]:
+        """Load the stored FAISS index, memory-mapped where the index type allows it."""
+        path = os.path.join(self.directory, ANN_FILE)
+        if not self.manifest.get('has_ann') or faiss is None or not os.path.exists(path):
+            return None
+        try:
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP)
+        except RuntimeError:
+            return faiss.read_index(path)
+
+    def inner_products(self, queries: np.ndarray, block_rows: int = 65536) -> np.ndarray:
+        """Exact inner products of the queries with every vector, dequantizing int8 blocks on the fly."""
+        if self.dtype == 'float32':
+            return queries @ self.vectors.T
+        scores = np.empty((len(queries), self.count), dtype=np.float32)
+        for start in range(0, self.count, block_rows):
+            block = self.vectors[start:start + block_rows].astype(np.float32)
+            scores[:, start:start + len(block)] = (queries @ block.T) * self.scales[start:start + len(block)]
+        return scores
+
+
+def add_ann_index(directory: str, ann_index: Any) -> None:
+    """Attach a FAISS index to a finished snapshot."""
+    faiss.write_index(ann_index, os.path.join(directory, ANN_FILE))
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    with open(manifest_path, 'r') as file:
+        manifest = json.load(file)
+    manifest['has_ann'] = True
+    with open(manifest_path, 'w') as file:
+        json.dump(manifest, file)
+
+
+def upload_snapshot(directory: str, bucket: str, prefix: str) -> None:
+    """Upload a snapshot directory to S3, the manifest last so readers never see a partial snapshot."""
+    s3_client = get_client('s3')
+    names = sorted(name for name in os.listdir(directory) if name != MANIFEST_FILE)
+    for name in names + [MANIFEST_FILE]:
+        s3_client.upload_file(os.path.join(directory, name), bucket, f"{prefix}/{name}")
+    logger.info(f"Uploaded vector snapshot to s3://{bucket}/{prefix}")
+
+
+def _install(staging: str, target: str) -> None:
+    """Rename a complete download into place, replacing a stale target directory that has no manifest."""
+    for _ in range(2):
+        try:
+            os.rename(staging, target)
+            return
+        except OSError:
+            if os.path.exists(os.path.join(target, MANIFEST_FILE)):
+                # Another worker finished first, use its copy
+                shutil.rmtree(staging, ignore_errors=True)
+                return
+        # Left by an interrupted copy or an older layout; moved aside first so no worker sees it half deleted
+        stale = f"{target}.stale.{uuid.uuid4().hex}"
+        try:
+            os.rename(target, stale)
+        except OSError:
+            pass
+        shutil.rmtree(stale, ignore_errors=True)
+    raise OSError(f"Could not move the download into {target}")
+
+
+def download_snapshot(bucket: str, prefix: str, cache_dir: str) -> str:
+    """
+    Download a snapshot from S3 into the local cache once and return its directory.
+
+    Concurrent workers download to private temporary directories and rename into place, so a
+    process never maps a partially written snapshot.
+    """
+    target = os.path.join(cache_dir, prefix.replace('/', '_'))
+    if os.path.exists(os.path.join(target, MANIFEST_FILE)):
+        return target
+
+    s3_client = get_client('s3')
+    try:
+        manifest = s3_client.get_object(Bucket=bucket, Key=f"{prefix}/{MANIFEST_FILE}")['Body'].read()
+    except ClientError as e:
+        raise ValueError(f"Vector snapshot not found in s3://{bucket}/{prefix}") from e
+
+    staging = f"{target}.{uuid.uuid4().hex}"
+    os.makedirs(staging)
+    try:
+        manifest_data = json.loads(manifest)
+        # Other artifacts stored in this layout, such as lexical indices, list their files
+        names = list(manifest_data.get('files') or [VECTORS_FILE, RECORDS_FILE, OFFSETS_FILE])
+        if manifest_data.get('dtype') == 'int8':
+            names.append(SCALES_FILE)
+        if manifest_data.get('has_ann'):
+            names.append(ANN_FILE)
+        for name in names:
+            s3_client.download_file(bucket, f"{prefix}/{name}", os.path.join(staging, name))
+        with open(os.path.join(staging, MANIFEST_FILE), 'wb') as file:
+            file.write(manifest)
+        _install(staging, target)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    logger.info(f"Downloaded vector snapshot s3://{bucket}/{prefix} to {target}")
+    return target
+
@@ -7,6 +7,10 @@ logger = logging.getLogger(__name__)
 
 
 def evaluate(experiment_config: ExperimentalConfig):
+    if experiment_config.retrieval_only:
+        # Retrieval metrics were already scored and stored by the retriever
+        logger.info(f"Skipping evaluation of retrieval-only experiment {experiment_config.experiment_id}")
+        return
     try:
         EvalProcessor(experiment_config).evaluate()
     except Exception as e:
@@ -0,0 +1,66 @@
+import json
+import os
+from task_processor import FargateTaskProcessor
+from config.config import Config
+from core.service.experimental_config_service import ExperimentalConfigService
+from retriever.shard_runner import reduce_experiment, run_shard
+
+import logging
+logger = logging.getLogger()
+logging.basicConfig(level=logging.INFO)
+
+
+class ShardProcessor(FargateTaskProcessor):
+    """
+    Runs one shard of a sharded experiment, or the reducer once every shard has finished.
+
+    The input is the experiment's task input with shard_index and shard_count added for a shard
+    worker, or with reduce_shards set to true and shard_count for the reducer. The state machine
+    passes the experiment's input unchanged and sets these through the SHARD_INDEX, SHARD_COUNT
+    and REDUCE_SHARDS environment variables instead.
+    """
+    def process(self):
+        try:
+            logger.info("Input data: %s", self.input_data)
+            exp_config_data = dict(self.input_data)
+            if os.environ.get('SHARD_INDEX'):
+                exp_config_data['shard_index'] = int(os.environ['SHARD_INDEX'])
+            if os.environ.get('SHARD_COUNT'):
+                exp_config_data['shard_count'] = int(os.environ['SHARD_COUNT'])
+            if os.environ.get('REDUCE_SHARDS', '').lower() == 'true':
+                exp_config_data['reduce_shards'] = True
+
+            # Load base configuration
+            config = Config.load_config()
+
+            exp_config = ExperimentalConfigService(config).create_experimental_config(exp_config_data)
+
+            if exp_config_data.get('reduce_shards'):
+                logger.info("Into shard reducer. Processing event: %s", json.dumps(exp_config_data))
+                reduce_experiment(config, exp_config)
+            else:
+                logger.info("Into shard processor. Processing event: %s", json.dumps(exp_config_data))
+                run_shard(config, exp_config, evaluate_shard=not exp_config_data.get('skip_eval', False))
+
+            self.send_task_success({
+                "status": "success"
+            })
+
+        except Exception as e:
+            logger.error(f"Error processing event: {str(e)}")
+            self.send_task_failure({
+                "status": "failed",
+                "errorMessage": str(e)
+            })
+
+
+def main():
+    try:
+        fargate_processor = ShardProcessor()
+        fargate_processor.process()
+    except Exception as e:
+        logger.error(f"Error processing event: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    main()
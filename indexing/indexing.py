@@ -1,5 +1,7 @@
 from core.processors import ChunkingProcessor, EmbedProcessor
 from core.opensearch_vectorstore import OpenSearchVectorDatabase
+from core.local_vectorstore import LocalVectorDatabase
+from core.lexical_vectorstore import BM25VectorDatabase
 from util.s3util import S3Util
 from util.pdf_utils import process_pdf_from_folder
 import logging
@@ -59,8 +61,11 @@ def chunk_embed_store(config : Config, experimentalConfig : ExperimentalConfig)-
             for chunk in chunks:
                 embed_chunks.append(chunk[2]) # Child Chunk only
 
-        # Step 2: Embedding
-        embedding_results = EmbedProcessor(experimentalConfig).embed(embed_chunks)
+        # Step 2: Embedding, which lexical indices do without
+        if experimentalConfig.vector_store == 'bm25':
+            embedding_results = [(None, chunk, {'inputTokens': '0'}) for chunk in embed_chunks]
+        else:
+            embedding_results = EmbedProcessor(experimentalConfig).embed(embed_chunks)
 
         total_index_embed_tokens = 0
         for _, _, metadata in embedding_results:
@@ -107,14 +112,21 @@ def chunk_embed_store(config : Config, experimentalConfig : ExperimentalConfig)-
                     expression_values={':embed': total_index_embed_tokens}
                 )
         
-        _insert_to_opensearch(config, documents)
+        if experimentalConfig.vector_store == 'bm25':
+            _insert_to_lexical_index(config, experimentalConfig, documents)
+        elif experimentalConfig.vector_store == 'local':
+            _insert_to_local_index(config, experimentalConfig, documents)
+        else:
+            _insert_to_opensearch(config, documents)
+        if experimentalConfig.lexical_fusion and experimentalConfig.vector_store != 'bm25':
+            _insert_to_lexical_index(config, experimentalConfig, documents)
     except Exception as e:
         logger.exception(f"Pipeline failed: {e}")
         raise e
     
 def _insert_to_opensearch(config: Config, documents: List[Dict[str, Any]]):
     vector_database = OpenSearchVectorDatabase(host=config.opensearch_host, is_serverless=config.opensearch_serverless, region=config.aws_region,username=config.opensearch_username,
-        password=config.opensearch_password)
+        password=config.opensearch_password, pool_maxsize=config.opensearch_pool_maxsize, keepalive_idle=config.opensearch_keepalive_idle)
     chunks_length = len(documents)
     chunk_size = 500 # Default chunk size streaming by Opensearch
     if chunks_length < chunk_size:
@@ -123,5 +135,41 @@ def _insert_to_opensearch(config: Config, documents: List[Dict[str, Any]]):
     bulk(vector_database.client, documents, chunk_size=chunk_size, max_retries=1)
     logger.info("Opensearch Bulk insert successful \n Pipeline completed successfully.")
 
+def _insert_to_local_index(config: Config, experimentalConfig: ExperimentalConfig, documents: List[Dict[str, Any]]):
+    vector_database = LocalVectorDatabase(
+        vector_field=config.vector_field,
+        bucket=config.s3_bucket,
+        prefix=config.local_vector_index_prefix,
+        exact_max=config.local_vector_exact_max,
+        snapshot_dtype=config.local_vector_snapshot_dtype,
+        cache_dir=config.vector_snapshot_cache_dir
+    )
+    mapping = {
+        "properties": {
+            config.vector_field: {
+                "type": "knn_vector",
+                "dimension": int(experimentalConfig.vector_dimension)
+            }
+        }
+    }
+    vector_database.create_index(
+        experimentalConfig.index_id, mapping, experimentalConfig.indexing_algorithm,
+        m=experimentalConfig.hnsw_m,
+        ef_construction=experimentalConfig.hnsw_ef_construction,
+        ef_search=experimentalConfig.hnsw_ef_search
+    )
+    vector_database.insert_documents(experimentalConfig.index_id, documents)
+    vector_database.save(experimentalConfig.index_id)
+    logger.info("Local index build successful \n Pipeline completed successfully.")
 
-
+def _insert_to_lexical_index(config: Config, experimentalConfig: ExperimentalConfig, documents: List[Dict[str, Any]]):
+    vector_database = BM25VectorDatabase(
+        vector_field=config.vector_field,
+        bucket=config.s3_bucket,
+        prefix=config.lexical_index_prefix,
+        cache_dir=config.vector_snapshot_cache_dir
+    )
+    vector_database.create_index(experimentalConfig.index_id)
+    vector_database.insert_documents(experimentalConfig.index_id, documents)
+    vector_database.save(experimentalConfig.index_id)
+    logger.info("Lexical index build successful \n Pipeline completed successfully.")
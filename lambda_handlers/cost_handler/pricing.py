@@ -90,7 +90,7 @@ def compute_actual_price_breakdown(
                 indexing_cost = (embedding_model_price * float(index_embed_tokens)) / THOUSAND
                 indexing_metadata['knowledge_base_tokens'] = index_embed_tokens
                 indexing_metadata['bedrock_cost'] = indexing_cost
-            else:
+            elif embedding_service == "sagemaker":
                 indexing_cost = sagemaker_cost(indexing_time)
                 indexing_metadata['sagemaker_cost'] = indexing_cost
         
@@ -140,14 +140,18 @@ def compute_actual_price_breakdown(
             if rerank_model_id and rerank_model_id != "none" :
                 retriever_metadata['rerank_model'] = rerank_model_id
                 retriever_metadata['reranker_queries'] = question_details["reranker_queries"]
-                reranker_model_price = df[(df["model"] == rerank_model_id) & (df["Region"] == aws_region)]["input_price"]
-                if reranker_model_price.empty:
-                    logger.error(f"No reranker model {rerank_model_id} price found.")
-                    return None
-                reranker_model_price = float(reranker_model_price.values[0])  # Price per 1000 queries
-                reranking_cost = (reranker_model_price * float(question_details['reranker_queries'])) / THOUSAND
-                retriever_metadata['reranking_cost'] = reranking_cost
-                retrieval_cost += reranking_cost
+                if rerank_model_id.startswith("local:"):
+                    # Local rerankers run on the retrieval task, whose runtime is already costed
+                    retriever_metadata['reranking_cost'] = 0
+                else:
+                    reranker_model_price = df[(df["model"] == rerank_model_id) & (df["Region"] == aws_region)]["input_price"]
+                    if reranker_model_price.empty:
+                        logger.error(f"No reranker model {rerank_model_id} price found.")
+                        return None
+                    reranker_model_price = float(reranker_model_price.values[0])  # Price per 1000 queries
+                    reranking_cost = (reranker_model_price * float(question_details['reranker_queries'])) / THOUSAND
+                    retriever_metadata['reranking_cost'] = reranking_cost
+                    retrieval_cost += reranking_cost
             inferencing_cost = retrieval_model_input_actual_cost + retrieval_model_output_actual_cost + query_embedding_cost
         else:
             inferencer_metadata['runtime'] = retrieval_time
@@ -159,7 +163,7 @@ def compute_actual_price_breakdown(
                     inferencing_cost += query_embedding_cost
                     inferencer_metadata['query_embed_tokens'] = query_embed_tokens
                     inferencer_metadata['query_embed_tokens_cost'] = query_embedding_cost
-                else:
+                elif embedding_service == "sagemaker":
                     embedding_sagemaker_cost = sagemaker_cost(retrieval_time)
                     inferencing_cost += embedding_sagemaker_cost
                     inferencer_metadata['sagemaker_embedding_cost'] = embedding_sagemaker_cost
@@ -0,0 +1,115 @@
+"""
+Export an existing OpenSearch index into the vector snapshot format.
+
+The snapshot is written under ``{local_vector_index_prefix}/{index}`` in the configured S3 bucket,
+where experiments with ``vector_store`` set to ``local`` and other processes can memory-map it.
+
+    python -m opensearch.export_snapshot --index hnsw-fixed-512 --dtype int8 --build-ann
+"""
+import argparse
+import logging
+import shutil
+import tempfile
+from typing import Optional
+
+from opensearchpy.helpers import scan
+
+from config.config import Config
+from core.local_vectorstore import LocalVectorDatabase
+from core.opensearch_vectorstore import OpenSearchVectorDatabase
+from core.vector_snapshot import SnapshotWriter, add_ann_index, upload_snapshot
+
+logging.basicConfig(
+    level=logging.INFO,
+)
+logger = logging.getLogger(__name__)
+
+
+class OpenSearchSnapshotExporter:
+    """Streams the documents of an OpenSearch k-NN index into a vector snapshot."""
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.opensearch_db = OpenSearchVectorDatabase(
+            host=config.opensearch_host,
+            is_serverless=config.opensearch_serverless,
+            region=config.aws_region,
+            username=config.opensearch_username,
+            password=config.opensearch_password,
+            pool_maxsize=config.opensearch_pool_maxsize,
+            keepalive_idle=config.opensearch_keepalive_idle
+        )
+
+    def _vector_field(self, index_name: str) -> dict:
+        properties = self.opensearch_db.client.indices.get_mapping(index=index_name)[index_name]['mappings']['properties']
+        for field, props in properties.items():
+            if props.get('type') == 'knn_vector':
+                return {'name': field, 'dimension': props['dimension'], 'method': props.get('method', {}).get('name', 'hnsw')}
+        raise ValueError(f"Index {index_name} does not contain a knn_vector field")
+
+    def export(self, index_name: str, directory: str, dtype: str = 'float32', algorithm: Optional[str] = None,
+               build_ann: bool = False, batch_size: int = 1000) -> int:
+        """
+        Write the index to a snapshot directory.
+
+        Args:
+            index_name (str): OpenSearch index to export
+            directory (str): Local directory for the snapshot files
+            dtype (str): 'float32' or 'int8' vector storage
+            algorithm (str, optional): Algorithm recorded for the local FAISS index, defaults to the OpenSearch method
+            build_ann (bool): Also build and store the FAISS index
+            batch_size (int): Documents per scroll page
+
+        Returns:
+            int: Number of exported documents
+        """
+        vector_field = self._vector_field(index_name)
+        writer = SnapshotWriter(
+            directory,
+            vector_field['dimension'],
+            dtype=dtype,
+            algorithm=algorithm or vector_field['method'],
+            vector_field=vector_field['name']
+        )
+
+        for hit in scan(self.opensearch_db.client, index=index_name, query={"query": {"match_all": {}}}, size=batch_size):
+            document = hit['_source']
+            vector = document.pop(vector_field['name'], None)
+            if vector is None:
+                logger.warning(f"Skipping document {hit['_id']} without a vector")
+                continue
+            writer.add(vector, document)
+            if writer.count % 100000 == 0:
+                logger.info(f"Exported {writer.count} documents from {index_name}")
+        writer.close()
+
+        if build_ann:
+            vector_database = LocalVectorDatabase(vector_field=vector_field['name'], exact_max=0)
+            vector_database.open_snapshot(index_name, directory)
+            ann_index = vector_database.indices[index_name].ann_index
+            if ann_index is not None:
+                add_ann_index(directory, ann_index)
+
+        logger.info(f"Exported {writer.count} documents from {index_name} to {directory}")
+        return writer.count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export an OpenSearch index into a vector snapshot in S3")
+    parser.add_argument('--index', required=True, help="OpenSearch index name, which is also the snapshot index name")
+    parser.add_argument('--dtype', default='float32', choices=['float32', 'int8'])
+    parser.add_argument('--algorithm', choices=['hnsw', 'hnsw_sq', 'hnsw_bq', 'ivf'])
+    parser.add_argument('--build-ann', action='store_true', help="Build and store the FAISS index with the snapshot")
+    args = parser.parse_args()
+
+    config = Config.load_config()
+    directory = tempfile.mkdtemp(prefix='vector_snapshot_')
+    try:
+        OpenSearchSnapshotExporter(config).export(args.index, directory, dtype=args.dtype, algorithm=args.algorithm, build_ann=args.build_ann)
+        upload_snapshot(directory, config.s3_bucket, f"{config.local_vector_index_prefix}/{args.index}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
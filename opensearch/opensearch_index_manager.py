@@ -23,11 +23,17 @@ class OpenSearchIndex:
         algorithm (str): Indexing algorithm to be used
         vector_field (str): Name of the vector field
         dimension (int): Dimensionality of the vector
+        m (int): HNSW graph degree
+        ef_construction (int): HNSW candidate list size while building
+        ef_search (int): Default HNSW candidate list size while searching
     """
     name: str
     algorithm: str
     vector_field: str
     dimension: int
+    m: int = 16
+    ef_construction: int = 512
+    ef_search: int = 100
 
 
 class OpenSearchIndexManager:
@@ -63,7 +69,9 @@ class OpenSearchIndexManager:
                 is_serverless=self.config.opensearch_serverless,
                 region=self.config.aws_region,
                 username=self.config.opensearch_username,
-                password=self.config.opensearch_password
+                password=self.config.opensearch_password,
+                pool_maxsize=self.config.opensearch_pool_maxsize,
+                keepalive_idle=self.config.opensearch_keepalive_idle
             )
         except Exception as e:
             logger.error(f"Failed to initialize OpenSearch connection: {e}")
@@ -87,6 +95,10 @@ class OpenSearchIndexManager:
                 },
                 "text": {
                     "type": "text"
+                },
+                # Keyword so hierarchical retrieval can collapse child hits on their parent
+                "parent_id": {
+                    "type": "keyword"
                 }
             }
         }
@@ -115,7 +127,10 @@ class OpenSearchIndexManager:
                 name=index_id,
                 algorithm=config.get('indexing_algorithm', ''),
                 vector_field=self.config.vector_field,
-                dimension=config.get('vector_dimension', 0)
+                dimension=config.get('vector_dimension', 0),
+                m=int(config.get('hnsw_m') or 16),
+                ef_construction=int(config.get('hnsw_ef_construction') or 512),
+                ef_search=int(config.get('hnsw_ef_search') or 100)
             )
         except Exception as e:
             logger.error(f"Error processing experiment configuration: {e}")
@@ -162,7 +177,10 @@ class OpenSearchIndexManager:
                 self.opensearch_db.create_index(
                     index_name=index_config.name,
                     algorithm=index_config.algorithm,
-                    mapping=mapping
+                    mapping=mapping,
+                    m=index_config.m,
+                    ef_construction=index_config.ef_construction,
+                    ef_search=index_config.ef_search
                 )
                 processed_index_ids.add(index_config.name)
                 logger.info(f"Successfully created index: {index_config.name}")
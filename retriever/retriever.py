@@ -1,15 +1,34 @@
 from datetime import datetime, timezone
 from core.guardrails.bedrock_guardrails import BedrockGuardrails
+from core.guardrails.verdict_cache import GuardrailVerdictCache
+from util.hedging import HedgingRegistry
+from util.rate_limiter import RateLimiterRegistry
+from util.stage_timer import StageTimer, StageLatencyStats, bind_active_timer, record_stage, set_active_timer
 from core.opensearch_vectorstore import OpenSearchVectorDatabase
 from config.experimental_config import ExperimentalConfig
 from util.s3util import S3Util
 from baseclasses.base_classes import ExperimentQuestionMetrics
 from core.dynamodb import DynamoDBOperations
+from core.dynamodb_sink import DynamoDBSinkError, DynamoDBWriteBehindSink
 from config.config import Config, get_config
 from core.processors import EmbedProcessor
 from core.processors import InferenceProcessor
-from core.rerank.rerank import DocumentReranker
+from core.processors import ContextPacker
+from core.rerank import RerankerFactory
+from core.eval.retrieval_metrics import RetrievalScorer
 from core.knowledgebase_vectorstore import KnowledgeBaseVectorDatabase
+from core.local_vectorstore import LocalVectorDatabase
+from core.lexical_vectorstore import BM25VectorDatabase, reciprocal_rank_fusion
+from core.retrieval_planner import RetrievalPlanner
+from core.sharding import record_shard_result, shard_bounds
+from core.inference.bedrock.batch_inference import (
+    BATCH_MIN_RECORDS,
+    BatchInferenceJobClient,
+    BedrockBatchInferenceJobClient,
+    build_model_input,
+    parse_model_output,
+    supports_batch_inference,
+)
 import time
 
 import boto3, json, uuid
@@ -21,7 +40,8 @@ logger.setLevel(logging.INFO)
 
 # Function to retrieve and process data using Vectorstore and inference models
 from typing import List, Dict, Any, Optional, Tuple, Union
-from dataclasses import asdict
+from dataclasses import asdict, dataclass, field
+from concurrent.futures import ThreadPoolExecutor
 
 def retrieve(config: Config, experimentalConfig: ExperimentalConfig) -> None:
     """
@@ -34,6 +54,7 @@ def retrieve(config: Config, experimentalConfig: ExperimentalConfig) -> None:
     Raises:
         RetrievalError: If the retrieval process fails
     """
+    components = None
     try:
         logger.info(f"Starting retrieval process for experiment ID: {experimentalConfig.experiment_id}")
         
@@ -49,46 +70,144 @@ def retrieve(config: Config, experimentalConfig: ExperimentalConfig) -> None:
             components['guardrails'] = {
                 'client': guardrails,
                 'id': experimentalConfig.guardrail_id,
-                'version': experimentalConfig.guardrail_version
+                'version': experimentalConfig.guardrail_version,
+                'verdict_cache': GuardrailVerdictCache(
+                    bucket=config.s3_bucket,
+                    execution_id=experimentalConfig.execution_id
+                ) if config.guardrail_verdict_cache and config.s3_bucket else None
             }
         
-        # Process ground truth data
-        gt_data = load_ground_truth_data(experimentalConfig)
+        # Wall time of every retrieval stage, summarized on the experiment record
+        components['stage_latency'] = StageLatencyStats()
+
+        # Process ground truth data, numbering questions by their position in the full ground truth
+        gt_data = [{**item, "question_index": i} for i, item in enumerate(load_ground_truth_data(experimentalConfig))]
+        if experimentalConfig.shard_index is not None:
+            start, end = shard_bounds(len(gt_data), experimentalConfig.shard_count, experimentalConfig.shard_index)
+            logger.info(f"Processing questions {start} to {end} as shard {experimentalConfig.shard_index + 1} of {experimentalConfig.shard_count}")
+            gt_data = gt_data[start:end]
+        question_count = len(gt_data)
+
+        # Questions completed by an earlier attempt of this task are not processed again
+        completed = load_completed_questions(config, experimentalConfig, components["metrics_dynamodb"])
+        resumed = [completed[_question_metric_id(experimentalConfig, item)] for item in gt_data
+                   if _question_metric_id(experimentalConfig, item) in completed]
+        if resumed:
+            logger.info(f"Resuming experiment {experimentalConfig.experiment_id}: {len(resumed)} of {question_count} questions already completed")
+            gt_data = [item for item in gt_data if _question_metric_id(experimentalConfig, item) not in completed]
         
         # Process questions and store results
-        (
-            retrieval_query_embed_tokens,
-            retrieval_input_tokens,
-            retrieval_output_tokens,
-        ) = process_questions(
-            gt_data=gt_data,
-            components=components,
-            config=config,
-            experimentalConfig=experimentalConfig,
-        )
+        retrieval_metrics = None
+        if experimentalConfig.retrieval_only:
+            logger.info("Retrieval-only experiment, scoring retrieved contexts without generating answers")
+            retrieval_query_embed_tokens, retrieval_metrics = process_questions_retrieval_only(
+                gt_data=gt_data,
+                components=components,
+                experimentalConfig=experimentalConfig,
+                resumed_metrics=[row["retrieval_metrics"] for row in resumed if row.get("retrieval_metrics")],
+            )
+            retrieval_input_tokens, retrieval_output_tokens = 0, 0
+        elif _use_batch_inference(experimentalConfig, gt_data):
+            logger.info("Generating answers with a Bedrock batch inference job")
+            job_client = BedrockBatchInferenceJobClient(
+                region=experimentalConfig.aws_region,
+                role_arn=config.bedrock_role_arn,
+                bucket=config.s3_bucket,
+                prefix=f"batch_inference/{experimentalConfig.execution_id}"
+            )
+            (
+                retrieval_query_embed_tokens,
+                retrieval_input_tokens,
+                retrieval_output_tokens,
+            ) = process_questions_batch(
+                gt_data=gt_data,
+                components=components,
+                config=config,
+                experimentalConfig=experimentalConfig,
+                job_client=job_client,
+            )
+        else:
+            (
+                retrieval_query_embed_tokens,
+                retrieval_input_tokens,
+                retrieval_output_tokens,
+            ) = process_questions(
+                gt_data=gt_data,
+                components=components,
+                config=config,
+                experimentalConfig=experimentalConfig,
+            )
 
 
-        components['experiment_dynamodb'].update_item(
-            key={"id": experimentalConfig.experiment_id},
-            update_expression="SET retrieval_query_embed_tokens = :rqembed, retrieval_input_tokens = :rinput, retrieval_output_tokens = :routput",
-            expression_values={
-                ":rqembed": retrieval_query_embed_tokens,
-                ":rinput": retrieval_input_tokens,
-                ":routput": retrieval_output_tokens,
-            },
-        )
+        # Counters cover the whole experiment, resumed questions included
+        for row in resumed:
+            retrieval_query_embed_tokens += int((row.get("query_metadata") or {}).get("inputTokens", 0))
+            retrieval_input_tokens += int((row.get("answer_metadata") or {}).get("inputTokens", 0))
+            retrieval_output_tokens += int((row.get("answer_metadata") or {}).get("outputTokens", 0))
+
+        if components.get('guardrails', {}).get('verdict_cache'):
+            verdict_cache = components['guardrails']['verdict_cache']
+            logger.info(f"Guardrail verdict cache: {verdict_cache.hits} hits, {verdict_cache.misses} misses")
+
+        stage_latency_percentiles = components['stage_latency'].percentiles()
+        logger.info(f"Experiment {experimentalConfig.experiment_id} stage latency percentiles (ms): {stage_latency_percentiles}")
+        rate_limiter_metrics = RateLimiterRegistry.metrics()
+        logger.info(f"Experiment {experimentalConfig.experiment_id} rate limiters: {rate_limiter_metrics}")
+        hedging_metrics = HedgingRegistry.metrics()
+        logger.info(f"Experiment {experimentalConfig.experiment_id} hedged requests: {hedging_metrics}")
+
+        update_expression = "SET retrieval_query_embed_tokens = :rqembed, retrieval_input_tokens = :rinput, retrieval_output_tokens = :routput, stage_latency_percentiles = :stagelatency, rate_limiter_metrics = :ratelimiters, hedging_metrics = :hedging"
+        expression_values = {
+            ":rqembed": retrieval_query_embed_tokens,
+            ":rinput": retrieval_input_tokens,
+            ":routput": retrieval_output_tokens,
+            ":stagelatency": stage_latency_percentiles,
+            ":ratelimiters": rate_limiter_metrics,
+            ":hedging": hedging_metrics,
+        }
+        if retrieval_metrics is not None:
+            logger.info(f"Experiment {experimentalConfig.experiment_id} retrieval metrics: {retrieval_metrics}")
+            update_expression += ", retrieval_metrics = :retrievalmetrics"
+            expression_values[":retrievalmetrics"] = retrieval_metrics
+
+        if experimentalConfig.shard_index is not None:
+            # The reducer sums the counters of all shards onto the experiment and keeps the reports per shard
+            shard_result = {
+                "questions": question_count,
+                "retrieval_query_embed_tokens": retrieval_query_embed_tokens,
+                "retrieval_input_tokens": retrieval_input_tokens,
+                "retrieval_output_tokens": retrieval_output_tokens,
+                "stage_latency_percentiles": stage_latency_percentiles,
+                "rate_limiter_metrics": rate_limiter_metrics,
+                "hedging_metrics": hedging_metrics,
+            }
+            if retrieval_metrics is not None:
+                shard_result["retrieval_metrics"] = retrieval_metrics
+            record_shard_result(components['experiment_dynamodb'], experimentalConfig, shard_result)
+        else:
+            components['experiment_dynamodb'].update_item(
+                key={"id": experimentalConfig.experiment_id},
+                update_expression=update_expression,
+                expression_values=expression_values,
+            )
         
         logger.info("Retrieval process completed successfully")
         
     except Exception as e:
         logger.error(f"Pipeline failed: {str(e)}", exc_info=True)
+        if components is not None:
+            # Persist the questions completed before the failure, so a retry resumes after them
+            try:
+                components["metrics_sink"].close()
+            except DynamoDBSinkError as sink_error:
+                logger.error(str(sink_error))
         raise RetrievalError(f"Retrieval process failed: {str(e)}")
 
 def initialize_components(config: Config, experimentalConfig: ExperimentalConfig) -> Dict[str, Any]:
     """Initialize all required components for the retrieval process."""
     try:
-        # Initialize embedding processor if required
-        if experimentalConfig.bedrock_knowledge_base or not experimentalConfig.knowledge_base:
+        # Initialize embedding processor if required, lexical retrieval searches with the question text
+        if experimentalConfig.bedrock_knowledge_base or not experimentalConfig.knowledge_base or experimentalConfig.vector_store == 'bm25':
             logger.info("Skipping embed processor initialization")
             embed_processor = None
             
@@ -96,9 +215,11 @@ def initialize_components(config: Config, experimentalConfig: ExperimentalConfig
             logger.info("Initializing embedding processor")
             embed_processor = EmbedProcessor(experimentalConfig)
             
-        # Initialize inference processor
-        logger.info("Initializing inference processor")
-        inference_processor = InferenceProcessor(experimentalConfig)
+        # Initialize inference processor, retrieval-only experiments never generate answers
+        inference_processor = None
+        if not experimentalConfig.retrieval_only:
+            logger.info("Initializing inference processor")
+            inference_processor = InferenceProcessor(experimentalConfig)
         
         # Initialize vector database
         vector_database = None
@@ -106,6 +227,20 @@ def initialize_components(config: Config, experimentalConfig: ExperimentalConfig
             if experimentalConfig.bedrock_knowledge_base:
                 logger.info("Connecting to Knowledge base")
                 vector_database = KnowledgeBaseVectorDatabase(region=experimentalConfig.aws_region)
+            elif experimentalConfig.vector_store == 'local':
+                logger.info(f"Loading local index {experimentalConfig.index_id}")
+                vector_database = LocalVectorDatabase(
+                    vector_field=config.vector_field,
+                    bucket=config.s3_bucket,
+                    prefix=config.local_vector_index_prefix,
+                    exact_max=config.local_vector_exact_max,
+                    snapshot_dtype=config.local_vector_snapshot_dtype,
+                    cache_dir=config.vector_snapshot_cache_dir
+                )
+                vector_database.load(experimentalConfig.index_id)
+            elif experimentalConfig.vector_store == 'bm25':
+                logger.info(f"Loading lexical index {experimentalConfig.index_id}")
+                vector_database = _load_lexical_index(config, experimentalConfig)
             else:
                 logger.info(f"Connecting to OpenSearch at {config.opensearch_host}")
                 vector_database = OpenSearchVectorDatabase(
@@ -113,9 +248,20 @@ def initialize_components(config: Config, experimentalConfig: ExperimentalConfig
                     is_serverless=config.opensearch_serverless,
                     region=config.aws_region,
                     username=config.opensearch_username,
-                    password=config.opensearch_password
+                    password=config.opensearch_password,
+                    pool_maxsize=config.opensearch_pool_maxsize,
+                    keepalive_idle=config.opensearch_keepalive_idle
                 )
         
+        # Share a single max-k search per question with experiments on the same index
+        retrieval_planner = None
+        if isinstance(vector_database, OpenSearchVectorDatabase) and config.shared_retrieval:
+            logger.info(f"Initializing retrieval planner for index {experimentalConfig.index_id}")
+            retrieval_planner = RetrievalPlanner(config, experimentalConfig, vector_database)
+            if not retrieval_planner.shared:
+                logger.info(f"No other experiment searches index {experimentalConfig.index_id}, searching directly")
+                retrieval_planner = None
+
         # Initialize DynamoDB connections
         logger.info("Initializing DynamoDB connections")
         metrics_dynamodb = DynamoDBOperations(
@@ -127,11 +273,39 @@ def initialize_components(config: Config, experimentalConfig: ExperimentalConfig
             region=config.aws_region, table_name=config.experiment_table
         )
 
+        # Question metrics are written in the background; the processing stage closes the sink when done
+        metrics_sink = DynamoDBWriteBehindSink(
+            metrics_dynamodb,
+            max_queue_size=config.metrics_write_queue_size,
+            writers=config.metrics_writers
+        )
+
+        # BM25 results fused with the vector results
+        lexical_index = None
+        if experimentalConfig.lexical_fusion and isinstance(vector_database, (OpenSearchVectorDatabase, LocalVectorDatabase)):
+            logger.info(f"Loading lexical index {experimentalConfig.index_id} for reciprocal rank fusion")
+            lexical_index = _load_lexical_index(config, experimentalConfig)
+
+        # Hierarchical child hits are collapsed on their parent by the vector store
+        collapse = None
+        if experimentalConfig.chunking_strategy.lower() == 'hierarchical' and isinstance(vector_database, (OpenSearchVectorDatabase, LocalVectorDatabase, BM25VectorDatabase)):
+            collapse = {"collapse_field": "parent_id", "oversample": config.hierarchical_collapse_oversample}
+
+        context_packer = None
+        if experimentalConfig.context_packing:
+            logger.info(f"Packing context to a budget of {experimentalConfig.context_token_budget or 'unlimited'} tokens")
+            context_packer = ContextPacker(token_budget=experimentalConfig.context_token_budget)
+
         return {
             "embed_processor": embed_processor,
             "inference_processor": inference_processor,
             "vector_database": vector_database,
+            "retrieval_planner": retrieval_planner,
+            "lexical_index": lexical_index,
+            "collapse": collapse,
+            "context_packer": context_packer,
             "metrics_dynamodb": metrics_dynamodb,
+            "metrics_sink": metrics_sink,
             "experiment_dynamodb": experiment_dynamodb
         }
         
@@ -139,25 +313,49 @@ def initialize_components(config: Config, experimentalConfig: ExperimentalConfig
         logger.error(f"Failed to initialize components: {str(e)}")
         raise
 
+def _load_lexical_index(config: Config, experimentalConfig: ExperimentalConfig) -> BM25VectorDatabase:
+    lexical_index = BM25VectorDatabase(
+        vector_field=config.vector_field,
+        bucket=config.s3_bucket,
+        prefix=config.lexical_index_prefix,
+        cache_dir=config.vector_snapshot_cache_dir
+    )
+    lexical_index.load(experimentalConfig.index_id)
+    return lexical_index
+
 def apply_guardrail_check(components, guardrail_id, content, source, log_prefix):
     """Helper function to apply guardrails and process response
     
     Args:
         components: Dictionary containing guardrail components
         guardrail_id: ID of the guardrail to apply
-        content: Content to check against guardrails
+        content: Content to check against guardrails, one text block or a list sent as separate blocks
         source: Source type ('INPUT', 'OUTPUT', etc.)
         log_prefix: Prefix for logging messages
     
     Returns:
         Tuple of (blocked, modified_text, assessment)
     """
-    response = components['guardrails']['client'].apply_guardrail(
-        guardrail_id=guardrail_id,
-        guardrail_version=components['guardrails']['version'],
-        content=[{'text': content}],
-        source=source
-    )
+    blocks = content if isinstance(content, list) else [content]
+    request_content = [{'text': block} for block in blocks]
+    guardrail_version = components['guardrails']['version']
+    verdict_cache = components['guardrails'].get('verdict_cache')
+
+    with record_stage(f"guardrail_{log_prefix.lower()}"):
+        response = None
+        if verdict_cache:
+            response = verdict_cache.get(guardrail_id, guardrail_version, source, request_content)
+            if response:
+                logger.debug(f"{log_prefix} guardrail verdict served from cache")
+        if response is None:
+            response = components['guardrails']['client'].apply_guardrail(
+                guardrail_id=guardrail_id,
+                guardrail_version=guardrail_version,
+                content=request_content,
+                source=source
+            )
+            if verdict_cache:
+                verdict_cache.put(guardrail_id, guardrail_version, source, request_content, response)
 
     if response['action'] == 'GUARDRAIL_INTERVENED':
         assessment = response.get('assessments', [])
@@ -174,6 +372,35 @@ def load_ground_truth_data(experimentalConfig: ExperimentalConfig) -> List[Dict]
     logger.info(f"Reading ground truth data from S3: {experimentalConfig.gt_data}")
     return S3Util().read_json_from_s3(experimentalConfig.gt_data)
 
+def _question_metric_id(experimentalConfig: ExperimentalConfig, item: Dict) -> str:
+    return ExperimentQuestionMetrics.make_id(experimentalConfig.experiment_id, item["question_index"], item["question"])
+
+def load_completed_questions(config: Config, experimentalConfig: ExperimentalConfig, metrics_dynamodb: DynamoDBOperations) -> Dict[str, Dict]:
+    """
+    Question metrics already written for this experiment, by id.
+
+    Questions that failed are written with empty query metadata and are not counted as completed,
+    so a retried task processes them again.
+    """
+    completed, start_key = {}, None
+    while True:
+        response = metrics_dynamodb.query(
+            "execution_id = :execution_id AND experiment_id = :experiment_id",
+            expression_values={
+                ":execution_id": experimentalConfig.execution_id,
+                ":experiment_id": experimentalConfig.experiment_id,
+            },
+            index_name=config.experiment_question_metrics_execution_experiment_index,
+            projection="id, query_metadata, answer_metadata, retrieval_metrics",
+            exclusive_start_key=start_key,
+        )
+        for row in response.get("Items", []):
+            if row.get("query_metadata"):
+                completed[row["id"]] = row
+        start_key = response.get("LastEvaluatedKey")
+        if not start_key:
+            return completed
+
 def process_questions(
     gt_data: List[Dict],
     components: Dict[str, Any],
@@ -181,21 +408,32 @@ def process_questions(
     experimentalConfig: ExperimentalConfig,
 ) -> Tuple[int, int, int]:
     """Process questions and store results in DynamoDB."""
-    batch_items = []
+    metrics_sink = components["metrics_sink"]
     logger.info(f"Processing {len(gt_data)} questions from ground truth data")
 
     retrieval_query_embed_tokens = 0
     retrieval_input_tokens = 0
     retrieval_output_tokens = 0
 
+    # Guardrail checks overlap with retrieval and generation, whose results are dropped if a guardrail intervenes
+    speculative_executor = None
+    if experimentalConfig.enable_guardrails and experimentalConfig.speculative_guardrails:
+        speculative_executor = ThreadPoolExecutor(max_workers=2)
+    speculative_wasted_searches = 0
+    speculative_wasted_input_tokens = 0
+    speculative_wasted_output_tokens = 0
+
     logger.info(f"Rerank model id for experiment {experimentalConfig.experiment_id}: {experimentalConfig.rerank_model_id}")
+    stage_latency = components.get("stage_latency") or StageLatencyStats()
     for idx, item in enumerate(gt_data):
+        timer = StageTimer()
+        set_active_timer(timer)
         try:
             question = item["question"]
             logger.debug(f"Processing question {idx+1}: {question}")
 
             # Generate embeddings
-            if experimentalConfig.bedrock_knowledge_base or not experimentalConfig.knowledge_base:
+            if components["embed_processor"] is None:
                 query_metadata, query_embedding = {'inputTokens': '0', 'latencyMs': '0'}, None                
             else:
                 logger.info("Generating embeddings for the question using provided embedder")
@@ -217,7 +455,27 @@ def process_questions(
             retrieval_query_embed_tokens += int(query_metadata.get("inputTokens", 0) if query_embedding else 0)
 
             #Apply Guardrails
-            if experimentalConfig.enable_guardrails:
+            if experimentalConfig.enable_guardrails and speculative_executor:
+                logger.info("Applying guardrails speculatively")
+                guardrail_id = components['guardrails']['id']
+                outcome = _apply_speculative_guardrails(
+                    question, query_embedding, components, config, experimentalConfig, idx, speculative_executor, query_metadata
+                )
+                query_results = outcome.query_results
+                answer_metadata = outcome.answer_metadata
+                answer = outcome.answer
+                guardrail_input_assessment = outcome.guardrail_input_assessment
+                guardrail_context_assessment = outcome.guardrail_context_assessment
+                guardrail_output_assessment = outcome.guardrail_output_assessment
+                guardrail_blocked = outcome.guardrail_blocked
+
+                # Discarded generations are still billed, so they count towards the experiment tokens
+                retrieval_input_tokens += int(answer_metadata.get("inputTokens", 0)) + int(answer_metadata.get("speculativeWastedInputTokens", 0))
+                retrieval_output_tokens += int(answer_metadata.get("outputTokens", 0)) + int(answer_metadata.get("speculativeWastedOutputTokens", 0))
+                speculative_wasted_searches += int(answer_metadata.get("speculativeWastedSearch", 0))
+                speculative_wasted_input_tokens += int(answer_metadata.get("speculativeWastedInputTokens", 0))
+                speculative_wasted_output_tokens += int(answer_metadata.get("speculativeWastedOutputTokens", 0))
+            elif experimentalConfig.enable_guardrails:
                 logger.info("Applying guardrails")
                 guardrail_id = components['guardrails']['id']
                 guardrail_blocked = 'NONE'
@@ -240,29 +498,13 @@ def process_questions(
                 if experimentalConfig.enable_context_guardrails and guardrail_blocked == 'NONE':
                     if experimentalConfig.knowledge_base:
                         # Search for relevant context once
-                        if isinstance(components["vector_database"], OpenSearchVectorDatabase):
-                            query_results = components["vector_database"].search(
-                                experimentalConfig.index_id, query_embedding, experimentalConfig.knn_num
-                            )
-                        elif isinstance(components["vector_database"], KnowledgeBaseVectorDatabase):
-                            query_results = components["vector_database"].search(
-                                question, experimentalConfig.kb_data, experimentalConfig.knn_num
-                            )
-
-                        if experimentalConfig.chunking_strategy.lower() == 'hierarchical':
-                            query_results = __duplicate_removal_for_heirarchical_config(query_results)
-
-                        if experimentalConfig.rerank_model_id and experimentalConfig.rerank_model_id.lower() != 'none':
-                            #Rerank the query results
-                            query_results = __rerank_query_result(query_results, question, experimentalConfig, idx)
-
+                        query_results = _retrieve_context(question, query_embedding, components, experimentalConfig, idx, query_metadata)
 
                     if query_results:
-                        context = ' '.join(record['text'] for record in query_results)
                         blocked, modified_context, guardrail_context_assessment = apply_guardrail_check(
                             components,
                             guardrail_id,
-                            content={'text': context},
+                            content=[{'text': record['text']} for record in query_results],
                             source='INPUT',
                             log_prefix="Context"
                         )
@@ -275,19 +517,7 @@ def process_questions(
                     # Fetch context if not already done
                     if query_results is None:
                         if experimentalConfig.knowledge_base:
-                            if isinstance(components["vector_database"], OpenSearchVectorDatabase):
-                                query_results = components["vector_database"].search(
-                                    experimentalConfig.index_id, query_embedding, experimentalConfig.knn_num
-                            )
-                            elif isinstance(components["vector_database"], KnowledgeBaseVectorDatabase):
-                                query_results = components["vector_database"].search(
-                                    question, experimentalConfig.kb_data, experimentalConfig.knn_num
-                                )
-                            if experimentalConfig.chunking_strategy.lower() == 'hierarchical':
-                                query_results = __duplicate_removal_for_heirarchical_config(query_results)
-                            if experimentalConfig.rerank_model_id and experimentalConfig.rerank_model_id.lower() != 'none':
-                                #Rerank the query results
-                                query_results = __rerank_query_result(query_results, question, experimentalConfig, idx)
+                            query_results = _retrieve_context(question, query_embedding, components, experimentalConfig, idx, query_metadata)
 
                    # Generate answer
                     if experimentalConfig.knowledge_base:
@@ -319,21 +549,7 @@ def process_questions(
             else:
                 if experimentalConfig.knowledge_base:
                     # Search for relevant context
-                    if isinstance(components["vector_database"], OpenSearchVectorDatabase):
-                        query_results = components["vector_database"].search(
-                            experimentalConfig.index_id, query_embedding, experimentalConfig.knn_num
-                        )
-                    elif isinstance(components["vector_database"], KnowledgeBaseVectorDatabase):
-                        query_results = components["vector_database"].search(
-                            question, experimentalConfig.kb_data, experimentalConfig.knn_num
-                        )
-
-                    if experimentalConfig.chunking_strategy.lower() == 'hierarchical':
-                        query_results = __duplicate_removal_for_heirarchical_config(query_results)
-
-                    if experimentalConfig.rerank_model_id and experimentalConfig.rerank_model_id.lower() != 'none':
-                        #Rerank the query results
-                        query_results = __rerank_query_result(query_results, question, experimentalConfig, idx)
+                    query_results = _retrieve_context(question, query_embedding, components, experimentalConfig, idx, query_metadata)
 
                 # Generate answer
                 if experimentalConfig.knowledge_base:
@@ -360,6 +576,7 @@ def process_questions(
                     question=question,
                     answer=answer,
                     gt_answer=item['answer'],
+                    question_index=item.get("question_index"),
                     reference_contexts=reference_contexts,
                     guardrail_input_assessment=guardrail_input_assessment,
                     guardrail_context_assessment=guardrail_context_assessment,
@@ -368,6 +585,7 @@ def process_questions(
                     guardrail_blocked=guardrail_blocked,
                     query_metadata=query_metadata,
                     answer_metadata=answer_metadata,
+                    stage_latencies=timer.as_dict(),
                 )
             else:
                 #  Update the metrics here to store the DynamoDb Table
@@ -376,12 +594,14 @@ def process_questions(
                     question=question,
                     answer=answer,
                     gt_answer=item["answer"],
+                    question_index=item.get("question_index"),
                     reference_contexts=reference_contexts,
                     query_metadata=query_metadata,
                     answer_metadata=answer_metadata,
+                    stage_latencies=timer.as_dict(),
                 )
 
-            batch_items.append(metrics.to_dynamo_item())
+            metrics_sink.put(metrics.to_dynamo_item())
         except Exception as e:
             logger.error(f"Error processing question {idx+1}: {str(e)}")
             metrics = metrics = _create_metrics(
@@ -389,23 +609,383 @@ def process_questions(
                 question=question,
                 answer="",
                 gt_answer=item["answer"],
+                question_index=item.get("question_index"),
                 reference_contexts=[],
                 query_metadata={},
                 answer_metadata={},
+                stage_latencies=timer.as_dict(),
             )
-            batch_items.append(metrics.to_dynamo_item())
-    
-        # Write batch if size reaches threshold
-        if len(batch_items) >= 25:
-            write_batch_to_dynamodb(batch_items, components["metrics_dynamodb"])
-            batch_items = []
-
-    # Write remaining items
-    if batch_items:
-        write_batch_to_dynamodb(batch_items, components["metrics_dynamodb"])
+            metrics_sink.put(metrics.to_dynamo_item())
+        finally:
+            set_active_timer(None)
+        stage_latency.add(timer.as_dict())
+
+    # Only the wait for writes still queued at the end is on the critical path
+    write_timer = StageTimer()
+    with write_timer.stage("dynamodb_write"):
+        metrics_sink.close()
+    stage_latency.add(write_timer.as_dict())
+    if speculative_executor:
+        speculative_executor.shutdown(wait=True)
+        logger.info(f"Experiment {experimentalConfig.experiment_id} Speculative Guardrail Waste : \n Discarded Searches : {speculative_wasted_searches} \n Discarded Input Tokens : {speculative_wasted_input_tokens} \n Discarded Output Tokens : {speculative_wasted_output_tokens}")
     logger.info(f"Experiment {experimentalConfig.experiment_id} Retrieval Tokens : \n Query Embed Tokens : {retrieval_query_embed_tokens} \n Input Tokens : {retrieval_input_tokens} \n Output Tokens : {retrieval_output_tokens}")
     return (retrieval_query_embed_tokens, retrieval_input_tokens, retrieval_output_tokens)
 
+def process_questions_retrieval_only(
+    gt_data: List[Dict],
+    components: Dict[str, Any],
+    experimentalConfig: ExperimentalConfig,
+    resumed_metrics: Optional[List[Dict[str, float]]] = None,
+) -> Tuple[int, Dict[str, float]]:
+    """
+    Retrieve context for every question and score it locally, without generating answers.
+
+    Question metrics keep the retrieved contexts and their retrieval scores; the returned means,
+    which include the resumed_metrics of questions completed by an earlier attempt, are stored
+    on the experiment.
+
+    Returns:
+        Tuple[int, Dict[str, float]]: Query embedding tokens and the mean retrieval metrics
+    """
+    logger.info(f"Retrieving context for {len(gt_data)} questions from ground truth data")
+    retrieval_query_embed_tokens = 0
+    stage_latency = components.get("stage_latency") or StageLatencyStats()
+    metrics_sink = components["metrics_sink"]
+    scorer = RetrievalScorer()
+    per_question = []
+
+    for idx, item in enumerate(gt_data):
+        question = item["question"]
+        timer = StageTimer()
+        set_active_timer(timer)
+        query_metadata, query_results = {}, None
+        try:
+            if components["embed_processor"] is None:
+                query_metadata, query_embedding = {'inputTokens': '0', 'latencyMs': '0'}, None
+            else:
+                query_metadata, query_embedding = components["embed_processor"].embed_text(question)
+            retrieval_query_embed_tokens += int(query_metadata.get("inputTokens", 0) if query_embedding else 0)
+            query_results = _retrieve_context(question, query_embedding, components, experimentalConfig, idx, query_metadata)
+        except Exception as e:
+            logger.error(f"Error retrieving context for question {idx+1}: {str(e)}")
+            query_metadata = {}
+        contexts = [record["text"] for record in query_results] if query_results else []
+
+        # Each question is scored and queued on its own, so a task stopped midway keeps the questions it completed
+        try:
+            with timer.stage("retrieval_scoring"):
+                (question_metrics,), _ = scorer.score([
+                    {'answer': item["answer"], 'reference_contexts': item.get("reference_contexts"), 'retrieved_contexts': contexts}
+                ])
+        finally:
+            set_active_timer(None)
+        stage_latency.add(timer.as_dict())
+        per_question.append(question_metrics)
+
+        metrics = _create_metrics(
+            experimental_config=experimentalConfig,
+            question=question,
+            answer="",
+            gt_answer=item["answer"],
+            question_index=item.get("question_index"),
+            reference_contexts=contexts,
+            query_metadata=query_metadata,
+            answer_metadata={},
+            stage_latencies=timer.as_dict(),
+            retrieval_metrics=question_metrics,
+        )
+        metrics_sink.put(metrics.to_dynamo_item())
+
+    # Only the wait for writes still queued at the end is on the critical path
+    write_timer = StageTimer()
+    with write_timer.stage("dynamodb_write"):
+        metrics_sink.close()
+    stage_latency.add(write_timer.as_dict())
+
+    retrieval_metrics = RetrievalScorer.summarize(per_question + (resumed_metrics or []))
+
+    logger.info(f"Experiment {experimentalConfig.experiment_id} Retrieval Tokens : \n Query Embed Tokens : {retrieval_query_embed_tokens}")
+    return retrieval_query_embed_tokens, retrieval_metrics
+
+@dataclass
+class SpeculativeGuardrailOutcome:
+    """Result of one question processed with speculative guardrail checks."""
+    query_results: Optional[List[Dict]] = None
+    answer: str = ""
+    answer_metadata: Dict[str, int] = field(default_factory=dict)
+    guardrail_input_assessment: Optional[List[Dict]] = None
+    guardrail_context_assessment: Optional[List[Dict]] = None
+    guardrail_output_assessment: Optional[List[Dict]] = None
+    guardrail_blocked: str = 'NONE'
+
+def _apply_speculative_guardrails(
+    question: str,
+    query_embedding: Optional[List[float]],
+    components: Dict[str, Any],
+    config: Config,
+    experimentalConfig: ExperimentalConfig,
+    idx: int,
+    executor: ThreadPoolExecutor,
+    query_metadata: Optional[Dict[str, Any]] = None,
+) -> SpeculativeGuardrailOutcome:
+    """
+    Run the INPUT check alongside retrieval and the CONTEXT check alongside generation.
+
+    The outcome matches the sequential path: work that a guardrail would have prevented is
+    discarded and the blocked stage is reported in guardrail_blocked. The discarded work is
+    recorded in answer_metadata as speculativeWastedSearch, speculativeWastedInputTokens and
+    speculativeWastedOutputTokens.
+    """
+    guardrail_id = components['guardrails']['id']
+    outcome = SpeculativeGuardrailOutcome()
+
+    input_check = None
+    if experimentalConfig.enable_prompt_guardrails:
+        input_check = executor.submit(
+            bind_active_timer(apply_guardrail_check), components, guardrail_id, {'text': question}, 'INPUT', "Question"
+        )
+
+    try:
+        query_results = None
+        if experimentalConfig.knowledge_base:
+            query_results = _retrieve_context(question, query_embedding, components, experimentalConfig, idx, query_metadata)
+    finally:
+        # Never leave the check running unobserved, even if retrieval failed
+        input_result = input_check.result() if input_check else (False, None, None)
+
+    blocked, modified_question, outcome.guardrail_input_assessment = input_result
+    if blocked:
+        outcome.answer = modified_question
+        outcome.guardrail_blocked = 'INPUT'
+        outcome.answer_metadata = {'speculativeWastedSearch': 1 if query_results is not None else 0}
+        return outcome
+
+    context_check = None
+    if experimentalConfig.enable_context_guardrails and query_results:
+        context_check = executor.submit(
+            bind_active_timer(apply_guardrail_check), components, guardrail_id, [{'text': record['text']} for record in query_results], 'INPUT', "Context"
+        )
+
+    try:
+        answer_metadata, answer = components["inference_processor"].generate_text(
+            user_query=question,
+            context=query_results,
+            default_prompt=config.inference_system_prompt,
+        )
+    finally:
+        context_result = context_check.result() if context_check else (False, None, None)
+
+    blocked, modified_context, outcome.guardrail_context_assessment = context_result
+    if blocked:
+        outcome.answer = modified_context
+        outcome.guardrail_blocked = 'CONTEXT'
+        outcome.query_results = query_results
+        outcome.answer_metadata = {
+            'speculativeWastedInputTokens': int(answer_metadata.get("inputTokens", 0)),
+            'speculativeWastedOutputTokens': int(answer_metadata.get("outputTokens", 0))
+        }
+        return outcome
+
+    outcome.query_results = query_results
+    outcome.answer = answer
+    outcome.answer_metadata = answer_metadata
+
+    # The OUTPUT check depends on the answer and stays sequential
+    if experimentalConfig.enable_response_guardrails:
+        blocked, modified_answer, outcome.guardrail_output_assessment = apply_guardrail_check(
+            components,
+            guardrail_id,
+            content={'text': answer},
+            source='OUTPUT',
+            log_prefix="Answer"
+        )
+        if blocked:
+            outcome.answer = modified_answer
+            outcome.guardrail_blocked = 'OUTPUT'
+    return outcome
+
+def _use_batch_inference(experimentalConfig: ExperimentalConfig, gt_data: List[Dict]) -> bool:
+    """Check whether the experiment asked for, and can run, batch answer generation."""
+    if not experimentalConfig.batch_inference:
+        return False
+    if experimentalConfig.retrieval_service != "bedrock" or not supports_batch_inference(experimentalConfig.retrieval_model):
+        logger.warning(f"Batch inference is not available for {experimentalConfig.retrieval_model}, using synchronous generation")
+        return False
+    if experimentalConfig.enable_guardrails:
+        logger.warning("Batch inference does not apply guardrails per question, using synchronous generation")
+        return False
+    if len(gt_data) < BATCH_MIN_RECORDS:
+        logger.warning(f"Batch inference needs at least {BATCH_MIN_RECORDS} questions, using synchronous generation")
+        return False
+    return True
+
+def process_questions_batch(
+    gt_data: List[Dict],
+    components: Dict[str, Any],
+    config: Config,
+    experimentalConfig: ExperimentalConfig,
+    job_client: BatchInferenceJobClient,
+    poll_interval: int = 60,
+) -> Tuple[int, int, int]:
+    """Retrieve context for every question, generate all answers in one batch job and store results in DynamoDB."""
+    logger.info(f"Preparing {len(gt_data)} questions for batch inference")
+    inferencer = components["inference_processor"].inferencer
+    model_id = inferencer.get_model_id()
+    inference_config = inferencer.get_inference_config()
+
+    retrieval_query_embed_tokens = 0
+    retrieval_input_tokens = 0
+    retrieval_output_tokens = 0
+
+    records = []
+    prepared = []
+    metrics_sink = components["metrics_sink"]
+    for idx, item in enumerate(gt_data):
+        question = item["question"]
+        try:
+            if components["embed_processor"] is None:
+                query_metadata, query_embedding = {'inputTokens': '0', 'latencyMs': '0'}, None
+            else:
+                query_metadata, query_embedding = components["embed_processor"].embed_text(question)
+            retrieval_query_embed_tokens += int(query_metadata.get("inputTokens", 0) if query_embedding else 0)
+
+            query_results = None
+            if experimentalConfig.knowledge_base:
+                query_results = _retrieve_context(question, query_embedding, components, experimentalConfig, idx, query_metadata)
+
+            system_prompt, messages = inferencer.generate_prompt(
+                experimentalConfig, config.inference_system_prompt, question, query_results
+            )
+            record_id = f"{idx:011d}"
+            records.append({
+                "recordId": record_id,
+                "modelInput": build_model_input(model_id, system_prompt, messages, inference_config)
+            })
+            prepared.append((record_id, item, query_metadata, query_results))
+        except Exception as e:
+            logger.error(f"Error preparing question {idx+1}: {str(e)}")
+            metrics = _create_metrics(
+                experimental_config=experimentalConfig,
+                question=question,
+                answer="",
+                gt_answer=item["answer"],
+                question_index=item.get("question_index"),
+                reference_contexts=[],
+                query_metadata={},
+                answer_metadata={},
+            )
+            metrics_sink.put(metrics.to_dynamo_item())
+
+    results = None
+    if len(records) < BATCH_MIN_RECORDS:
+        # Questions that failed preparation can leave fewer records than a batch job accepts;
+        # their context is already retrieved, so only the answers are generated one by one
+        logger.warning(f"Only {len(records)} questions were prepared, batch inference needs at least {BATCH_MIN_RECORDS}, using synchronous generation")
+    else:
+        job_name = f"{experimentalConfig.experiment_id}-{int(time.time())}"
+        job_id = job_client.submit_job(job_name, model_id, records)
+        status = job_client.wait_for_job(job_id, poll_interval=poll_interval)
+        if status not in ("Completed", "PartiallyCompleted"):
+            raise RetrievalError(f"Batch inference job {job_id} ended with status {status}")
+        results = job_client.get_job_results(job_id)
+
+    for record_id, item, query_metadata, query_results in prepared:
+        answer_metadata, answer = {}, ""
+        if results is None:
+            try:
+                answer_metadata, answer = components["inference_processor"].generate_text(
+                    user_query=item["question"],
+                    context=query_results,
+                    default_prompt=config.inference_system_prompt,
+                )
+                retrieval_input_tokens += int(answer_metadata["inputTokens"])
+                retrieval_output_tokens += int(answer_metadata["outputTokens"])
+            except Exception as e:
+                logger.error(f"Error generating answer for record {record_id}: {str(e)}")
+                # Written without query metadata, so a retried task processes the question again
+                query_metadata = {}
+        else:
+            record = results.get(record_id, {})
+            if "modelOutput" in record:
+                answer_metadata, answer = parse_model_output(model_id, record["modelOutput"])
+                retrieval_input_tokens += int(answer_metadata["inputTokens"])
+                retrieval_output_tokens += int(answer_metadata["outputTokens"])
+            else:
+                logger.error(f"No batch output for record {record_id}: {record.get('error')}")
+
+        metrics = _create_metrics(
+            experimental_config=experimentalConfig,
+            question=item["question"],
+            answer=answer,
+            gt_answer=item["answer"],
+            question_index=item.get("question_index"),
+            reference_contexts=[record["text"] for record in query_results] if query_results else [],
+            query_metadata=query_metadata,
+            answer_metadata=answer_metadata,
+        )
+        metrics_sink.put(metrics.to_dynamo_item())
+
+    metrics_sink.close()
+    logger.info(f"Experiment {experimentalConfig.experiment_id} Retrieval Tokens : \n Query Embed Tokens : {retrieval_query_embed_tokens} \n Input Tokens : {retrieval_input_tokens} \n Output Tokens : {retrieval_output_tokens}")
+    return (retrieval_query_embed_tokens, retrieval_input_tokens, retrieval_output_tokens)
+
+def _retrieve_context(
+    question: str,
+    query_embedding: Optional[List[float]],
+    components: Dict[str, Any],
+    experimentalConfig: ExperimentalConfig,
+    idx: int,
+    query_metadata: Optional[Dict[str, Any]] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Search the vector store, fused with BM25 results when the experiment asks for it, then apply
+    hierarchical de-duplication, reranking and context packing for this experiment.
+
+    When context is packed, the estimated tokens before packing and the tokens saved are added to query_metadata.
+    """
+    query_results = None
+    with record_stage("vector_search"):
+        if components.get("retrieval_planner"):
+            query_results = components["retrieval_planner"].search(question, query_embedding)
+        elif isinstance(components["vector_database"], (OpenSearchVectorDatabase, LocalVectorDatabase)):
+            query_results = components["vector_database"].search(
+                experimentalConfig.index_id, query_embedding, experimentalConfig.knn_num,
+                ef_search=experimentalConfig.hnsw_ef_search, **(components.get("collapse") or {})
+            )
+        elif isinstance(components["vector_database"], BM25VectorDatabase):
+            query_results = components["vector_database"].search(
+                experimentalConfig.index_id, question, experimentalConfig.knn_num, **(components.get("collapse") or {})
+            )
+        elif isinstance(components["vector_database"], KnowledgeBaseVectorDatabase):
+            query_results = components["vector_database"].search(
+                question, experimentalConfig.kb_data, experimentalConfig.knn_num
+            )
+
+    if components.get("lexical_index"):
+        with record_stage("lexical_search"):
+            lexical_results = components["lexical_index"].search(
+                experimentalConfig.index_id, question, experimentalConfig.knn_num, **(components.get("collapse") or {})
+            )
+        query_results = reciprocal_rank_fusion([query_results, lexical_results], experimentalConfig.knn_num, rrf_k=experimentalConfig.rrf_k)
+
+    # Vector store results are already collapsed on parent_id
+    if experimentalConfig.chunking_strategy.lower() == 'hierarchical' and not components.get("collapse"):
+        query_results = __duplicate_removal_for_heirarchical_config(query_results)
+
+    if experimentalConfig.rerank_model_id and experimentalConfig.rerank_model_id.lower() != 'none':
+        #Rerank the query results
+        with record_stage("rerank"):
+            query_results = __rerank_query_result(query_results, question, experimentalConfig, idx)
+
+    if components.get("context_packer") and query_results:
+        with record_stage("context_packing"):
+            query_results, packing_stats = components["context_packer"].pack(query_results)
+        if query_metadata is not None:
+            query_metadata['contextTokensBefore'] = packing_stats['contextTokensBefore']
+            query_metadata['contextTokensSaved'] = packing_stats['contextTokensSaved']
+
+    return query_results
+
 def __duplicate_removal_for_heirarchical_config(query_results):
     overall_documents = []
 
@@ -422,7 +1002,7 @@ def __duplicate_removal_for_heirarchical_config(query_results):
 def __rerank_query_result(query_results, question, experimentalConfig, index):
     logger.info(f"Into reranking for experiment {experimentalConfig.experiment_id} for question {index+1}")
     start_time = time.time()
-    reranker = DocumentReranker(region=experimentalConfig.aws_region, rerank_model_id=experimentalConfig.rerank_model_id)  
+    reranker = RerankerFactory.create_reranker(experimentalConfig.aws_region, experimentalConfig.rerank_model_id)
     result = reranker.rerank_documents(question, query_results)
     end_time = time.time()
     logger.info(f"Reranking for question {index+1} took {end_time - start_time:.2f} seconds") 
@@ -440,10 +1020,17 @@ def _create_metrics(
     guardrail_context_assessment: Optional[Union[List[Dict], Dict]] = None,
     guardrail_output_assessment: Optional[Union[List[Dict], Dict]] = None,
     guardrail_id: Optional[str] = None,
-    guardrail_blocked: Optional[str] = None
+    guardrail_blocked: Optional[str] = None,
+    stage_latencies: Optional[Dict[str, float]] = None,
+    retrieval_metrics: Optional[Dict[str, float]] = None,
+    question_index: Optional[int] = None
 ) -> "ExperimentQuestionMetrics":
-    """Create metrics object with provided data."""
+    """Create metrics object with provided data, with a deterministic id when the question's index is known."""
+    ids = {}
+    if question_index is not None:
+        ids['id'] = ExperimentQuestionMetrics.make_id(experimental_config.experiment_id, question_index, question)
     return ExperimentQuestionMetrics(
+        **ids,
         execution_id=experimental_config.execution_id,
         experiment_id=experimental_config.experiment_id,
         question=question,
@@ -456,14 +1043,12 @@ def _create_metrics(
         guardrail_context_assessment=guardrail_context_assessment,
         guardrail_output_assessment=guardrail_output_assessment,  
         guardrail_id=guardrail_id,
-        guardrail_blocked=guardrail_blocked
+        guardrail_blocked=guardrail_blocked,
+        stage_latencies=stage_latencies,
+        retrieval_metrics=retrieval_metrics,
+        shard=experimental_config.shard_index
     )
 
-def write_batch_to_dynamodb(batch_items: List[Dict], dynamodb: DynamoDBOperations) -> None:
-    """Write a batch of items to DynamoDB."""
-    logger.info(f"Writing batch of {len(batch_items)} items to DynamoDB")
-    dynamodb.batch_write(batch_items)
-    
 class RetrievalError(Exception):
     """Custom exception for retrieval process errors."""
     pass
@@ -0,0 +1,93 @@
+"""
+Sharded retrieval and evaluation of one experiment.
+
+Every shard worker retrieves, generates and evaluates its own contiguous slice of the ground truth
+and records its counters and metrics in the experiment's ``shards`` map; the reducer then
+aggregates them onto the experiment record. On AWS each shard runs as its own task (see
+handlers/fargate_shard_handler.py). This module also runs the shards as local processes, to
+measure how an experiment scales with the number of workers without Fargate:
+
+    python -m retriever.shard_runner --experiment-id <id> --shards 4
+"""
+import argparse
+import logging
+import multiprocessing
+import time
+from typing import Any, Dict, Tuple
+
+from config.config import Config
+from config.experimental_config import ExperimentalConfig
+from core.dynamodb import DynamoDBOperations
+from core.service.experimental_config_service import ExperimentalConfigService
+from core.sharding import reduce_shards
+from retriever.retriever import retrieve
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+def run_shard(config: Config, experimentalConfig: ExperimentalConfig, evaluate_shard: bool = True) -> None:
+    """Retrieve and evaluate the shard of the ground truth given by experimentalConfig.shard_index."""
+    if experimentalConfig.shard_index is None:
+        raise ValueError("run_shard needs a shard_index")
+    retrieve(config, experimentalConfig)
+    if evaluate_shard:
+        # Imported here so retrieval-only workers do not need the evaluation dependencies
+        from evaluation.eval import evaluate
+        evaluate(experimentalConfig)
+
+
+def reduce_experiment(config: Config, experimentalConfig: ExperimentalConfig) -> Dict[str, Any]:
+    """Aggregate the recorded shards of an experiment onto its record."""
+    experiment_db = DynamoDBOperations(region=config.aws_region, table_name=config.experiment_table)
+    return reduce_shards(experiment_db, experimentalConfig)
+
+
+def _experiment_input(config: Config, experiment_id: str) -> Dict[str, Any]:
+    """Task input of an experiment as the state machine passes it, rebuilt from its record."""
+    experiment = DynamoDBOperations(region=config.aws_region, table_name=config.experiment_table).get_item({'id': experiment_id})
+    if not experiment:
+        raise ValueError(f"Experiment with id {experiment_id} not found")
+    return {**experiment.get('config', {}), 'experiment_id': experiment_id, 'execution_id': experiment.get('execution_id')}
+
+
+def _run_local_shard(args: Tuple[Dict[str, Any], bool]) -> float:
+    input_data, evaluate_shard = args
+    logging.basicConfig(level=logging.INFO)
+    config = Config.load_config()
+    experimentalConfig = ExperimentalConfigService(config).create_experimental_config(input_data)
+    start = time.perf_counter()
+    run_shard(config, experimentalConfig, evaluate_shard)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an experiment's retrieval and evaluation as local shard processes")
+    parser.add_argument('--experiment-id', required=True)
+    parser.add_argument('--shards', type=int, default=4)
+    parser.add_argument('--skip-eval', action='store_true', help="Only retrieve, e.g. to time retrieval alone")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    config = Config.load_config()
+    input_data = _experiment_input(config, args.experiment_id)
+    shard_inputs = [({**input_data, 'shard_index': i, 'shard_count': args.shards}, not args.skip_eval) for i in range(args.shards)]
+
+    start = time.perf_counter()
+    # Spawned processes, so no worker inherits boto3 clients or locks from the parent
+    with multiprocessing.get_context('spawn').Pool(processes=args.shards) as pool:
+        shard_seconds = pool.map(_run_local_shard, shard_inputs)
+    wall_seconds = time.perf_counter() - start
+
+    experimentalConfig = ExperimentalConfigService(config).create_experimental_config({**input_data, 'shard_count': args.shards})
+    aggregated = reduce_experiment(config, experimentalConfig)
+
+    print(f"{'shard':>5} {'seconds':>9}")
+    for i, seconds in enumerate(shard_seconds):
+        print(f"{i:>5} {seconds:>9.1f}")
+    print(f"{args.shards} shards finished in {wall_seconds:.1f} s wall time, slowest shard {max(shard_seconds):.1f} s")
+    print(f"Aggregated: {aggregated}")
+
+
+if __name__ == '__main__':
+    main()
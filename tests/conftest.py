@@ -0,0 +1,40 @@
+import threading
+
+import boto3
+import pytest
+
+from util.boto3_clients import Boto3ClientRegistry
+
+try:
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    """Mocked AWS with fake credentials and a fresh client registry."""
+    if mock_aws is None:
+        pytest.skip("moto is not installed")
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('AWS_SESSION_TOKEN', 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setattr(Boto3ClientRegistry, '_session', None)
+    monkeypatch.setattr(Boto3ClientRegistry, '_clients', {})
+    monkeypatch.setattr(Boto3ClientRegistry, '_resources', threading.local())
+    with mock_aws():
+        yield
+
+
+@pytest.fixture
+def dynamodb_table(aws):
+    """Name of a table keyed like the model invocations table."""
+    name = 'test_table'
+    boto3.client('dynamodb', region_name='us-east-1').create_table(
+        TableName=name,
+        KeySchema=[{'AttributeName': 'execution_model_id', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'execution_model_id', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    return name
@@ -0,0 +1,160 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('opensearchpy')
+
+from config.experimental_config import ExperimentalConfig
+from core.inference.bedrock.batch_inference import BATCH_MIN_RECORDS, LocalBatchInferenceJobClient
+from retriever.retriever import process_questions_batch
+
+MODEL_ID = 'us.amazon.nova-pro-v1:0'
+EMBED_TOKENS = 3
+
+
+class FakeEmbedProcessor:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = 0
+
+    def embed_text(self, text):
+        self.calls += 1
+        if text in self.failing:
+            raise RuntimeError('embedding failed')
+        return {'inputTokens': str(EMBED_TOKENS), 'latencyMs': '1'}, [0.1, 0.2]
+
+
+class FakePlanner:
+    """Stands in for the vector search, returning one document named after the question."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def search(self, question, query_embedding):
+        self.calls += 1
+        return [{'text': f"context of {question}"}]
+
+
+class FakeInferencer:
+    def get_model_id(self):
+        return MODEL_ID
+
+    def get_inference_config(self):
+        return {'maxTokens': 256, 'temperature': 0.1, 'topP': 0.9}
+
+    def generate_prompt(self, experimental_config, default_prompt, user_query, context):
+        contexts = ' '.join(record['text'] for record in context or [])
+        return default_prompt, [{'role': 'user', 'content': [{'text': f"{contexts}\n{user_query}"}]}]
+
+
+class FakeInferenceProcessor:
+    def __init__(self):
+        self.inferencer = FakeInferencer()
+        self.calls = 0
+
+    def generate_text(self, user_query, default_prompt, context=None, **kwargs):
+        self.calls += 1
+        return {'inputTokens': 10, 'outputTokens': 2, 'totalTokens': 12}, f"sync answer to {user_query}"
+
+
+class ListSink:
+    def __init__(self):
+        self.items = []
+
+    def put(self, item):
+        self.items.append(item)
+
+    def close(self):
+        pass
+
+
+def generate(model_id, model_input):
+    """Native Nova response echoing the question, with usage counted in words of the prompt."""
+    text = model_input['messages'][0]['content'][0]['text']
+    question = text.split('\n')[-1]
+    return {
+        'output': {'message': {'content': [{'text': f"batch answer to {question}"}]}},
+        'usage': {'inputTokens': len(text.split()), 'outputTokens': 2}
+    }
+
+
+def experimental_config():
+    return ExperimentalConfig(
+        execution_id='exec', experiment_id='exp', aws_region='us-east-1', kb_data='kb', gt_data='gt',
+        chunking_strategy='fixed', chunk_size=512, chunk_overlap=10, hierarchical_parent_chunk_size=0,
+        hierarchical_child_chunk_size=0, hierarchical_chunk_overlap_percentage=0, embedding_service='bedrock',
+        embedding_model='amazon.titan-embed-text-v2:0', indexing_algorithm='hnsw', index_id='index', n_shot_prompts=0,
+        knn_num=1, temp_retrieval_llm=0.1, retrieval_service='bedrock', retrieval_model=MODEL_ID, vector_dimension=2,
+        batch_inference=True
+    )
+
+
+def components(failing=()):
+    return {
+        'embed_processor': FakeEmbedProcessor(failing),
+        'retrieval_planner': FakePlanner(),
+        'inference_processor': FakeInferenceProcessor(),
+        'metrics_sink': ListSink(),
+    }
+
+
+def ground_truth(count):
+    return [{'question': f"q{i}", 'answer': f"a{i}", 'question_index': i} for i in range(count)]
+
+
+def by_question(sink):
+    return {item['question']['S']: item for item in sink.items}
+
+
+def test_batch_answers_are_mapped_back_onto_question_metrics():
+    gt_data = ground_truth(BATCH_MIN_RECORDS + 20)
+    parts = components()
+    job_client = LocalBatchInferenceJobClient(generate)
+    config = SimpleNamespace(inference_system_prompt='Answer the question.')
+
+    embed_tokens, input_tokens, output_tokens = process_questions_batch(
+        gt_data, parts, config, experimental_config(), job_client, poll_interval=0
+    )
+
+    assert len(job_client.jobs) == 1
+    assert parts['inference_processor'].calls == 0
+    items = by_question(parts['metrics_sink'])
+    assert len(items) == len(gt_data)
+    for entry in gt_data:
+        item = items[entry['question']]
+        assert item['generated_answer']['S'] == f"batch answer to {entry['question']}"
+        assert item['reference_contexts']['L'] == [{'S': f"context of {entry['question']}"}]
+        assert item['answer_metadata']['M']['outputTokens'] == {'N': '2'}
+    assert embed_tokens == EMBED_TOKENS * len(gt_data)
+    assert input_tokens == sum(int(item['answer_metadata']['M']['inputTokens']['N']) for item in items.values())
+    assert output_tokens == 2 * len(gt_data)
+
+
+def test_too_few_prepared_records_generate_synchronously_without_retrieving_again():
+    gt_data = ground_truth(BATCH_MIN_RECORDS + 20)
+    failing = {entry['question'] for entry in gt_data[:30]}
+    parts = components(failing)
+    job_client = LocalBatchInferenceJobClient(generate)
+    config = SimpleNamespace(inference_system_prompt='Answer the question.')
+
+    embed_tokens, input_tokens, output_tokens = process_questions_batch(
+        gt_data, parts, config, experimental_config(), job_client, poll_interval=0
+    )
+
+    prepared = len(gt_data) - len(failing)
+    assert job_client.jobs == {}
+    assert parts['embed_processor'].calls == len(gt_data)
+    assert parts['retrieval_planner'].calls == prepared
+    assert parts['inference_processor'].calls == prepared
+    assert (embed_tokens, input_tokens, output_tokens) == (EMBED_TOKENS * prepared, 10 * prepared, 2 * prepared)
+
+    items = by_question(parts['metrics_sink'])
+    assert len(items) == len(gt_data)
+    for entry in gt_data:
+        item = items[entry['question']]
+        if entry['question'] in failing:
+            assert item['generated_answer']['S'] == ''
+            assert item['query_metadata']['M'] == {}
+        else:
+            assert item['generated_answer']['S'] == f"sync answer to {entry['question']}"
+            assert item['reference_contexts']['L'] == [{'S': f"context of {entry['question']}"}]
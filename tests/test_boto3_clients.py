@@ -0,0 +1,22 @@
+from core.dynamodb import DynamoDBOperations
+from util.boto3_clients import get_client, get_resource
+
+
+def test_clients_are_shared(aws):
+    assert get_client('dynamodb', 'us-east-1') is get_client('dynamodb', 'us-east-1')
+    assert get_client('dynamodb', 'us-east-1') is not get_client('dynamodb', 'us-west-2')
+
+
+def test_resource_does_not_register_serializers_on_registry_client(aws):
+    get_resource('dynamodb', 'us-east-1').Table('test_table')
+    client = get_client('dynamodb', 'us-east-1')
+    assert get_resource('dynamodb', 'us-east-1').meta.client is not client
+    assert 'dynamodb-attr-value-input' not in client.meta.events._emitter._unique_id_handlers
+
+
+def test_low_level_writes_after_table_resource(dynamodb_table):
+    ops = DynamoDBOperations(dynamodb_table, region='us-east-1')
+    ops.dynamodb_client.batch_write_item(RequestItems={
+        dynamodb_table: [{'PutRequest': {'Item': {'execution_model_id': {'S': 'abc'}, 'count': {'N': '1'}}}}]
+    })
+    assert ops.table.get_item(Key={'execution_model_id': 'abc'})['Item']['count'] == 1
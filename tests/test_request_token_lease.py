@@ -0,0 +1,115 @@
+import boto3
+import pytest
+
+from core.dynamodb import DynamoDBOperations
+from util.request_token_lease import LEASE_KEY_PREFIX, RequestTokenLease
+
+MODEL_KEY = 'bedrock:us.amazon.nova-lite-v1:0'
+
+
+class Clock:
+    """Stands in for time.time so tests can move between lease windows."""
+
+    def __init__(self, now: float = 6000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr('util.request_token_lease.time.time', clock)
+    return clock
+
+
+def _counter(table_name):
+    item = boto3.client('dynamodb', region_name='us-east-1').get_item(
+        TableName=table_name, Key={'execution_model_id': {'S': f"{LEASE_KEY_PREFIX}{MODEL_KEY}"}}, ConsistentRead=True
+    )['Item']
+    return int(item['lease_window']['N']), int(item['remaining']['N'])
+
+
+def _lease(table_name, capacity=10, batch_size=4):
+    return RequestTokenLease(table_name, MODEL_KEY, capacity=capacity, window_seconds=60, batch_size=batch_size,
+                             region='us-east-1')
+
+
+def test_first_lease_refills_the_counter(dynamodb_table, clock):
+    lease = _lease(dynamodb_table)
+    assert lease.acquire()
+    assert _counter(dynamodb_table) == (100, 6)
+    assert (lease.leased, lease._available) == (4, 3)
+
+
+def test_tokens_are_spent_locally_before_leasing_again(dynamodb_table, clock):
+    lease = _lease(dynamodb_table)
+    for _ in range(4):
+        lease.acquire()
+    assert _counter(dynamodb_table) == (100, 6)
+    lease.acquire()
+    assert _counter(dynamodb_table) == (100, 2)
+    assert lease.leased == 8
+
+
+def test_partial_grant_takes_what_remains(dynamodb_table, clock):
+    first, second = _lease(dynamodb_table), _lease(dynamodb_table)
+    for _ in range(8):
+        first.acquire()
+    assert _counter(dynamodb_table) == (100, 2)
+    assert second.acquire()
+    assert second.leased == 2
+    assert _counter(dynamodb_table) == (100, 0)
+    second.acquire()
+    assert not second.acquire(block=False)
+
+
+def test_window_rollover_refills_and_voids_held_tokens(dynamodb_table, clock):
+    lease = _lease(dynamodb_table)
+    lease.acquire()
+    assert lease._available == 3
+    clock.now += 60
+    lease.acquire()
+    # The three tokens of the past window were dropped, a fresh batch was leased
+    assert _counter(dynamodb_table) == (101, 6)
+    assert lease._available == 3
+
+
+def test_capacity_attribute_overrides_default(dynamodb_table, clock):
+    boto3.client('dynamodb', region_name='us-east-1').put_item(TableName=dynamodb_table, Item={
+        'execution_model_id': {'S': f"{LEASE_KEY_PREFIX}{MODEL_KEY}"}, 'capacity': {'N': '20'}
+    })
+    _lease(dynamodb_table).acquire()
+    assert _counter(dynamodb_table) == (100, 16)
+
+
+def test_release_unused_returns_tokens_of_the_current_window(dynamodb_table, clock):
+    lease = _lease(dynamodb_table)
+    lease.acquire()
+    lease.release_unused()
+    assert _counter(dynamodb_table) == (100, 9)
+    assert lease._available == 0
+
+
+def test_release_unused_drops_tokens_of_a_past_window(dynamodb_table, clock):
+    lease = _lease(dynamodb_table)
+    lease.acquire()
+    clock.now += 60
+    lease.release_unused()
+    assert _counter(dynamodb_table) == (100, 6)
+    assert lease._available == 0
+
+
+def test_refund_keeps_a_token_for_the_next_request(dynamodb_table, clock):
+    lease = _lease(dynamodb_table)
+    lease.acquire()
+    lease.refund()
+    assert lease._available == 4
+
+
+def test_lease_after_table_resource_on_the_same_region(dynamodb_table, clock):
+    # A Table resource must not register its serializers on the lease's low-level client
+    DynamoDBOperations(dynamodb_table, region='us-east-1').table.load()
+    assert _lease(dynamodb_table).acquire()
+    assert _counter(dynamodb_table) == (100, 6)
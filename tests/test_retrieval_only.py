@@ -0,0 +1,50 @@
+import pytest
+
+pytest.importorskip('opensearchpy')
+
+from retriever.retriever import process_questions_retrieval_only
+from tests.test_batch_inference import FakeEmbedProcessor, FakePlanner, ListSink, experimental_config, ground_truth
+
+
+class StoppingSink(ListSink):
+    """Sink of a task that is stopped after a number of questions were written."""
+
+    def __init__(self, limit):
+        super().__init__()
+        self.limit = limit
+
+    def put(self, item):
+        if len(self.items) == self.limit:
+            raise SystemExit('task stopped')
+        super().put(item)
+
+
+def components(sink):
+    return {'embed_processor': FakeEmbedProcessor(), 'retrieval_planner': FakePlanner(), 'metrics_sink': sink}
+
+
+def test_questions_are_written_as_they_are_scored():
+    sink = StoppingSink(limit=3)
+
+    with pytest.raises(SystemExit):
+        process_questions_retrieval_only(ground_truth(10), components(sink), experimental_config())
+
+    assert [item['question']['S'] for item in sink.items] == ['q0', 'q1', 'q2']
+    for item in sink.items:
+        assert set(item['retrieval_metrics']['M']) == {'token_recall', 'mrr', 'ndcg', 'hit_rate'}
+        assert 'retrieval_scoring' in item['stage_latencies']['M']
+
+
+def test_means_include_resumed_questions():
+    sink = ListSink()
+    resumed = [{'token_recall': 1.0, 'mrr': 1.0, 'ndcg': 1.0, 'hit_rate': 1.0}] * 2
+
+    embed_tokens, retrieval_metrics = process_questions_retrieval_only(
+        ground_truth(2), components(sink), experimental_config(), resumed_metrics=resumed
+    )
+
+    assert embed_tokens == 6
+    assert len(sink.items) == 2
+    assert retrieval_metrics['questions'] == 4
+    # The contexts of the fake search share no tokens with the answers
+    assert retrieval_metrics['token_recall'] == 0.5
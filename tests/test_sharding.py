@@ -0,0 +1,56 @@
+import boto3
+import pytest
+
+from core.dynamodb import DynamoDBOperations
+from core.sharding import record_shard_result, reduce_shards
+
+
+class ShardConfig:
+    experiment_id = 'exp'
+    shard_count = 2
+
+    def __init__(self, shard_index=None):
+        self.shard_index = shard_index
+
+
+@pytest.fixture
+def experiment_db(aws):
+    boto3.client('dynamodb', region_name='us-east-1').create_table(
+        TableName='experiments',
+        KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'id', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    db = DynamoDBOperations(table_name='experiments', region='us-east-1')
+    db.put_item({'id': 'exp'}, add_metadata=False)
+    return db
+
+
+def shard_result(questions, embed_tokens, p50):
+    return {
+        'questions': questions,
+        'retrieval_query_embed_tokens': embed_tokens,
+        'retrieval_input_tokens': 10 * questions,
+        'retrieval_output_tokens': 2 * questions,
+        'retrieval_metrics': {'mrr': 0.5, 'ndcg': 0.25},
+        'stage_latency_percentiles': {'embedding': {'p50': p50, 'p95': p50 * 2, 'p99': p50 * 3, 'count': questions}},
+        'rate_limiter_metrics': {'bedrock:model': {'rate': 5.0, 'throttles': questions}},
+        'hedging_metrics': {'bedrock:model': {'calls': questions, 'hedges': 1}},
+    }
+
+
+def test_reduce_keeps_process_reports_per_shard(experiment_db):
+    record_shard_result(experiment_db, ShardConfig(0), shard_result(3, 9, 12.5))
+    record_shard_result(experiment_db, ShardConfig(1), shard_result(1, 3, 40.0))
+
+    reduce_shards(experiment_db, ShardConfig())
+
+    experiment = experiment_db.get_item({'id': 'exp'})
+    assert experiment['retrieval_query_embed_tokens'] == 12
+    assert experiment['retrieval_input_tokens'] == 40
+    assert float(experiment['retrieval_metrics']['mrr']) == 0.5
+    assert experiment['retrieval_metrics']['questions'] == 4
+    assert float(experiment['stage_latency_percentiles']['shard_0']['embedding']['p50']) == 12.5
+    assert float(experiment['stage_latency_percentiles']['shard_1']['embedding']['p50']) == 40.0
+    assert experiment['rate_limiter_metrics']['shard_1']['bedrock:model']['throttles'] == 1
+    assert experiment['hedging_metrics']['shard_0']['bedrock:model']['calls'] == 3
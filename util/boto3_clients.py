@@ -0,0 +1,112 @@
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import boto3
+from botocore.client import BaseClient
+from botocore.config import Config as BotoConfig
+
+from config.config import Config
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+class Boto3ClientRegistry:
+    """
+    Process-wide registry of boto3 clients keyed by service, region and client config.
+
+    Clients are created lazily on first use from one shared session and reused by every component,
+    so constructing a DynamoDBOperations, an embedder or a reranker no longer builds new clients,
+    credential resolvers and TLS connection pools. boto3 clients are thread-safe once created;
+    creation itself is serialized because the session is not.
+
+    Resources are not thread-safe, so they are cached per thread. Each resource keeps its own client:
+    a DynamoDB resource registers handlers on its client that serialize Python values to DynamoDB
+    JSON, and on a registry client those would serialize the DynamoDB JSON of low-level callers
+    a second time.
+    """
+
+    _session: Optional[boto3.session.Session] = None
+    _base_config: Optional[BotoConfig] = None
+    _clients: Dict[Tuple, BaseClient] = {}
+    _resources = threading.local()
+    _lock = threading.Lock()
+
+    @classmethod
+    def _get_session(cls) -> boto3.session.Session:
+        if cls._session is None:
+            cls._session = boto3.session.Session()
+        return cls._session
+
+    @classmethod
+    def _get_base_config(cls) -> BotoConfig:
+        """Client config tuned for many concurrent calls from retrieval and evaluation workers."""
+        if cls._base_config is None:
+            config = Config.load_config()
+            cls._base_config = BotoConfig(
+                max_pool_connections=config.aws_max_pool_connections,
+                connect_timeout=config.aws_connect_timeout,
+                read_timeout=config.aws_read_timeout,
+                retries={'mode': 'adaptive', 'max_attempts': config.aws_max_attempts},
+                tcp_keepalive=True
+            )
+        return cls._base_config
+
+    @classmethod
+    def client(cls, service_name: str, region_name: Optional[str] = None, endpoint_url: Optional[str] = None,
+               **config_overrides: Any) -> BaseClient:
+        """
+        Return the shared client for a service.
+
+        Args:
+            service_name (str): boto3 service name, e.g. 'bedrock-runtime'
+            region_name (str, optional): AWS region, defaults to the session region
+            endpoint_url (str, optional): Non-default endpoint, e.g. DynamoDB Local
+            **config_overrides: botocore Config options that differ from the tuned defaults, e.g. signature_version
+
+        Returns:
+            BaseClient: Thread-safe boto3 client
+        """
+        key = (service_name, region_name, endpoint_url, repr(sorted(config_overrides.items())))
+        client = cls._clients.get(key)
+        if client is not None:
+            return client
+        with cls._lock:
+            if key not in cls._clients:
+                config = cls._get_base_config()
+                if config_overrides:
+                    config = config.merge(BotoConfig(**config_overrides))
+                cls._clients[key] = cls._get_session().client(service_name, region_name=region_name, endpoint_url=endpoint_url, config=config)
+                logger.debug(f"Created boto3 {service_name} client for region {region_name}")
+            return cls._clients[key]
+
+    @classmethod
+    def resource(cls, service_name: str, region_name: Optional[str] = None) -> Any:
+        """
+        Return a resource for the current thread, with its own client and the tuned client config.
+
+        Args:
+            service_name (str): boto3 service name, e.g. 'dynamodb'
+            region_name (str, optional): AWS region, defaults to the session region
+
+        Returns:
+            ServiceResource: boto3 resource
+        """
+        resources = cls._resources.__dict__.setdefault('by_key', {})
+        key = (service_name, region_name)
+        if key not in resources:
+            with cls._lock:
+                resources[key] = cls._get_session().resource(service_name, region_name=region_name, config=cls._get_base_config())
+        return resources[key]
+
+
+def get_client(service_name: str, region_name: Optional[str] = None, endpoint_url: Optional[str] = None,
+               **config_overrides: Any) -> BaseClient:
+    """Shorthand for Boto3ClientRegistry.client."""
+    return Boto3ClientRegistry.client(service_name, region_name, endpoint_url, **config_overrides)
+
+
+def get_resource(service_name: str, region_name: Optional[str] = None) -> Any:
+    """Shorthand for Boto3ClientRegistry.resource."""
+    return Boto3ClientRegistry.resource(service_name, region_name)
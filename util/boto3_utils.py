@@ -1,14 +1,15 @@
-from typing import Dict
-import time 
-import logging
-import botocore
 from baseclasses.base_classes import BotoRetryHandler, RetryParams
+import logging
 
 logger = logging.getLogger()
 logging.basicConfig(level=logging.INFO)
 
 class BedRockRetryHander(BotoRetryHandler):
     """Retry handler for Bedrock service."""
+    @property
+    def service(self) -> str:
+        return 'bedrock'
+
     @property
     def retry_params(self) -> RetryParams:
         return RetryParams(
@@ -22,5 +23,29 @@ class BedRockRetryHander(BotoRetryHandler):
         return {
             "ThrottlingException",
             "ServiceQuotaExceededException",
-            "ModelTimeoutException"
+            "ModelTimeoutException",
+            "ServiceUnavailableException"
+        }
+
+
+class SageMakerRetryHandler(BotoRetryHandler):
+    """Retry handler for SageMaker endpoint invocations."""
+    @property
+    def service(self) -> str:
+        return 'sagemaker'
+
+    @property
+    def retry_params(self) -> RetryParams:
+        return RetryParams(
+            max_retries=5,
+            retry_delay=1,
+            backoff_factor=2
+        )
+
+    @property
+    def retryable_errors(self):
+        return {
+            "ThrottlingException",
+            "ServiceUnavailable",
+            "InternalFailure"
         }
\ No newline at end of file
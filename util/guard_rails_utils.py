@@ -1,4 +1,4 @@
-import boto3
+from util.boto3_clients import get_client
 from typing import Dict, List
 import logging
 
@@ -11,7 +11,7 @@ class GuardRailsUtils:
         "Static method to fetch AWS Bedrock guardrails."
 
         try:
-            client = boto3.client('bedrock', region_name=region)
+            client = get_client('bedrock', region)
 
             logger.info("Fetching guardrails.")            
             response = client.list_guardrails()
@@ -0,0 +1,280 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+
+from botocore.exceptions import ClientError
+
+from config.config import Config
+from util.rate_limiter import THROTTLING_ERRORS, AdaptiveRateLimiter, RateLimiterRegistry
+from util.request_token_lease import RequestTokenLease, RequestTokenLeaseRegistry
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+T = TypeVar('T')
+
+# Calls are not hedged for this long after the model was throttled
+THROTTLE_HEDGE_PAUSE_SECONDS = 60
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when no route answered an inference call within its deadline."""
+
+
+class HedgeSkippedError(Exception):
+    """Raised by a hedge that found no free limiter slot or request token and was not sent."""
+
+
+def _percentile(values, percentile: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(percentile / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class HedgedCaller:
+    """
+    Deadline-aware invocation of one model with hedged requests.
+
+    Each call runs on a worker thread. When it has not answered after the configured percentile
+    of this model's recent latencies, a duplicate is sent to the alternate route and whichever
+    answers first wins. The loser is cancelled if it has not started yet; a request already on
+    the wire cannot be aborted, so it runs to completion in the background and its result is
+    discarded. When neither route answers before the deadline, DeadlineExceededError is raised.
+
+    The hedge delay is derived from primary latencies only, including those of primaries that
+    lost, so hedging does not lower its own threshold over time.
+
+    A hedge is an extra request against the model's limits. It is only sent when the model's rate
+    limiter has a free slot and a request token can be had without waiting, it holds that slot
+    while in flight and reports throttles to the limiter like any other call. No calls are hedged
+    while the model was throttled recently, when duplicates would only add to the congestion.
+    """
+
+    def __init__(self, name: str, executor: ThreadPoolExecutor, hedging: bool = True, percentile: float = 95.0,
+                 min_samples: int = 20, window: int = 200, deadline_seconds: float = 0.0,
+                 limiter: Optional[AdaptiveRateLimiter] = None, token_lease: Optional[RequestTokenLease] = None):
+        """
+        Args:
+            name (str): Model key, e.g. 'bedrock:us.amazon.nova-pro-v1:0'
+            executor (ThreadPoolExecutor): Pool running the primary and hedged requests
+            hedging (bool): Send duplicates to the alternate route, otherwise only the deadline applies
+            percentile (float): Percentile of recent primary latencies after which a call is hedged
+            min_samples (int): Primary latencies needed before calls are hedged
+            window (int): Number of recent latencies kept
+            deadline_seconds (float): Time after which a call fails, 0 for no deadline
+            limiter (AdaptiveRateLimiter, optional): Limiter of the model, which hedges take a slot of
+            token_lease (RequestTokenLease, optional): Lease of the model's shared request quota
+        """
+        self.name = name
+        self.hedging = hedging
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.deadline_seconds = deadline_seconds
+        self.limiter = limiter
+        self.token_lease = token_lease
+        self.calls = 0
+        self.hedges = 0
+        self.hedges_skipped = 0
+        self.hedge_wins = 0
+        self.deadlines_exceeded = 0
+        self._executor = executor
+        self._primary_latencies: Deque[float] = deque(maxlen=window)
+        self._effective_latencies: Deque[float] = deque(maxlen=window)
+        self._saved_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds after which a call is hedged, None until enough latencies were observed or while throttled."""
+        if not self.hedging:
+            return None
+        if self.limiter is not None and self.limiter.throttled_within(THROTTLE_HEDGE_PAUSE_SECONDS):
+            return None
+        with self._lock:
+            if len(self._primary_latencies) < self.min_samples:
+                return None
+            latencies = list(self._primary_latencies)
+        return _percentile(latencies, self.percentile)
+
+    def _hedge(self, request: Callable[[], T]) -> Callable[[], T]:
+        """Wrap a hedged request so it spends a request token and holds a limiter slot of its own."""
+        def run() -> T:
+            if self.token_lease is not None and not self.token_lease.acquire(block=False):
+                raise HedgeSkippedError(f"No request token left for a hedge of {self.name}")
+            started_at = self.limiter.try_acquire() if self.limiter is not None else None
+            if self.limiter is not None and started_at is None:
+                if self.token_lease is not None:
+                    self.token_lease.refund()
+                raise HedgeSkippedError(f"No free limiter slot for a hedge of {self.name}")
+            with self._lock:
+                self.hedges += 1
+            throttled = False
+            try:
+                return request()
+            except ClientError as e:
+                throttled = e.response['Error']['Code'] in THROTTLING_ERRORS
+                raise
+            finally:
+                if self.limiter is not None:
+                    self.limiter.release(started_at, throttled)
+        return run
+
+    def _track_primary(self, future: Future, started: float) -> None:
+        def done(f: Future) -> None:
+            if not f.cancelled() and f.exception() is None:
+                with self._lock:
+                    self._primary_latencies.append(time.monotonic() - started)
+        future.add_done_callback(done)
+
+    def _track_saving(self, loser: Future, started: float, winner_latency: float) -> None:
+        """Once the losing primary finishes, record how much later than the hedge it answered."""
+        def done(f: Future) -> None:
+            if not f.cancelled() and f.exception() is None:
+                with self._lock:
+                    self._saved_seconds += max(0.0, time.monotonic() - started - winner_latency)
+        loser.add_done_callback(done)
+
+    def call(self, primary: Callable[[], T], alternate: Optional[Callable[[], T]] = None) -> T:
+        """
+        Invoke primary, hedging to alternate (or primary again) when it is slow.
+
+        Args:
+            primary (Callable[[], T]): Request on the primary route
+            alternate (Callable[[], T], optional): The same request on an alternate route
+
+        Returns:
+            T: Result of the first route to answer successfully
+
+        Raises:
+            DeadlineExceededError: If no route answered before the deadline
+            Exception: The primary's error when every route failed
+        """
+        started = time.monotonic()
+        deadline = started + self.deadline_seconds if self.deadline_seconds else None
+        delay = self.hedge_delay()
+        with self._lock:
+            self.calls += 1
+
+        primary_future = self._executor.submit(primary)
+        self._track_primary(primary_future, started)
+        pending = {primary_future}
+        hedge_future = None
+        errors = []
+
+        while True:
+            now = time.monotonic()
+            timeouts = []
+            if hedge_future is None and delay is not None:
+                timeouts.append(started + delay - now)
+            if deadline is not None:
+                timeouts.append(deadline - now)
+            done, pending = wait(pending, timeout=max(0.0, min(timeouts)) if timeouts else None,
+                                 return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if future.exception() is not None:
+                    if isinstance(future.exception(), HedgeSkippedError):
+                        with self._lock:
+                            self.hedges_skipped += 1
+                        continue
+                    errors.append((future is primary_future, future.exception()))
+                    continue
+                latency = time.monotonic() - started
+                for loser in pending:
+                    loser.cancel()
+                with self._lock:
+                    self._effective_latencies.append(latency)
+                    if future is hedge_future:
+                        self.hedge_wins += 1
+                if future is hedge_future:
+                    self._track_saving(primary_future, started, latency)
+                return future.result()
+
+            if not pending:
+                # Every route that was tried failed; surface the primary's error for the retry handler
+                raise next(error for is_primary, error in errors if is_primary)
+
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                for future in pending:
+                    future.cancel()
+                with self._lock:
+                    self.deadlines_exceeded += 1
+                raise DeadlineExceededError(f"{self.name} did not answer within {self.deadline_seconds} seconds")
+
+            if hedge_future is None and delay is not None and now >= started + delay:
+                logger.info(f"Hedging {self.name} call after {delay * 1000:.0f} ms")
+                hedge_future = self._executor.submit(self._hedge(alternate or primary))
+                pending.add(hedge_future)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            primary = list(self._primary_latencies)
+            effective = list(self._effective_latencies)
+            calls, hedges, hedge_wins, hedges_skipped = self.calls, self.hedges, self.hedge_wins, self.hedges_skipped
+            deadlines_exceeded, saved_seconds = self.deadlines_exceeded, self._saved_seconds
+        metrics = {
+            'calls': calls,
+            'hedges': hedges,
+            'hedge_rate': round(hedges / calls, 4) if calls else 0.0,
+            'hedge_wins': hedge_wins,
+            'hedges_skipped': hedges_skipped,
+            'deadlines_exceeded': deadlines_exceeded,
+            'latency_saved_ms': round(saved_seconds * 1000, 2)
+        }
+        for label, percentile in (('p50', 50), ('p95', 95), ('p99', 99)):
+            primary_ms = _percentile(primary, percentile)
+            effective_ms = _percentile(effective, percentile)
+            if primary_ms is not None and effective_ms is not None:
+                metrics[f'primary_{label}_ms'] = round(primary_ms * 1000, 2)
+                metrics[f'{label}_ms'] = round(effective_ms * 1000, 2)
+                metrics[f'{label}_improvement_ms'] = round((primary_ms - effective_ms) * 1000, 2)
+        return metrics
+
+
+class HedgingRegistry:
+    """Process-wide hedged callers, one per service and model, sharing one pool of request threads."""
+
+    _callers: Dict[str, HedgedCaller] = {}
+    _executor: Optional[ThreadPoolExecutor] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, key: str) -> Optional[HedgedCaller]:
+        """Return the hedged caller of a model, or None when neither hedging nor a deadline is configured."""
+        caller = cls._callers.get(key)
+        if caller is not None:
+            return caller
+        with cls._lock:
+            if key not in cls._callers:
+                config = Config.load_config()
+                if not config.inference_hedging and not config.inference_deadline_seconds:
+                    return None
+                if cls._executor is None:
+                    # Primaries, hedges and losers still finishing can all be in flight at once
+                    cls._executor = ThreadPoolExecutor(max_workers=3 * config.rate_limit_max_concurrency,
+                                                       thread_name_prefix='hedged-call')
+                cls._callers[key] = HedgedCaller(
+                    name=key,
+                    executor=cls._executor,
+                    hedging=config.inference_hedging,
+                    percentile=config.inference_hedge_percentile,
+                    min_samples=config.inference_hedge_min_samples,
+                    deadline_seconds=config.inference_deadline_seconds,
+                    # Keyed like the retry handler's limiter, so hedges count against the same limits
+                    limiter=RateLimiterRegistry.get(key),
+                    token_lease=RequestTokenLeaseRegistry.get(key)
+                )
+            return cls._callers[key]
+
+    @classmethod
+    def metrics(cls) -> Dict[str, Dict[str, Any]]:
+        """Hedge rate, wins and latency percentiles with and without hedging per model."""
+        with cls._lock:
+            callers = dict(cls._callers)
+        return {name: caller.metrics() for name, caller in callers.items()}
@@ -0,0 +1,161 @@
+import logging
+import os
+import shutil
+import threading
+import uuid
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from config.config import Config
+from util.boto3_clients import get_client
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:
+    Tokenizer = None
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Files of an exported model directory
+MODEL_FILE = 'model.onnx'
+QUANTIZED_MODEL_FILE = 'model.int8.onnx'
+TOKENIZER_FILE = 'tokenizer.json'
+
+
+def download_model(name: str, model_dir: str, bucket: str, prefix: str) -> str:
+    """
+    Return the local directory of a model, downloading ``s3://{bucket}/{prefix}/{name}/`` once per host.
+
+    Like vector snapshots, models are downloaded to a private directory and renamed into place, so
+    concurrent workers never load a partially written model.
+    """
+    target = os.path.join(model_dir, name)
+    if os.path.exists(os.path.join(target, MODEL_FILE)):
+        return target
+    if not bucket:
+        raise ValueError(f"Model {name} is not in {model_dir} and no S3 bucket is configured to download it from")
+
+    s3_client = get_client('s3')
+    source = f"{prefix}/{name}/"
+    staging = f"{target}.{uuid.uuid4().hex}"
+    os.makedirs(staging)
+    try:
+        for page in s3_client.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=source):
+            for item in page.get('Contents', []):
+                relative = item['Key'][len(source):]
+                if not relative or relative.endswith('/'):
+                    continue
+                path = os.path.join(staging, relative)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                s3_client.download_file(bucket, item['Key'], path)
+        if not os.path.exists(os.path.join(staging, MODEL_FILE)):
+            raise ValueError(f"No {MODEL_FILE} found in s3://{bucket}/{source}")
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # Another worker finished first, use its copy
+            shutil.rmtree(staging, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    logger.info(f"Downloaded model s3://{bucket}/{source} to {target}")
+    return target
+
+
+def quantize_model(directory: str) -> str:
+    """
+    Return the path of an int8 dynamically quantized copy of a model, creating it next to the model once.
+
+    Dynamic quantization stores the weights of matrix multiplications as int8 and quantizes
+    activations on the fly, which shrinks a model about four times and speeds it up on CPUs with
+    int8 dot-product instructions, at a small cost in accuracy.
+    """
+    target = os.path.join(directory, QUANTIZED_MODEL_FILE)
+    if os.path.exists(target):
+        return target
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    staging = f"{target}.{uuid.uuid4().hex}"
+    try:
+        quantize_dynamic(os.path.join(directory, MODEL_FILE), staging, weight_type=QuantType.QInt8)
+        os.replace(staging, target)
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+    logger.info(f"Quantized {directory} to int8")
+    return target
+
+
+class OnnxModel:
+    """
+    A transformer exported to ONNX with its Hugging Face fast tokenizer, run on the CPU.
+
+    Inputs are padded to the longest text of a batch, rounded up to a multiple of 8, so a whole
+    batch is one forward pass.
+    Sessions are safe to run from several threads; ``threads`` bounds the intra-op threads of
+    each run, which keeps concurrent questions from oversubscribing the task's vCPUs.
+    """
+
+    def __init__(self, directory: str, threads: int = 0, max_length: int = 512, quantize: bool = False):
+        """
+        Args:
+            directory (str): Directory with model.onnx and tokenizer.json
+            threads (int): Intra-op threads per run, 0 for onnxruntime's default of one per core
+            max_length (int): Tokens after which inputs are truncated
+            quantize (bool): Run an int8 dynamically quantized copy of the model
+        """
+        if onnxruntime is None or Tokenizer is None:
+            raise ImportError("Local models need the onnxruntime and tokenizers packages")
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+        model_path = quantize_model(directory) if quantize else os.path.join(directory, MODEL_FILE)
+        self.session = onnxruntime.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.tokenizer = Tokenizer.from_file(os.path.join(directory, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        # Multiples of 8 keep the number of distinct input shapes, and thus kernel selections, small
+        self.tokenizer.enable_padding(pad_to_multiple_of=8)
+
+    def encode(self, inputs: Sequence[Union[str, Tuple[str, str]]]) -> Dict[str, np.ndarray]:
+        """Tokenize texts or text pairs into the model's inputs."""
+        encodings = self.tokenizer.encode_batch(list(inputs))
+        features = {
+            'input_ids': np.asarray([encoding.ids for encoding in encodings], dtype=np.int64),
+            'attention_mask': np.asarray([encoding.attention_mask for encoding in encodings], dtype=np.int64),
+            'token_type_ids': np.asarray([encoding.type_ids for encoding in encodings], dtype=np.int64)
+        }
+        return {name: features[name] for name in self.input_names if name in features}
+
+    def run(self, features: Dict[str, np.ndarray]) -> List[np.ndarray]:
+        return self.session.run(None, features)
+
+
+class LocalModelRegistry:
+    """Process-wide ONNX models, loaded on first use and shared by all threads and embedder or reranker instances."""
+
+    _models: Dict[str, OnnxModel] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, name: str) -> OnnxModel:
+        model = cls._models.get(name)
+        if model is not None:
+            return model
+        with cls._lock:
+            if name not in cls._models:
+                config = Config.load_config()
+                directory = download_model(name, config.local_model_dir, config.s3_bucket, config.local_model_prefix)
+                cls._models[name] = OnnxModel(directory, threads=config.local_model_threads, quantize=config.local_model_quantize)
+                logger.info(f"Loaded local model {name} with {config.local_model_threads or 'default'} threads"
+                            f"{', int8 quantized' if config.local_model_quantize else ''}")
+            return cls._models[name]
@@ -0,0 +1,166 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from config.config import Config
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Botocore retries would absorb throttles before the limiter sees them, so clients whose
+# calls go through a limiter leave retrying to it
+LIMITER_CLIENT_CONFIG = {'retries': {'mode': 'standard', 'max_attempts': 0}}
+
+# Error codes that signal congestion and make a limiter back off
+THROTTLING_ERRORS = {"ThrottlingException", "ServiceQuotaExceededException", "TooManyRequestsException"}
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket with AIMD control of both its refill rate and the number of calls in flight.
+
+    Until the first throttle both grow by one per success, doubling every round of calls like TCP
+    slow start. After that, every success adds about one call per round to the concurrency limit
+    and raises the rate the same way; a throttle halves both, once per congestion event, since
+    calls already in flight when the limits were cut are not counted again. Workers sharing a limiter therefore back
+    off together as soon as one of them is throttled, instead of all hammering the endpoint until
+    each is throttled on its own, and probe upwards again while calls succeed.
+    """
+
+    def __init__(self, name: str, initial_rate: float, max_rate: float, initial_concurrency: int, max_concurrency: int,
+                 min_rate: float = 0.2):
+        self.name = name
+        self.rate = float(initial_rate)
+        self.min_rate = min_rate
+        self.max_rate = float(max_rate)
+        self.concurrency_limit = float(initial_concurrency)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.throttles = 0
+        self.successes = 0
+        self._slow_start = True
+        self._last_decrease = 0.0
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+        self._condition = threading.Condition()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        # A burst of at most one second of calls
+        self._tokens = min(max(self.rate, 1.0), self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self) -> float:
+        """Block until a token is available and the concurrency limit allows another call, return its start time."""
+        with self._condition:
+            while True:
+                self._refill()
+                if self.in_flight < int(self.concurrency_limit) and self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self.in_flight += 1
+                    return time.monotonic()
+                wait = (1.0 - self._tokens) / self.rate if self._tokens < 1.0 else None
+                self._condition.wait(timeout=wait)
+
+    def try_acquire(self) -> Optional[float]:
+        """Take a slot only if one is free right now, return its start time or None."""
+        with self._condition:
+            self._refill()
+            if self.in_flight < int(self.concurrency_limit) and self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self.in_flight += 1
+                return time.monotonic()
+            return None
+
+    def release(self, started_at: float, throttled: bool = False) -> None:
+        """Return the call's slot and adapt the limits to its outcome."""
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.throttles += 1
+                if started_at > self._last_decrease:
+                    self._slow_start = False
+                    self._last_decrease = time.monotonic()
+                    self.concurrency_limit = max(1.0, self.concurrency_limit / 2)
+                    self.rate = max(self.min_rate, self.rate / 2)
+                    self._tokens = min(self._tokens, 0.0)
+            else:
+                self.successes += 1
+                if self._slow_start:
+                    self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1)
+                    self.rate = min(self.max_rate, self.rate + 1)
+                else:
+                    self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+                    self.rate = min(self.max_rate, self.rate + 1 / self.concurrency_limit)
+            self._condition.notify_all()
+
+    def throttled_within(self, seconds: float) -> bool:
+        """Whether the limiter backed off because of a throttle in the last ``seconds``."""
+        with self._condition:
+            return self.throttles > 0 and time.monotonic() - self._last_decrease < seconds
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold a slot for one call. Raise ThrottledError inside the block to report a throttle.
+        """
+        started_at = self.acquire()
+        throttled = False
+        try:
+            yield
+        except ThrottledError:
+            throttled = True
+            raise
+        finally:
+            self.release(started_at, throttled)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'rate': round(self.rate, 3),
+                'concurrency_limit': round(self.concurrency_limit, 2),
+                'in_flight': self.in_flight,
+                'throttles': self.throttles,
+                'successes': self.successes
+            }
+
+
+class ThrottledError(Exception):
+    """Wraps a throttling error raised inside AdaptiveRateLimiter.slot."""
+
+    def __init__(self, cause: Exception):
+        super().__init__(str(cause))
+        self.cause = cause
+
+
+class RateLimiterRegistry:
+    """Process-wide limiters, one per service and model, shared by every component calling that model."""
+
+    _limiters: Dict[str, AdaptiveRateLimiter] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, key: str) -> AdaptiveRateLimiter:
+        limiter = cls._limiters.get(key)
+        if limiter is not None:
+            return limiter
+        with cls._lock:
+            if key not in cls._limiters:
+                config = Config.load_config()
+                cls._limiters[key] = AdaptiveRateLimiter(
+                    name=key,
+                    initial_rate=config.rate_limit_initial_rps,
+                    max_rate=config.rate_limit_max_rps,
+                    initial_concurrency=config.rate_limit_initial_concurrency,
+                    max_concurrency=config.rate_limit_max_concurrency
+                )
+            return cls._limiters[key]
+
+    @classmethod
+    def metrics(cls, key: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Current rate, concurrency limit, in-flight and throttle counts per limiter."""
+        with cls._lock:
+            limiters = dict(cls._limiters)
+        return {name: limiter.metrics() for name, limiter in limiters.items() if key is None or name == key}
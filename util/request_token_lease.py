@@ -0,0 +1,200 @@
+import atexit
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+from botocore.exceptions import ClientError
+
+from config.config import Config
+from util.boto3_clients import get_client
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+LEASE_KEY_PREFIX = 'request_tokens#'
+
+
+class RequestTokenLease:
+    """
+    Leases request tokens for one model from a counter shared by every task of every execution.
+
+    The counter is an item of the model invocations table holding the tokens left in the current
+    fixed window, ``capacity`` per ``window_seconds`` (the account quota, e.g. requests per minute).
+    Workers take tokens in batches with conditional updates and spend them locally, so the table
+    sees one write per batch rather than per request. A new window refills the counter, tokens of
+    a past window are dropped, and tokens still held when a worker stops are handed back. Items
+    carry ``expires_at`` so DynamoDB TTL removes counters of models that are no longer used.
+
+    A ``capacity`` attribute set on a model's item overrides the configured default capacity.
+    """
+
+    def __init__(self, table_name: str, model_key: str, capacity: int, window_seconds: int = 60, batch_size: int = 5,
+                 region: Optional[str] = None, endpoint_url: Optional[str] = None):
+        self.table_name = table_name
+        self.model_key = model_key
+        self.capacity = capacity
+        self.window_seconds = window_seconds
+        self.batch_size = max(1, min(batch_size, capacity))
+        self.client = get_client('dynamodb', region, endpoint_url=endpoint_url)
+        self.key = {'execution_model_id': {'S': f"{LEASE_KEY_PREFIX}{model_key}"}}
+        self.leased = 0
+        self.waits = 0
+        self._available = 0
+        self._window = None
+        self._lock = threading.Lock()
+
+    def _current_window(self) -> int:
+        return int(time.time() // self.window_seconds)
+
+    def _update(self, update_expression: str, condition_expression: str, values: Dict[str, Dict[str, str]],
+                names: Optional[Dict[str, str]] = None) -> bool:
+        params = {}
+        if names:
+            params['ExpressionAttributeNames'] = names
+        try:
+            self.client.update_item(
+                TableName=self.table_name,
+                Key=self.key,
+                UpdateExpression=update_expression,
+                ConditionExpression=condition_expression,
+                ExpressionAttributeValues=values,
+                **params
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def _lease(self, window: int, count: int) -> int:
+        """Take up to count tokens of the window from the shared counter, return how many were granted."""
+        n = {'N': str(count)}
+        w = {'N': str(window)}
+
+        # Common case: the window is running and has enough tokens left
+        if self._update("SET remaining = remaining - :n", "lease_window = :w AND remaining >= :n", {':n': n, ':w': w}):
+            return count
+
+        # First lease of a new window refills the counter
+        expires_at = {'N': str((window + 2) * self.window_seconds)}
+        if self._update(
+            "SET lease_window = :w, remaining = if_not_exists(#capacity, :cap) - :n, expires_at = :exp",
+            "attribute_not_exists(lease_window) OR lease_window < :w",
+            {':n': n, ':w': w, ':cap': {'N': str(self.capacity)}, ':exp': expires_at},
+            # capacity is a DynamoDB reserved word
+            {'#capacity': 'capacity'}
+        ):
+            return count
+
+        # The window has fewer than count tokens left, take what remains
+        item = self.client.get_item(TableName=self.table_name, Key=self.key, ConsistentRead=True).get('Item', {})
+        if int(item.get('lease_window', {}).get('N', -1)) != window:
+            return 0
+        remaining = int(item.get('remaining', {}).get('N', 0))
+        if remaining <= 0:
+            return 0
+        if self._update("SET remaining = remaining - :n", "lease_window = :w AND remaining >= :n",
+                        {':n': {'N': str(remaining)}, ':w': w}):
+            return remaining
+        return 0
+
+    def acquire(self, block: bool = True) -> bool:
+        """
+        Spend a token for one request, waiting for the next window when the quota is used up.
+
+        Args:
+            block (bool): Return False instead of waiting when no token can be had right now
+
+        Returns:
+            bool: Whether a token was spent
+        """
+        with self._lock:
+            while True:
+                window = self._current_window()
+                if window != self._window:
+                    # Tokens of a past window are void, the counter was refilled for everyone
+                    self._window = window
+                    self._available = 0
+                if self._available > 0:
+                    self._available -= 1
+                    return True
+
+                granted = self._lease(window, self.batch_size)
+                if granted:
+                    self.leased += granted
+                    self._available = granted - 1
+                    return True
+                if not block:
+                    return False
+
+                # The quota of this window is spent across all tasks, wait for the next one
+                self.waits += 1
+                next_window = (window + 1) * self.window_seconds
+                time.sleep(max(0.0, next_window - time.time()) + random.uniform(0, 1))
+
+    def refund(self) -> None:
+        """Give back a token spent on a request that was not sent after all."""
+        with self._lock:
+            if self._window == self._current_window():
+                self._available += 1
+
+    def release_unused(self) -> None:
+        """Hand tokens still held for the current window back to the shared counter."""
+        with self._lock:
+            if self._available <= 0 or self._window != self._current_window():
+                self._available = 0
+                return
+            returned = self._available
+            self._available = 0
+            if self._update("ADD remaining :n", "lease_window = :w",
+                            {':n': {'N': str(returned)}, ':w': {'N': str(self._window)}}):
+                logger.info(f"Returned {returned} unused request tokens of {self.model_key}")
+
+
+class RequestTokenLeaseRegistry:
+    """Process-wide leases, one per model, shared by every component calling that model."""
+
+    _leases: Dict[str, RequestTokenLease] = {}
+    _lock = threading.Lock()
+    _config: Optional[Config] = None
+
+    @classmethod
+    def _get_config(cls) -> Config:
+        if cls._config is None:
+            cls._config = Config.load_config()
+            atexit.register(cls.release_all)
+        return cls._config
+
+    @classmethod
+    def get(cls, model_key: str) -> Optional[RequestTokenLease]:
+        """Return the lease of a model, or None when request token leasing is disabled."""
+        lease = cls._leases.get(model_key)
+        if lease is not None:
+            return lease
+        with cls._lock:
+            config = cls._get_config()
+            if not config.request_token_leasing or not config.execution_model_invocations_table:
+                return None
+            if model_key not in cls._leases:
+                cls._leases[model_key] = RequestTokenLease(
+                    table_name=config.execution_model_invocations_table,
+                    model_key=model_key,
+                    capacity=config.request_tokens_per_window,
+                    window_seconds=config.request_token_window_seconds,
+                    batch_size=config.request_token_batch_size,
+                    region=config.aws_region,
+                    endpoint_url=config.dynamodb_endpoint_url
+                )
+            return cls._leases[model_key]
+
+    @classmethod
+    def release_all(cls) -> None:
+        with cls._lock:
+            leases = list(cls._leases.values())
+        for lease in leases:
+            try:
+                lease.release_unused()
+            except Exception as e:
+                logger.warning(f"Could not return request tokens of {lease.model_key}: {str(e)}")
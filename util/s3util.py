@@ -1,7 +1,7 @@
 import os
 import json
 import logging
-import boto3
+from util.boto3_clients import get_client
 import io
 from botocore.exceptions import ClientError
 from urllib.parse import urlparse
@@ -16,7 +16,7 @@ class S3Util:
     
     def __init__(self):
         """Initialize S3 client."""
-        self.s3_client = boto3.client('s3')
+        self.s3_client = get_client('s3')
         self.logger = logging.getLogger(__name__)
 
     def read_json_from_s3(self, s3_path: str) -> Optional[Dict]:
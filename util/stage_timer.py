@@ -0,0 +1,108 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+_active = threading.local()
+
+
+class StageTimer:
+    """
+    Wall-clock time per named stage of one question, in milliseconds.
+
+    A stage entered several times (e.g. one guardrail call per content source) accumulates.
+    Safe to use from the worker threads of speculative guardrail checks.
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def add(self, name: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self._stages[name] = self._stages.get(name, 0.0) + elapsed_ms
+
+    @contextmanager
+    def activate(self):
+        """Make this the timer that record_stage reports to on the current thread."""
+        previous = getattr(_active, 'timer', None)
+        _active.timer = self
+        try:
+            yield self
+        finally:
+            _active.timer = previous
+
+    def bind(self, fn: Callable) -> Callable:
+        """Wrap fn so record_stage calls inside it report to this timer on any thread."""
+        def wrapper(*args, **kwargs):
+            with self.activate():
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return {name: round(elapsed_ms, 2) for name, elapsed_ms in self._stages.items()}
+
+
+def set_active_timer(timer: Optional[StageTimer]) -> None:
+    """Make the timer the one record_stage reports to on the current thread, or clear it with None."""
+    _active.timer = timer
+
+
+def bind_active_timer(fn: Callable) -> Callable:
+    """Wrap fn so it reports to the timer active on the calling thread when it runs on a worker thread."""
+    timer: Optional[StageTimer] = getattr(_active, 'timer', None)
+    return timer.bind(fn) if timer is not None else fn
+
+
+@contextmanager
+def record_stage(name: str):
+    """Time a stage on the active timer of this thread, or do nothing if none is active."""
+    timer: Optional[StageTimer] = getattr(_active, 'timer', None)
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, math.ceil(percentile / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class StageLatencyStats:
+    """Collects per-question stage timings of an experiment and summarizes them as percentiles."""
+
+    def __init__(self):
+        self._samples: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stages: Dict[str, float]) -> None:
+        with self._lock:
+            for name, elapsed_ms in stages.items():
+                self._samples.setdefault(name, []).append(elapsed_ms)
+
+    def percentiles(self) -> Dict[str, Dict[str, float]]:
+        """Return {stage: {'p50', 'p95', 'p99', 'count'}} over all recorded samples."""
+        with self._lock:
+            summary = {}
+            for name, samples in self._samples.items():
+                ordered = sorted(samples)
+                summary[name] = {
+                    'p50': round(_percentile(ordered, 50), 2),
+                    'p95': round(_percentile(ordered, 95), 2),
+                    'p99': round(_percentile(ordered, 99), 2),
+                    'count': len(ordered)
+                }
+            return summary